@@ -1,11 +1,23 @@
 import streamlit as st
 import requests
 import os
+import json
+import time
 import pandas as pd # Importado para o dashboard
 import re # Importado para extrair código do dashboard
 from dotenv import load_dotenv
 from pathlib import Path
 
+from backend_client import BackendClient
+from chunked_loader import STREAMING_THRESHOLD_MB, load_csv_chunked
+from context_builder import build_data_context
+from csv_reader import CsvReadError, read_csv_bytes
+from dashboard_runtime import DashboardStore, dashboard_key, extract_code, run_dashboard, sanitize_code
+from dashboard_sandbox import SANDBOX_ENABLED, SandboxError, SandboxPool, replay
+from dashboard_spec import DashboardSpec, SpecError, parse_spec, render_spec, validate_columns
+from datasets import content_hash, profile_dataframe
+from excel_loader import ExcelReadError, ExcelWorkbook
+
 # --- CONFIGURAÇÃO INICIAL ---
 # Carrega variáveis de ambiente (apenas para configuração local)
 env_path = Path(__file__).parent / ".env"
@@ -18,8 +30,282 @@ BACKEND_URL = os.getenv('BACKEND_API_URL', 'https://crew-ai-agent-for-copywritin
 # Remove barra final se houver
 BACKEND_URL = BACKEND_URL.rstrip('/')
 
+# Arquivos lidos/perfilados mantidos em cache entre reruns (por hash do conteúdo)
+UPLOAD_CACHE_ENTRIES = int(os.getenv("UPLOAD_CACHE_ENTRIES", "8"))
+UPLOAD_CACHE_TTL = int(os.getenv("UPLOAD_CACHE_TTL", "3600"))  # segundos
+
 st.set_page_config(page_title="AI Marketing Crew", page_icon="🚀", layout="wide")
 
+# Rótulos exibidos para cada task da crew de copywriting
+TASK_LABELS = {
+    "research_task": "🔍 **Agente 1:** Pesquisador de Mercado",
+    "copywriting_task": "📝 **Agente 2:** Copywriter",
+    "editing_task": "✅ **Agente 3:** Editor Chefe",
+}
+
+
+@st.cache_resource
+def get_backend_client():
+    """Sessão HTTP com o backend (pool keep-alive e retries), compartilhada entre reruns e sessões"""
+    return BackendClient(BACKEND_URL)
+
+
+# Acorda o backend (cold start do Render) em segundo plano enquanto o formulário é preenchido
+get_backend_client().warm_up()
+
+
+def show_retry(attempt, reason):
+    """Avisa na tela que o backend está sendo chamado de novo (ex.: ainda acordando)"""
+    st.write(f"⏳ Backend indisponível ({reason}) — nova tentativa {attempt}...")
+
+
+def iter_sse_events(response):
+    """Lê um stream Server-Sent Events e devolve cada evento como dict"""
+    data_lines = []
+    for line in response.iter_lines(decode_unicode=True):
+        if line is None:
+            continue
+        if line.startswith("data:"):
+            data_lines.append(line[5:].strip())
+        elif not line and data_lines:
+            yield json.loads("\n".join(data_lines))
+            data_lines = []
+
+
+def follow_job(job_id):
+    """Acompanha o job via SSE mostrando o progresso das tasks e o texto sendo gerado"""
+    live_text = ""
+    live_box = None
+    last_render = 0.0
+    job_data = None
+
+    client = get_backend_client()
+    with client.get(f"/api/jobs/{job_id}/events", stream=True, timeout=(10, 300)) as response:
+        response.raise_for_status()
+        for event in iter_sse_events(response):
+            event_type = event.get("type")
+            label = TASK_LABELS.get(event.get("task"), event.get("task"))
+
+            if event_type == "task_cached":
+                st.write(f"{label} — ♻️ reaproveitado do cache")
+            elif event_type == "task_started":
+                st.write(f"{label} está trabalhando...")
+                live_text = ""
+                live_box = st.empty()
+            elif event_type == "token" and live_box is not None:
+                live_text += event.get("delta", "")
+                # Limita a frequência de redesenho da tela
+                if time.time() - last_render > 0.3:
+                    live_box.markdown(live_text[-3000:])
+                    last_render = time.time()
+            elif event_type == "task_completed":
+                if live_box is not None:
+                    live_box.empty()
+                    live_box = None
+                st.write(f"{label} finalizou.")
+            elif event_type == "task_failed":
+                st.write(f"⚠️ {label} falhou: {event.get('error')}")
+            elif event_type == "job_finished":
+                job_data = event
+                break
+
+    # Conexão encerrada antes do fim do job: acompanha o status por polling
+    if job_data is None:
+        job_data = client.wait_for_job(job_id)
+    if job_data.get("status") != "done":
+        raise Exception(f"Erro do backend: {job_data.get('error', 'job não finalizado')}")
+    return job_data
+
+
+def get_excel_workbook(uploaded_file):
+    """Workbook do upload atual, aberto uma vez por arquivo e guardado na sessão"""
+    file_key = getattr(uploaded_file, "file_id", None) or f"{uploaded_file.name}:{uploaded_file.size}"
+    cached = st.session_state.get("excel_workbook")
+    if cached is not None and cached[0] == file_key:
+        return cached[1]
+    workbook = ExcelWorkbook(uploaded_file.getvalue(), uploaded_file.name)
+    # Mantém apenas o último arquivo enviado (as abas já lidas ficam em cache no workbook)
+    st.session_state["excel_workbook"] = (file_key, workbook)
+    return workbook
+
+
+def get_upload_hash(uploaded_file):
+    """Hash do conteúdo do upload atual, calculado uma vez por arquivo e guardado na sessão"""
+    file_key = getattr(uploaded_file, "file_id", None) or f"{uploaded_file.name}:{uploaded_file.size}"
+    cached = st.session_state.get("upload_hash")
+    if cached is not None and cached[0] == file_key:
+        return cached[1]
+    digest = content_hash(uploaded_file.getvalue())
+    st.session_state["upload_hash"] = (file_key, digest)
+    return digest
+
+
+def get_dataset_id(client, uploaded_file, selected_sheet):
+    """dataset_id do arquivo no backend (consultado/enviado uma vez por arquivo); None se não der para usar
+
+    O backend guarda só a primeira aba das planilhas Excel: com outra aba
+    selecionada o resumo local continua indo em data_context.
+    """
+    if selected_sheet and selected_sheet != get_excel_workbook(uploaded_file).sheet_names[0]:
+        return None
+    file_hash = get_upload_hash(uploaded_file)
+    known = st.session_state.setdefault("dataset_ids", {})
+    if file_hash not in known:
+        try:
+            known[file_hash] = client.ensure_dataset(file_hash, uploaded_file.getvalue(), uploaded_file.name,
+                                                     on_retry=show_retry)
+        except requests.exceptions.RequestException as e:
+            st.write(f"⚠️ Arquivo não enviado ao backend ({e}); o resumo vai junto do pedido")
+            return None
+    return known[file_hash]
+
+
+@st.cache_data(max_entries=UPLOAD_CACHE_ENTRIES, ttl=UPLOAD_CACHE_TTL, show_spinner=False)
+def load_upload(file_hash, file_name, sheet, _uploaded_file):
+    """Lê, limpa e perfila o arquivo enviado, em cache por hash do conteúdo + nome + aba
+
+    Devolve o DataFrame (a amostra, no modo em blocos), o perfil das colunas,
+    o total de linhas e os avisos de leitura a mostrar na tela.
+    """
+    lower_name = file_name.lower()
+    is_excel = lower_name.endswith(('.xlsx', '.xls'))
+    is_csv = lower_name.endswith('.csv')
+    notes = []
+    stream_summary = None  # Preenchido no modo de leitura em blocos
+
+    if is_excel:
+        # Workbook aberto uma única vez por upload; só a aba escolhida é lida
+        try:
+            workbook = get_excel_workbook(_uploaded_file)
+            df = workbook.sheet(sheet)
+        except ExcelReadError as e:
+            raise Exception(f"Erro ao ler arquivo Excel: {e}")
+        if len(workbook.sheet_names) > 1:
+            notes.append(f"📑 Arquivo Excel com {len(workbook.sheet_names)} abas. Usando a aba: **{sheet or workbook.sheet_names[0]}**")
+
+    elif is_csv and getattr(_uploaded_file, "size", 0) > STREAMING_THRESHOLD_MB * 1024 * 1024:
+        # Arquivo grande: lê em blocos dentro do orçamento de memória e
+        # mantém só uma amostra uniforme para os gráficos
+        try:
+            stream_summary = load_csv_chunked(_uploaded_file)
+        except CsvReadError as e:
+            raise Exception(f"Não foi possível ler o arquivo CSV. {e}")
+        finally:
+            _uploaded_file.seek(0)
+        df = stream_summary.sample()
+        notes.append(f"📦 Arquivo grande lido em blocos: **{stream_summary.rows}** linhas. Os gráficos usam uma amostra de **{len(df)}** linhas.")
+
+    elif is_csv:
+        # Lê o CSV uma única vez: codificação e separador vêm de uma amostra do início
+        try:
+            df, csv_dialect = read_csv_bytes(_uploaded_file.getvalue())
+        except CsvReadError as e:
+            raise Exception(f"Não foi possível ler o arquivo CSV. {e}")
+        encoding_used = csv_dialect["encoding"]
+        if encoding_used and encoding_used != 'utf-8':
+            notes.append(f"📝 Arquivo CSV lido com codificação: **{encoding_used}**")
+    else:
+        raise Exception(f"Formato de arquivo não suportado: {file_name}")
+
+    if stream_summary is not None:
+        # Estatísticas já calculadas sobre o arquivo inteiro durante a leitura
+        data_profile = stream_summary.to_profile()
+    else:
+        # Limpeza básica dos dados: remove linhas e colunas completamente vazias
+        # (uma única máscara de nulos e uma única cópia)
+        empty_mask = df.isna()
+        df = df.loc[~empty_mask.all(axis=1), ~empty_mask.all(axis=0)]
+        data_profile = profile_dataframe(df)
+
+    return {
+        "df": df,
+        "profile": data_profile,
+        "file_type": "Excel" if is_excel else "CSV",
+        "total_rows": stream_summary.rows if stream_summary is not None else df.shape[0],
+        "notes": notes,
+    }
+
+
+@st.cache_data(max_entries=UPLOAD_CACHE_ENTRIES, ttl=UPLOAD_CACHE_TTL, show_spinner=False)
+def summarize_upload(file_hash, file_name, sheet, file_type, _data_profile):
+    """Resumo compacto (colunas mais relevantes primeiro) dentro do orçamento de tokens, em cache com o upload"""
+    return build_data_context(_data_profile, file_name, file_type)
+
+
+@st.cache_resource
+def get_dashboard_store():
+    """Dashboards gerados salvos em disco (compartilhado entre sessões)"""
+    return DashboardStore()
+
+
+@st.cache_resource
+def get_sandbox_pool():
+    """Workers isolados (e pré-aquecidos) que executam o código gerado; None executa no processo"""
+    return SandboxPool() if SANDBOX_ENABLED else None
+
+
+def render_dashboard(dashboard):
+    """Desenha o dashboard salvo na sessão (código já compilado; sem chamar o backend)"""
+    st.subheader("Visualização")
+    if dashboard.get("spec") is not None:
+        # Especificação validada: desenhada pelo renderizador interno, sem executar código
+        for warning in dashboard.get("spec_warnings", []):
+            st.warning(f"⚠️ {warning}")
+        render_spec(DashboardSpec.model_validate(dashboard["spec"]), dashboard["df"], dashboard["key"])
+        return
+    if dashboard.get("spec_error"):
+        st.error(f"❌ A especificação do dashboard é inválida: {dashboard['spec_error']}")
+        st.write(dashboard.get("raw_result", ""))
+        return
+
+    code_to_run = dashboard.get("code")
+    if not code_to_run:
+        st.info("A IA não retornou um bloco de código executável. Veja a análise abaixo:")
+        st.write(dashboard.get("raw_result", ""))
+        return
+
+    df = dashboard.get("df")
+    pool = get_sandbox_pool()
+    try:
+        if pool is not None:
+            # Executa em um worker com limites de CPU/memória e reproduz aqui o que foi desenhado;
+            # os valores atuais dos widgets do dashboard vão junto para manter os filtros
+            widget_values = {k: st.session_state[k] for k in dashboard.get("widget_keys", []) if k in st.session_state}
+            result = pool.run(
+                code_to_run,
+                data_key=dashboard["key"],
+                df=df,
+                widget_values=widget_values,
+                key_prefix=f"dash_{dashboard['key'][:8]}_",
+            )
+            dashboard["widget_keys"] = result["widget_keys"]
+            replay(result)
+        else:
+            run_dashboard(code_to_run, df) # Executa o código gerado na tela
+    except SandboxError as sandbox_error:
+        st.error(f"⛔ {sandbox_error}")
+        st.code(code_to_run, language='python')
+    except Exception as exec_error:
+        error_msg = str(exec_error)
+        st.error(f"Erro ao renderizar gráficos: {error_msg}")
+
+        # Mostra informações úteis sobre o DataFrame se houver erro
+        if df is not None:
+            cols_list = ', '.join([f"'{col}'" for col in df.columns.tolist()])
+            st.info(f"📊 **Colunas disponíveis no DataFrame:** {cols_list}")
+            st.info(f"📏 **Dimensões:** {df.shape[0]} linhas x {df.shape[1]} colunas")
+
+            # Se o erro menciona uma coluna específica, mostra ajuda
+            if "'" in error_msg or '"' in error_msg:
+                # Tenta extrair o nome da coluna do erro
+                col_match = re.search(r"['\"]([^'\"]+)['\"]", error_msg)
+                if col_match:
+                    col_name = col_match.group(1)
+                    if col_name not in df.columns.tolist():
+                        st.warning(f"⚠️ A coluna '{col_name}' não existe no DataFrame. Verifique o nome exato das colunas acima.")
+
+        st.code(code_to_run, language='python')
+
 # Mostra informações do backend na sidebar (apenas em desenvolvimento)
 if os.getenv('STREAMLIT_ENV') != 'production':
     with st.sidebar:
@@ -101,9 +387,6 @@ if ferramenta == "✍️ Gerador de Copy":
                     'url': url_input
                 }
                 
-                st.write("🔍 **Agente 1:** Pesquisador de Mercado está analisando...")
-                st.write("📝 **Agente 2:** Copywriter está escrevendo...")
-                st.write("✅ **Agente 3:** Editor Chefe finalizou o polimento...")
 
                 try:
                     # Prepara a requisição para o backend
@@ -123,22 +406,23 @@ if ferramenta == "✍️ Gerador de Copy":
                     }
                     
                     # Faz requisição ao backend
-                    api_url = f"{BACKEND_URL}/api/copywriting"
                     st.write(f"🌐 Conectando ao backend: {BACKEND_URL}")
                     
-                    response = requests.post(
-                        api_url,
-                        json=payload,
-                        timeout=300  # 5 minutos de timeout (processamento pode demorar)
-                    )
+                    # O backend enfileira o job (202) ou responde direto do cache (200)
+                    response = get_backend_client().post("/api/copywriting", json=payload, on_retry=show_retry)
                     
                     # Verifica o content-type antes de tentar fazer parse JSON
                     content_type = response.headers.get('content-type', '')
                     
-                    if response.status_code == 200:
+                    if response.status_code in (200, 202):
                         try:
                             if 'application/json' in content_type:
                                 result_data = response.json()
+                                if response.status_code == 202:
+                                    # Acompanha o progresso das tasks em tempo real
+                                    result_data = follow_job(result_data["job_id"])
+                                else:
+                                    st.write("⚡ Resultado recuperado do cache.")
                                 copy_text = result_data.get("result", "")
                                 
                                 if not copy_text:
@@ -210,6 +494,9 @@ if ferramenta == "✍️ Gerador de Copy":
 # ==============================================================================
 elif ferramenta == "📊 Dashboard Automático":
     
+    # Inicia (uma vez) os workers que executam o código gerado, enquanto o usuário envia os dados
+    get_sandbox_pool()
+    
     st.title("📊 Dashboard Automático Inteligente")
     st.markdown("Envie uma planilha CSV ou Excel e receba um dashboard dinâmico e personalizado automaticamente!")
 
@@ -224,6 +511,16 @@ elif ferramenta == "📊 Dashboard Automático":
             help="Faça upload de um arquivo CSV ou Excel para análise automática"
         )
         
+        # Planilhas Excel com várias abas: escolha da aba (trocar de aba não relê o arquivo)
+        selected_sheet = None
+        if uploaded_file is not None and uploaded_file.name.lower().endswith(('.xlsx', '.xls')):
+            try:
+                sheet_names = get_excel_workbook(uploaded_file).sheet_names
+                if len(sheet_names) > 1:
+                    selected_sheet = st.selectbox("Aba da planilha:", sheet_names)
+            except ExcelReadError as e:
+                st.error(f"Erro ao abrir o arquivo Excel: {e}")
+        
         st.markdown("---")
         st.markdown("**OU**")
         st.markdown("---")
@@ -234,8 +531,21 @@ elif ferramenta == "📊 Dashboard Automático":
             height=200,
             placeholder="Ex: Gastamos R$ 5000 no Google Ads, tivemos 200 leads e 15 vendas. O CPC foi R$ 25."
         )
+        dashboard_format = st.radio(
+            "Formato do dashboard:",
+            ["Especificação (renderizador interno)", "Código Python"],
+            help="A especificação é validada e desenhada sem executar código; vale para arquivos enviados.",
+        )
+        regenerate_dash = st.checkbox("🔄 Gerar um novo dashboard (ignorar o já salvo)", value=False)
         generate_dash_btn = st.button("📈 Gerar Gráficos", type="primary")
 
+    # Origem dos dados: o dashboard guardado na sessão só é redesenhado para a mesma origem
+    if uploaded_file is not None:
+        file_key = getattr(uploaded_file, "file_id", None) or f"{uploaded_file.name}:{uploaded_file.size}"
+        dashboard_source = f"arquivo:{file_key}:{selected_sheet or ''}"
+    else:
+        dashboard_source = f"texto:{(data_input or '').strip()}"
+
     if generate_dash_btn:
         # Validação melhorada: verifica se há dados válidos (não vazios)
         has_text_data = data_input and data_input.strip()
@@ -254,154 +564,21 @@ elif ferramenta == "📊 Dashboard Automático":
                 
                 if uploaded_file is not None:
                     try:
-                        import io
-                        import chardet
-                        
-                        # Detecta o tipo de arquivo pela extensão
-                        file_name = uploaded_file.name.lower()
-                        is_excel = file_name.endswith(('.xlsx', '.xls'))
-                        is_csv = file_name.endswith('.csv')
-                        
-                        df = None
-                        encoding_used = None
-                        
-                        if is_excel:
-                            # Lê arquivo Excel
-                            try:
-                                # Tenta ler todas as abas e pega a primeira
-                                uploaded_file.seek(0)
-                                
-                                # Tenta primeiro com openpyxl (para .xlsx)
-                                try:
-                                    excel_file = pd.ExcelFile(uploaded_file, engine='openpyxl')
-                                    sheet_names = excel_file.sheet_names
-                                    df = pd.read_excel(uploaded_file, sheet_name=sheet_names[0], engine='openpyxl')
-                                    
-                                    if len(sheet_names) > 1:
-                                        st.info(f"📑 Arquivo Excel com {len(sheet_names)} abas. Usando a primeira aba: **{sheet_names[0]}**")
-                                except Exception as e1:
-                                    # Tenta com xlrd (para .xls antigos)
-                                    try:
-                                        uploaded_file.seek(0)
-                                        excel_file = pd.ExcelFile(uploaded_file, engine='xlrd')
-                                        sheet_names = excel_file.sheet_names
-                                        df = pd.read_excel(uploaded_file, sheet_name=sheet_names[0], engine='xlrd')
-                                        
-                                        if len(sheet_names) > 1:
-                                            st.info(f"📑 Arquivo Excel com {len(sheet_names)} abas. Usando a primeira aba: **{sheet_names[0]}**")
-                                    except Exception as e2:
-                                        # Se ambos falharem, tenta sem especificar engine
-                                        try:
-                                            uploaded_file.seek(0)
-                                            df = pd.read_excel(uploaded_file)
-                                        except Exception as e3:
-                                            raise Exception(f"Erro ao ler arquivo Excel. Tente instalar openpyxl (pip install openpyxl) ou xlrd (pip install xlrd). Erros: {str(e1)}, {str(e2)}, {str(e3)}")
-                                
-                            except Exception as e:
-                                raise Exception(f"Erro ao ler arquivo Excel: {str(e)}. Certifique-se de que openpyxl ou xlrd estão instalados.")
-                        
-                        elif is_csv:
-                            # Lê arquivo CSV com suporte a múltiplas codificações
-                            file_bytes = uploaded_file.read()
-                            uploaded_file.seek(0)
-                            
-                            # Detecta a codificação do arquivo
-                            detected = chardet.detect(file_bytes)
-                            encoding = detected.get('encoding', 'utf-8')
-                            confidence = detected.get('confidence', 0)
-                            
-                            # Lista de codificações para tentar (em ordem de prioridade)
-                            encodings_to_try = [
-                                encoding if confidence > 0.7 else None,
-                                'utf-8',
-                                'latin-1',
-                                'iso-8859-1',
-                                'cp1252',
-                                'windows-1252',
-                                'utf-8-sig'
-                            ]
-                            
-                            encodings_to_try = [e for e in encodings_to_try if e is not None]
-                            
-                            last_error = None
-                            
-                            # Tenta cada codificação até uma funcionar
-                            for enc in encodings_to_try:
-                                try:
-                                    uploaded_file.seek(0)
-                                    # Tenta primeiro com separador padrão (vírgula)
-                                    df = pd.read_csv(io.BytesIO(file_bytes), encoding=enc, sep=',')
-                                    
-                                    # Se o DataFrame tem apenas 1 coluna, tenta com ponto e vírgula
-                                    if df.shape[1] == 1:
-                                        uploaded_file.seek(0)
-                                        df = pd.read_csv(io.BytesIO(file_bytes), encoding=enc, sep=';')
-                                    
-                                    # Se ainda tem apenas 1 coluna, tenta com tab
-                                    if df.shape[1] == 1:
-                                        uploaded_file.seek(0)
-                                        df = pd.read_csv(io.BytesIO(file_bytes), encoding=enc, sep='\t')
-                                    
-                                    encoding_used = enc
-                                    break
-                                except (UnicodeDecodeError, UnicodeError) as e:
-                                    last_error = e
-                                    continue
-                                except Exception as e:
-                                    last_error = e
-                                    continue
-                            
-                            if df is None:
-                                raise Exception(f"Não foi possível ler o arquivo CSV. Tentadas codificações: {', '.join(encodings_to_try)}. Último erro: {last_error}")
-                            
-                            if encoding_used and encoding_used != 'utf-8':
-                                st.info(f"📝 Arquivo CSV lido com codificação: **{encoding_used}**")
-                        else:
-                            raise Exception(f"Formato de arquivo não suportado: {uploaded_file.name}")
-                        
-                        # Limpeza básica dos dados
-                        # Remove colunas completamente vazias
-                        df = df.dropna(axis=1, how='all')
-                        # Remove linhas completamente vazias
-                        df = df.dropna(axis=0, how='all')
-                        
-                        # Cria um resumo do arquivo (limitado para não exceder tokens)
-                        max_rows_summary = min(10, df.shape[0])
-                        
-                        # Pega uma amostra representativa
-                        if df.shape[0] > max_rows_summary:
-                            sample_df = pd.concat([
-                                df.head(max_rows_summary // 2),
-                                df.tail(max_rows_summary // 2)
-                            ])
-                        else:
-                            sample_df = df
-                        
-                        # Estatísticas resumidas
-                        numeric_cols = df.select_dtypes(include=['number']).columns.tolist()
-                        stats_summary = ""
-                        if len(numeric_cols) > 0:
-                            stats_summary = f"\n- Estatísticas das colunas numéricas:\n{df[numeric_cols].describe().to_string()}"
+                        # Leitura, limpeza e perfil em cache pelo hash do arquivo: gerar de novo
+                        # com o mesmo arquivo (e a mesma aba) vai direto para a chamada ao backend
+                        file_hash = get_upload_hash(uploaded_file)
+                        upload = load_upload(file_hash, uploaded_file.name, selected_sheet, uploaded_file)
+                        df = upload["df"]
+                        file_type = upload["file_type"]
+                        for note in upload["notes"]:
+                            st.info(note)
                         
-                        file_type = "Excel" if is_excel else "CSV"
-                        csv_summary = f"""
-                        ARQUIVO {file_type} CARREGADO:
-                        - Nome do arquivo: {uploaded_file.name}
-                        - Dimensões: {df.shape[0]} linhas x {df.shape[1]} colunas
-                        - Colunas: {', '.join(df.columns.tolist())}
-                        - Tipos de dados: {dict(df.dtypes)}
-                        - Amostra de dados (primeiras e últimas linhas):
-                        {sample_df.to_string()}
-                        {stats_summary}
-                        
-                        NOTA: O DataFrame completo está disponível como 'df' com {df.shape[0]} linhas.
-                        Use df diretamente no código, não precisa incluir todos os dados aqui.
-                        """
+                        csv_summary = summarize_upload(file_hash, uploaded_file.name, selected_sheet, file_type, upload["profile"])
                         
                         csv_data = True
                         data_context = csv_summary
                         
-                        st.write(f"✅ Arquivo {file_type} carregado: **{uploaded_file.name}** ({df.shape[0]} linhas, {df.shape[1]} colunas)")
+                        st.write(f"✅ Arquivo {file_type} carregado: **{uploaded_file.name}** ({upload['total_rows']} linhas, {df.shape[1]} colunas)")
                         st.write(f"📊 Colunas: {', '.join(df.columns.tolist())}")
                         
                         # Mostra preview dos dados
@@ -431,27 +608,25 @@ elif ferramenta == "📊 Dashboard Automático":
                     'data_context': str(data_context)  # Garantir que seja string
                 }
                 
+                # Especificação JSON só com o DataFrame carregado (o renderizador agrega o 'df')
+                use_spec = dashboard_format.startswith("Especificação") and csv_data and df is not None
+
                 # Instrução específica para o Agente focar em Código Python/Streamlit
-                if csv_data:
-                    # Prepara informações sobre as colunas disponíveis
-                    df_columns = df.columns.tolist() if df is not None else []
-                    columns_list = ', '.join([f"'{col}'" for col in df_columns])
-                    columns_info = f"Colunas disponíveis no DataFrame: {columns_list}"
-                    
+                if use_spec:
+                    # As instruções do formato JSON são acrescentadas pelo backend
+                    inputs['definicao_do_sistema'] = ""
+                elif csv_data:
+                    # O resumo do arquivo vai para a crew em data_context (seção DADOS RECEBIDOS)
                     inputs['definicao_do_sistema'] = f"""
                     Você é um Data Scientist Senior Especialista em Streamlit e Visualização de Dados.
-                    O usuário forneceu um arquivo com os seguintes dados:
-                    
-                    {csv_summary}
-                    
-                    {columns_info}
+                    O usuário forneceu um arquivo cujo esquema, estatísticas e amostra estão em DADOS RECEBIDOS.
                     
                     REGRAS CRÍTICAS: 
                     - O DataFrame já está carregado e disponível APENAS como variável 'df' (não 'data_df', não 'df_data', apenas 'df').
                     - NÃO crie novas variáveis de DataFrame. Use APENAS 'df'.
                     - NÃO tente ler o arquivo novamente usando pd.read_csv() ou pd.read_excel().
                     - Use APENAS a variável 'df' que já contém todos os dados.
-                    - Use APENAS as colunas listadas acima. Verifique se a coluna existe antes de usá-la.
+                    - Use APENAS as colunas listadas em DADOS RECEBIDOS. Verifique se a coluna existe antes de usá-la.
                     - Se uma coluna tiver espaços, use df['Nome da Coluna'] (com aspas).
                     - Sempre verifique se as colunas existem: if 'coluna' in df.columns:
                     - NÃO renomeie o DataFrame. Use 'df' diretamente.
@@ -474,6 +649,9 @@ elif ferramenta == "📊 Dashboard Automático":
                       * Para correlações: heatmaps ou scatter plots
                     - Use plotly.express para gráficos interativos e bonitos (px.bar, px.line, px.scatter, px.histogram, etc)
                     - Se plotly não estiver disponível, use st.bar_chart, st.line_chart, st.area_chart
+                    - O 'px' do ambiente já reduz os dados de gráficos grandes (no máximo MAX_PLOT_POINTS pontos por figura)
+                    - Funções já disponíveis (sem import) para preparar os dados antes de plotar: group_aggregate(df, by, coluna, 'sum'),
+                      downsample(df, x, y) (séries longas, LTTB), sample_rows(df) e bin_counts(valores, bins)
                     - Adicione títulos descritivos aos gráficos
                     
                     KPIs E MÉTRICAS:
@@ -534,7 +712,7 @@ elif ferramenta == "📊 Dashboard Automático":
                 else:
                     inputs['definicao_do_sistema'] = f"""
                     Você é um Data Scientist Senior Especialista em Streamlit e Visualização de Dados.
-                    Sua tarefa é analisar os seguintes dados: "{data_context}".
+                    Sua tarefa é analisar os dados descritos em DADOS RECEBIDOS.
                     
                     Crie um script Python COMPLETO usando 'streamlit' para gerar um DASHBOARD SUPER BONITO, INTUITIVO E DINÂMICO:
                     
@@ -555,190 +733,113 @@ elif ferramenta == "📊 Dashboard Automático":
                         "topic": inputs.get('topic', 'Análise de Dados de Marketing'),
                         "definicao_do_sistema": inputs.get('definicao_do_sistema', '')
                     }
+                    if use_spec:
+                        payload["output_format"] = "spec"
                     
-                    # Faz requisição ao backend
-                    api_url = f"{BACKEND_URL}/api/dashboard"
-                    st.write(f"🌐 Conectando ao backend: {BACKEND_URL}")
-                    
-                    response = requests.post(
-                        api_url,
-                        json=payload,
-                        timeout=300  # 5 minutos de timeout
-                    )
+                    # Dashboard salvo para os mesmos dados + prompt: não chama o backend de novo
+                    if uploaded_file is not None:
+                        key_source = f"{get_upload_hash(uploaded_file)}:{selected_sheet or ''}"
+                    else:
+                        key_source = "texto"
+                    key = dashboard_key(key_source, payload)
+                    dashboard = None if regenerate_dash else get_dashboard_store().get(key)
+
+                    if dashboard is not None:
+                        st.write("♻️ Dashboard já gerado para estes dados — reaproveitado sem chamar o backend")
+                        status.update(label="Dashboard Criado!", state="complete", expanded=False)
+                    else:
+                        # Faz requisição ao backend
+                        st.write(f"🌐 Conectando ao backend: {BACKEND_URL}")
+                        client = get_backend_client()
+
+                        # Arquivo já guardado no backend: manda só o dataset_id e o perfil salvo
+                        # vira o data_context lá (sem reenviar o resumo a cada geração)
+                        request_payload = payload
+                        dataset_id = get_dataset_id(client, uploaded_file, selected_sheet) if uploaded_file is not None else None
+                        if dataset_id:
+                            request_payload = {k: v for k, v in payload.items() if k != "data_context"}
+                            request_payload["dataset_id"] = dataset_id
+
+                        # O backend enfileira o job (202); o resultado é acompanhado por polling
+                        response = client.post("/api/dashboard", json=request_payload, on_retry=show_retry)
+                        if response.status_code == 404 and dataset_id:
+                            # Dataset expirado no backend: esquece o id e manda o resumo local
+                            st.session_state["dataset_ids"].pop(get_upload_hash(uploaded_file), None)
+                            response = client.post("/api/dashboard", json=payload, on_retry=show_retry)
                     
-                    # Verifica o content-type antes de tentar fazer parse JSON
-                    content_type = response.headers.get('content-type', '')
+                        # Verifica o content-type antes de tentar fazer parse JSON
+                        content_type = response.headers.get('content-type', '')
                     
-                    if response.status_code == 200:
-                        try:
-                            if 'application/json' in content_type:
-                                result_data = response.json()
-                                raw_result = result_data.get("result", result_data.get("raw", ""))
-                            else:
-                                # Se não for JSON, usa o texto direto
-                                raw_result = response.text
-                                if not raw_result:
-                                    raw_result = "Nenhum resultado retornado."
+                        if response.status_code in (200, 202):
+                            try:
+                                result_data = {}
+                                if 'application/json' in content_type:
+                                    result_data = response.json()
+                                    if response.status_code == 202:
+                                        started = time.time()
+
+                                        def show_job_status(job):
+                                            label = "Na fila do backend" if job.get("status") == "queued" else "Gerando o dashboard"
+                                            status.update(label=f"{label}... ({time.time() - started:.0f} s)")
+
+                                        result_data = client.wait_for_job(result_data["job_id"], on_status=show_job_status)
+                                        if result_data.get("status") != "done":
+                                            raise Exception(f"Erro do backend: {result_data.get('error', 'job não finalizado')}")
+                                    raw_result = result_data.get("result", result_data.get("raw", ""))
+                                else:
+                                    # Se não for JSON, usa o texto direto
+                                    raw_result = response.text
+                                    if not raw_result:
+                                        raw_result = "Nenhum resultado retornado."
                             
-                            status.update(label="Dashboard Criado!", state="complete", expanded=False)
-                        except ValueError as json_error:
-                            # Erro ao fazer parse JSON
-                            st.error(f"❌ Erro ao processar resposta JSON: {json_error}")
-                            st.write(f"📄 Resposta recebida (texto): {response.text[:500]}")
-                            raise Exception(f"Resposta do backend não é JSON válido: {response.text[:200]}")
-                    else:
-                        # Trata erros HTTP
-                        try:
-                            if 'application/json' in content_type:
-                                error_data = response.json()
-                                error_msg = error_data.get("detail", error_data.get("message", f"Erro {response.status_code}"))
-                            else:
+                                status.update(label="Dashboard Criado!", state="complete", expanded=False)
+                            except ValueError as json_error:
+                                # Erro ao fazer parse JSON
+                                st.error(f"❌ Erro ao processar resposta JSON: {json_error}")
+                                st.write(f"📄 Resposta recebida (texto): {response.text[:500]}")
+                                raise Exception(f"Resposta do backend não é JSON válido: {response.text[:200]}")
+                        else:
+                            # Trata erros HTTP
+                            try:
+                                if 'application/json' in content_type:
+                                    error_data = response.json()
+                                    error_msg = error_data.get("detail", error_data.get("message", f"Erro {response.status_code}"))
+                                else:
+                                    error_msg = f"Erro {response.status_code}: {response.text[:200]}"
+                            except ValueError:
                                 error_msg = f"Erro {response.status_code}: {response.text[:200]}"
-                        except ValueError:
-                            error_msg = f"Erro {response.status_code}: {response.text[:200]}"
-                        raise Exception(f"Erro do backend: {error_msg}")
-                    
-                    st.subheader("Visualização")
+                            raise Exception(f"Erro do backend: {error_msg}")
                     
-                    # Tenta extrair e rodar o código Python gerado pela IA
-                    code_match = re.search(r'```python\n(.*?)```', raw_result, re.DOTALL)
-                    if code_match:
-                        code_to_run = code_match.group(1)
-                        try:
-                            # Verifica e instala dependências necessárias se não estiverem disponíveis
-                            import subprocess
-                            import sys
-                            dependencies_to_check = ['plotly', 'pandas', 'openpyxl']
-                            for dep in dependencies_to_check:
-                                try:
-                                    __import__(dep)
-                                except ImportError:
-                                    st.info(f"📦 Instalando {dep}...")
-                                    try:
-                                        subprocess.check_call([sys.executable, "-m", "pip", "install", dep, "-q"], 
-                                                             stderr=subprocess.DEVNULL, stdout=subprocess.DEVNULL)
-                                        st.success(f"✅ {dep} instalado com sucesso!")
-                                    except:
-                                        st.warning(f"⚠️ Não foi possível instalar {dep} automaticamente. Algumas funcionalidades podem não estar disponíveis.")
-                            
-                            # Se houver CSV, disponibiliza o DataFrame no contexto de execução
-                            if csv_data and df is not None:
-                                # Usa o DataFrame já carregado anteriormente (não precisa recarregar)
-                                # Remove qualquer tentativa de ler o arquivo do código gerado
-                                import re
-                                
-                                # Remove linhas problemáticas do código gerado
-                                code_lines = code_to_run.split('\n')
-                                filtered_lines = []
-                                for line in code_lines:
-                                    # Remove linhas que tentam ler arquivos (CSV ou Excel)
-                                    if ('pd.read_csv' in line or 'pd.read_excel' in line) and ('uploaded_file' not in line.lower() and 'io.BytesIO' not in line):
-                                        # Pula esta linha - o DataFrame já está disponível
-                                        continue
-                                    # Remove tentativas de criar variáveis de DataFrame (data_df, df_data, etc)
-                                    if re.search(r'\b(data_df|df_data|df_copy|data)\s*=', line) and 'df' in line.lower():
-                                        # Substitui por comentário ou remove
-                                        continue
-                                    # Substitui referências a data_df por df
-                                    if 'data_df' in line:
-                                        line = line.replace('data_df', 'df')
-                                    filtered_lines.append(line)
-                                
-                                code_to_run = '\n'.join(filtered_lines)
-                                
-                                # Usa o DataFrame já carregado
-                                # Importa bibliotecas necessárias para o contexto de execução
-                                try:
-                                    import plotly.express as px
-                                    import plotly.graph_objects as go
-                                    plotly_available = True
-                                except ImportError:
-                                    plotly_available = False
-                                    px = None
-                                    go = None
-                                
-                                try:
-                                    import numpy as np
-                                except ImportError:
-                                    np = None
-                                
-                                exec_globals = {
-                                    'pd': pd,
-                                    'pandas': pd,
-                                    'st': st,
-                                    'streamlit': st,
-                                    'df': df,  # Usa o DataFrame já carregado
-                                    'np': np,
-                                    'numpy': np,
-                                }
-                                
-                                # Adiciona plotly se disponível
-                                if plotly_available:
-                                    exec_globals['px'] = px
-                                    exec_globals['plotly'] = __import__('plotly')
-                                    exec_globals['go'] = go
-                                
-                                # Remove None do dict
-                                exec_globals = {k: v for k, v in exec_globals.items() if v is not None}
-                                
-                                exec(code_to_run, exec_globals) # Executa o código gerado na tela
-                            else:
-                                # Para dados de texto, executa normalmente
-                                try:
-                                    import plotly.express as px
-                                    import plotly.graph_objects as go
-                                    plotly_available = True
-                                except ImportError:
-                                    plotly_available = False
-                                    px = None
-                                    go = None
-                                
-                                try:
-                                    import numpy as np
-                                except ImportError:
-                                    np = None
-                                
-                                exec_globals = {
-                                    'pd': pd,
-                                    'pandas': pd,
-                                    'st': st,
-                                    'streamlit': st,
-                                    'np': np,
-                                    'numpy': np,
-                                }
-                                
-                                if plotly_available:
-                                    exec_globals['px'] = px
-                                    exec_globals['plotly'] = __import__('plotly')
-                                    exec_globals['go'] = go
-                                
-                                exec_globals = {k: v for k, v in exec_globals.items() if v is not None}
-                                exec(code_to_run, exec_globals) # Executa o código gerado na tela
-                        except Exception as exec_error:
-                            error_msg = str(exec_error)
-                            st.error(f"Erro ao renderizar gráficos: {error_msg}")
-                            
-                            # Mostra informações úteis sobre o DataFrame se houver erro
-                            if csv_data and df is not None:
-                                cols_list = ', '.join([f"'{col}'" for col in df.columns.tolist()])
-                                st.info(f"📊 **Colunas disponíveis no DataFrame:** {cols_list}")
-                                st.info(f"📏 **Dimensões:** {df.shape[0]} linhas x {df.shape[1]} colunas")
-                                
-                                # Se o erro menciona uma coluna específica, mostra ajuda
-                                if "'" in error_msg or '"' in error_msg:
-                                    import re
-                                    # Tenta extrair o nome da coluna do erro
-                                    col_match = re.search(r"['\"]([^'\"]+)['\"]", error_msg)
-                                    if col_match:
-                                        col_name = col_match.group(1)
-                                        if col_name not in df.columns.tolist():
-                                            st.warning(f"⚠️ A coluna '{col_name}' não existe no DataFrame. Verifique o nome exato das colunas acima.")
-                            
-                            st.code(code_to_run, language='python')
-                    else:
-                        st.info("A IA não retornou um bloco de código executável. Veja a análise abaixo:")
-                        st.write(raw_result)
-                        
+
+                        if use_spec:
+                            # Especificação conferida contra as colunas do 'df' antes de ser salva
+                            spec, spec_warnings, spec_error = None, [], result_data.get("spec_error")
+                            try:
+                                spec = DashboardSpec.model_validate(result_data["spec"]) if result_data.get("spec") else parse_spec(raw_result)
+                                spec_warnings = validate_columns(spec, df.columns.tolist())
+                            except (SpecError, ValueError) as e:
+                                spec, spec_error = None, str(e)
+                            dashboard = get_dashboard_store().put(
+                                key, raw_result, None,
+                                spec=spec.model_dump() if spec is not None else None,
+                                spec_warnings=spec_warnings,
+                                spec_error=spec_error,
+                            )
+                        else:
+                            # Extrai o código Python gerado pela IA (limpo e salvo uma única vez)
+                            code_to_run = extract_code(raw_result)
+                            if code_to_run and csv_data and df is not None:
+                                # Remove leituras do arquivo e cópias do DataFrame do código gerado
+                                code_to_run = sanitize_code(code_to_run)
+                            dashboard = get_dashboard_store().put(key, raw_result, code_to_run)
+
+                    # Guarda na sessão para redesenhar nos reruns (widgets do dashboard) sem nova chamada
+                    st.session_state["dashboard"] = {
+                        **dashboard,
+                        "source": dashboard_source,
+                        "df": df if csv_data else None,
+                    }
+
                 except requests.exceptions.Timeout:
                     status.update(label="Timeout", state="error")
                     st.error("⏱️ O processamento está demorando muito. Tente novamente ou use dados menores.")
@@ -764,4 +865,9 @@ elif ferramenta == "📊 Dashboard Automático":
                     st.error(f"❌ Erro na execução: {str(e)}")
                     import traceback
                     with st.expander("🔍 Detalhes do Erro"):
-                        st.code(traceback.format_exc())
\ No newline at end of file
+                        st.code(traceback.format_exc())
+
+    # Dashboard da sessão: redesenhado a cada rerun (ex.: filtros do próprio dashboard) sem chamar o backend
+    dashboard = st.session_state.get("dashboard")
+    if dashboard is not None and dashboard.get("source") == dashboard_source:
+        render_dashboard(dashboard)
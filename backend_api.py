@@ -1,13 +1,30 @@
-from fastapi import FastAPI, HTTPException
+import time
+_APP_IMPORT_STARTED = time.perf_counter()
+
+from fastapi import FastAPI, File, HTTPException, Request, UploadFile
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from pydantic import BaseModel
-from typing import Optional
+from typing import List, Literal, Optional
 import os
-import sys
+import asyncio
 import logging
 import json
-import re
-from pathlib import Path
+
+from batch import BATCH_MAX_CONCURRENCY, run_batch
+from crew_events import install_job_event_handlers, prepare_crew_for_jobs
+from crewai_patches import applied_patches, install_crewai_patches
+from crew_templates import CrewTemplateCache, import_crew_project
+from dashboard_spec import SPEC_INSTRUCTIONS, SpecError, parse_spec, validate_columns
+from datasets import DatasetError, DatasetStore, profile_summary
+from job_store import create_job_store
+from jobs import JobManager, QueueFullError, JOB_ERROR, current_job
+from log_filter import is_noise
+from metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, HTTP_REQUEST_SECONDS, JOBS, REGISTRY, render as render_metrics, track_cache
+from output_routing import install_output_dispatcher, job_output
+from result_cache import DiskCache, make_cache_key
+from stage_cache import StagedCrewRunner
+from startup import CREW_WARM_UP, CrewLoader, CrewLoadError
 
 # Configura logging para suprimir erros de eventos do CrewAI (não críticos)
 # Nota: Erros "Expecting value: line 1 column 1" em handlers de eventos do CrewAI
@@ -17,40 +34,7 @@ from pathlib import Path
 class CrewAIEventsFilter(logging.Filter):
     def filter(self, record):
         # Suprime mensagens relacionadas a erros de eventos do CrewAI
-        message = str(record.getMessage()).lower()
-        
-        # Lista expandida de palavras-chave que indicam erros de eventos
-        error_keywords = [
-            "crewai eventsbus",
-            "on_agent_logs_execution",
-            "expecting value: line 1 column 1",
-            "expecting value",
-            "expecting",  # Captura erros incompletos também
-            "jsondecodeerror",
-            "action 'none' don't exist",
-            "action 'n/a' don't exist",
-            "sync handler error",
-            "sync handler error in on_agent_logs_execution",
-        ]
-        
-        # Verifica se a mensagem contém alguma palavra-chave de erro
-        if any(keyword in message for keyword in error_keywords):
-            return False  # Não registra esta mensagem
-        
-        # Verifica também por padrões regex
-        error_patterns = [
-            r'\[CrewAIEventsBus\].*',
-            r'Expecting value.*line 1 column 1',
-            r"Action 'None' don't exist",
-            r"Action 'N/A' don't exist",
-            r"Action '.*' don't exist",  # Captura qualquer mensagem de ação inexistente
-        ]
-        
-        for pattern in error_patterns:
-            if re.search(pattern, message, re.IGNORECASE):
-                return False  # Não registra esta mensagem
-        
-        return True  # Registra outras mensagens
+        return not is_noise(str(record.getMessage()))
 
 # Aplica o filtro aos loggers do CrewAI
 crewai_logger = logging.getLogger("crewai")
@@ -71,288 +55,21 @@ warnings.filterwarnings("ignore", category=UserWarning, module="crewai")
 warnings.filterwarnings("ignore", message=".*Expecting value.*")
 warnings.filterwarnings("ignore", message=".*JSONDecodeError.*")
 
-# Patch para suprimir erros de JSON parsing no EventsBus do CrewAI
-from io import StringIO
-
-class FilteredIO:
-    """IO wrapper que filtra mensagens específicas do CrewAI EventsBus com buffer para capturar mensagens multi-linha"""
-    def __init__(self, original_io):
-        self.original_io = original_io
-        self.buffer = ""  # Buffer para acumular mensagens multi-linha
-        self.buffer_size_limit = 5000  # Limite do buffer para evitar acúmulo excessivo
-    
-    def write(self, text):
-        if not text:
-            return
-        
-        # Adiciona ao buffer
-        self.buffer += text
-        
-        # Limita o tamanho do buffer
-        if len(self.buffer) > self.buffer_size_limit:
-            # Mantém apenas as últimas linhas
-            lines = self.buffer.split('\n')
-            self.buffer = '\n'.join(lines[-50:])  # Mantém últimas 50 linhas
-        
-        # Verifica se deve filtrar baseado no buffer acumulado
-        should_filter = self._should_filter(self.buffer)
-        
-        # Se encontrar um erro de eventos, limpa o buffer e não escreve
-        if should_filter:
-            # Limpa o buffer completamente quando encontra erro
-            self.buffer = ""
-            return
-        
-        # Se o texto contém quebra de linha ou o buffer está grande, processa
-        if '\n' in text:
-            # Separa em linhas
-            lines = self.buffer.split('\n')
-            
-            # Verifica cada linha e as linhas anteriores para contexto
-            output_lines = []
-            for i, line in enumerate(lines):
-                # Verifica a linha atual e contexto (linhas anteriores próximas)
-                context = '\n'.join(lines[max(0, i-3):i+1])
-                
-                if not self._should_filter(context):
-                    output_lines.append(line)
-                # Se for erro, não adiciona à saída
-            
-            # Escreve apenas as linhas que não foram filtradas
-            if output_lines:
-                output = '\n'.join(output_lines)
-                if output.strip():  # Só escreve se houver conteúdo
-                    self.original_io.write(output)
-                    self.original_io.flush()
-            
-            # Limpa o buffer após processar
-            self.buffer = ""
-        elif len(self.buffer) > 500:
-            # Se o buffer está grande sem quebra de linha, verifica e escreve se OK
-            if not self._should_filter(self.buffer):
-                self.original_io.write(self.buffer)
-                self.original_io.flush()
-            self.buffer = ""
-    
-    def _should_filter(self, text):
-        """Verifica se o texto deve ser filtrado"""
-        if not text:
-            return False
-        
-        text_lower = text.lower()
-        
-        # Palavras-chave que indicam erro de eventos (verificação rápida)
-        error_keywords = [
-            'crewai eventsbus',
-            'on_agent_logs_execution',
-            'expecting value: line 1 column 1',
-            'expecting value',
-            'expecting',  # Captura erros incompletos também
-            'jsondecodeerror',
-            "action 'none' don't exist",
-            "action 'n/a' don't exist",
-            'sync handler error',
-            'sync handler error in on_agent_logs_execution',
-        ]
-        
-        # Verifica palavras-chave primeiro (mais rápido)
-        for keyword in error_keywords:
-            if keyword in text_lower:
-                return True
-        
-        # Padrões regex mais específicos
-        patterns_to_filter = [
-            r'\[CrewAIEventsBus\].*Sync handler error',
-            r'\[CrewAIEventsBus\].*Sync handler error.*on_agent_logs_execution',
-            r'\[CrewAIEventsBus\].*Expecting',
-            r'\[CrewAIEventsBus\].*Expecting.*',
-            r'\[CrewAIEventsBus\].*',  # Captura qualquer mensagem do CrewAIEventsBus
-            r'Expecting value: line 1 column 1 \(char 0\)',
-            r'Expecting value.*line 1 column 1',
-            r'Expecting.*',  # Captura qualquer erro que comece com "Expecting"
-            r'JSONDecodeError.*Expecting',
-            r'Sync handler error.*on_agent_logs_execution',
-            r'Sync handler error.*on_agent_logs_execution.*Expecting',
-            r"Action 'None' don't exist",
-            r"Action 'N/A' don't exist",
-            r"Action '.*' don't exist",  # Captura qualquer mensagem de ação inexistente
-        ]
-        
-        for pattern in patterns_to_filter:
-            if re.search(pattern, text, re.IGNORECASE | re.DOTALL):
-                return True
-        
-        return False
-    
-    def flush(self):
-        # Antes de fazer flush, verifica o buffer restante
-        if self.buffer and not self._should_filter(self.buffer):
-            self.original_io.write(self.buffer)
-            self.buffer = ""
-        self.original_io.flush()
-    
-    def __getattr__(self, name):
-        # Delega outros atributos/métodos para o IO original
-        return getattr(self.original_io, name)
-
-class SuppressCrewAIEventsErrors:
-    """Context manager para suprimir erros de eventos do CrewAI"""
-    def __init__(self):
-        self.original_stderr = sys.stderr
-        self.original_stdout = sys.stdout
-        self.filtered_stderr = FilteredIO(sys.stderr)
-        self.filtered_stdout = FilteredIO(sys.stdout)
-    
-    def __enter__(self):
-        sys.stderr = self.filtered_stderr
-        sys.stdout = self.filtered_stdout
-        return self
-    
-    def __exit__(self, exc_type, exc_val, exc_tb):
-        # Faz flush final dos buffers antes de restaurar
-        self.filtered_stderr.flush()
-        self.filtered_stdout.flush()
-        
-        sys.stderr = self.original_stderr
-        sys.stdout = self.original_stdout
-        return False  # Não suprime exceções reais
-
-# Garante que o projeto esteja no path
-BASE_DIR = Path(__file__).resolve().parent
-sys.path.append(str(BASE_DIR / "projeto_agente" / "src"))
-
-try:
-    from projeto_agente.create_crew_project import CreateCrewProject
-except Exception as e:
-    print("❌ ERRO IMPORTANDO CREW:", e)
-    raise
-
-# Monkey patch para desabilitar handlers problemáticos do EventsBus
-def disable_crewai_events():
-    """Desabilita handlers problemáticos do CrewAI EventsBus de forma mais agressiva"""
-    try:
-        # Abordagem 1: Intercepta diretamente o handler on_agent_logs_execution
-        try:
-            from crewai.events.bus import CrewAIEventsBus
-            
-            # Substitui o handler problemático por um que suprime erros JSON
-            if hasattr(CrewAIEventsBus, 'on_agent_logs_execution'):
-                original_handler = getattr(CrewAIEventsBus, 'on_agent_logs_execution', None)
-                
-                def safe_wrapped_handler(*args, **kwargs):
-                    """Handler que suprime erros de JSON parsing silenciosamente"""
-                    try:
-                        if original_handler and callable(original_handler):
-                            return original_handler(*args, **kwargs)
-                    except (ValueError, json.JSONDecodeError, Exception) as e:
-                        # Suprime especificamente erros de JSON parsing
-                        error_str = str(e).lower()
-                        error_type = type(e).__name__.lower()
-                        
-                        # Verifica se é um erro de JSON parsing
-                        is_json_error = (
-                            isinstance(e, json.JSONDecodeError) or
-                            "jsondecodeerror" in error_type or
-                            any(keyword in error_str for keyword in [
-                                "expecting value", "json", "jsondecodeerror", 
-                                "line 1 column 1", "char 0", "expecting"
-                            ])
-                        )
-                        
-                        if is_json_error:
-                            # Suprime silenciosamente - não faz nada
-                            return None
-                        # Re-raise outros erros que não são relacionados a JSON
-                        raise
-                
-                CrewAIEventsBus.on_agent_logs_execution = safe_wrapped_handler
-                
-            # Também tenta interceptar o método _handle_sync se existir
-            if hasattr(CrewAIEventsBus, '_handle_sync'):
-                original_sync_handler = getattr(CrewAIEventsBus, '_handle_sync', None)
-                
-                def safe_sync_handler(*args, **kwargs):
-                    """Handler sync que suprime erros de JSON parsing"""
-                    try:
-                        if original_sync_handler and callable(original_sync_handler):
-                            return original_sync_handler(*args, **kwargs)
-                    except (ValueError, json.JSONDecodeError, Exception) as e:
-                        error_str = str(e).lower()
-                        if any(keyword in error_str for keyword in [
-                            "expecting value", "json", "jsondecodeerror", 
-                            "line 1 column 1", "char 0", "expecting"
-                        ]):
-                            return None
-                        raise
-                
-                CrewAIEventsBus._handle_sync = safe_sync_handler
-            
-            # Intercepta também métodos relacionados a eventos que podem gerar erros
-            # Tenta interceptar qualquer método que possa estar gerando o erro
-            for method_name in ['_handle_event', 'handle', 'emit', '_emit']:
-                if hasattr(CrewAIEventsBus, method_name):
-                    original_method = getattr(CrewAIEventsBus, method_name)
-                    if callable(original_method):
-                        def create_safe_handler(orig_method):
-                            def safe_handler(*args, **kwargs):
-                                try:
-                                    return orig_method(*args, **kwargs)
-                                except (ValueError, json.JSONDecodeError, Exception) as e:
-                                    error_str = str(e).lower()
-                                    if any(keyword in error_str for keyword in [
-                                        "expecting value", "json", "jsondecodeerror", 
-                                        "line 1 column 1", "char 0", "expecting"
-                                    ]):
-                                        return None
-                                    raise
-                            return safe_handler
-                        setattr(CrewAIEventsBus, method_name, create_safe_handler(original_method))
-                
-        except (ImportError, AttributeError) as e:
-            # Log silencioso se não conseguir importar
-            pass
-        
-        # Abordagem 2: Tenta desabilitar eventos completamente
-        try:
-            from crewai.events import EventsBus
-            if hasattr(EventsBus, 'disable'):
-                EventsBus.disable()
-        except (ImportError, AttributeError):
-            pass
-        
-        # Abordagem 3: Intercepta o logger do EventsBus diretamente
-        try:
-            import logging
-            events_logger = logging.getLogger("crewai.events.bus")
-            # Remove todos os handlers existentes e adiciona um filtrado
-            for handler in list(events_logger.handlers):
-                events_logger.removeHandler(handler)
-            
-            # Cria um handler customizado que filtra mensagens de erro
-            class FilteredHandler(logging.Handler):
-                def emit(self, record):
-                    message = record.getMessage()
-                    message_lower = message.lower()
-                    if any(keyword in message_lower for keyword in [
-                        "crewai eventsbus", "on_agent_logs_execution",
-                        "expecting value", "expecting", "jsondecodeerror",
-                        "sync handler error", "action", "don't exist"
-                    ]):
-                        return  # Não emite a mensagem
-                    # Para outras mensagens, usa o handler padrão
-                    print(f"[CrewAI] {message}", file=sys.stderr)
-            
-            events_logger.addHandler(FilteredHandler())
-            events_logger.setLevel(logging.CRITICAL)  # Só mostra críticos
-        except Exception:
-            pass
-            
-    except Exception:
-        # Se qualquer coisa falhar, continua normalmente
-        pass
-
-# Aplica o patch ao importar
-disable_crewai_events()
+# Um único dispatcher de stdout/stderr para o processo todo: a saída de cada job
+# vai para o seu próprio log filtrado (ver output_routing), sem trocar sys.stdout por request
+install_output_dispatcher()
+
+
+def _job_log_name() -> str:
+    job = current_job.get()
+    return job.id if job is not None else "sem-job"
+
+
+# Carregado em segundo plano no startup (ou no primeiro uso), depois do import:
+# - patches do EventsBus do CrewAI (suprimem erros de JSON não críticos dos handlers),
+#   aplicados uma única vez por processo; o que foi alterado fica em applied_patches();
+# - handlers que encaminham início/fim de tasks e tokens do LLM para os eventos do job
+crew_loader = CrewLoader(import_crew_project, setup=(install_crewai_patches, install_job_event_handlers))
 
 app = FastAPI(title="AI Marketing Crew API", version="1.0.0")
 
@@ -364,6 +81,63 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    # Rota pelo template (/api/jobs/{job_id}) para não criar uma série por ID
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        route = getattr(request.scope.get("route"), "path", "unmatched")
+        HTTP_REQUEST_SECONDS.observe(time.perf_counter() - started, method=request.method, route=route, status=status)
+
+# Pool limitado de workers que executa as crews fora do event loop; com vários
+# processos (gunicorn) o estado dos jobs fica no store compartilhado (JOB_STORE_URL)
+job_manager = JobManager(store=create_job_store())
+
+# Templates das crews montados uma vez por processo; cada request recebe um clone
+def _prepare_template(crew):
+    # O agents.yaml do projeto dá o label `agent` das métricas (chave do agente, não o role)
+    prepare_crew_for_jobs(crew, agents_config=getattr(crew_templates.project, "agents_config", None))
+
+crew_templates = CrewTemplateCache(loader=crew_loader.load, prepare=_prepare_template)
+
+# Cache persistente de resultados de copywriting (chave = request normalizado + hash dos YAML)
+result_cache = DiskCache(
+    "copywriting_results",
+    ttl_seconds=float(os.getenv("RESULT_CACHE_TTL_SECONDS", 7 * 24 * 3600)),
+    max_entries=int(os.getenv("RESULT_CACHE_MAX_ENTRIES", "1000")),
+    max_bytes=int(os.getenv("RESULT_CACHE_MAX_MB", "100")) * 1024 * 1024,
+)
+
+# Cache por task: trocar só o tom/plataforma reaproveita a pesquisa (research_task)
+stage_cache = DiskCache(
+    "copywriting_stages",
+    ttl_seconds=float(os.getenv("STAGE_CACHE_TTL_SECONDS", 24 * 3600)),
+    max_entries=int(os.getenv("STAGE_CACHE_MAX_ENTRIES", "3000")),
+    max_bytes=int(os.getenv("STAGE_CACHE_MAX_MB", "100")) * 1024 * 1024,
+)
+copywriting_runner = StagedCrewRunner(crew_templates, stage_cache, "copywriting")
+
+# Acertos dos caches e profundidade da fila, lidos a cada coleta do /metrics
+track_cache("copywriting_results", result_cache)
+track_cache("copywriting_stages", stage_cache)
+
+@REGISTRY.collector
+def _collect_job_counts():
+    for status, count in job_manager.counts().items():
+        JOBS.set(count, status=status)
+
+# Limite do endpoint de lote (a concorrência dos itens é dividida por todos os lotes, ver batch)
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "50"))
+
+# Planilhas enviadas para o dashboard (Parquet + perfil, endereçados pelo hash do arquivo)
+dataset_store = DatasetStore()
+DATASET_MAX_BYTES = int(os.getenv("DATASET_MAX_MB", "200")) * 1024 * 1024
+
 class CopyRequest(BaseModel):
     topic: str
     target_audience: str
@@ -373,101 +147,330 @@ class CopyRequest(BaseModel):
     definicao_do_sistema: Optional[str] = None
 
 class DashboardRequest(BaseModel):
-    data_context: str
+    data_context: Optional[str] = None
+    dataset_id: Optional[str] = None
     topic: Optional[str] = "Análise de Dados"
     definicao_do_sistema: Optional[str] = None
+    # "spec": JSON validado desenhado pelo renderizador do frontend; "code": código Python livre
+    output_format: Literal["code", "spec"] = "code"
+
+
+def _crew_output_text(result):
+    return result.final_output if hasattr(result, "final_output") else str(result)
+
+def run_copywriting(inputs: dict) -> dict:
+    """Executa a crew de copywriting (roda dentro de um worker do JobManager)"""
+    # Executa a crew com a saída no log filtrado do job, pulando as tasks já cacheadas
+    # Nota: Erros de eventos do CrewAI (como "Expecting value: line 1 column 1")
+    # são não-críticos e geralmente não impedem a execução
+    with job_output(_job_log_name()):
+        return copywriting_runner.run(inputs)
+
+def _copywriting_cache_key(inputs: dict) -> str:
+    return make_cache_key("copywriting", inputs, crew_templates.config_hash)
+
+def run_copywriting_batch(inputs: dict) -> dict:
+    """Executa um lote de copys: a pesquisa roda uma vez por grupo de itens equivalentes"""
+    job = current_job.get()
+
+    def run_item(item: dict) -> dict:
+        cache_key = _copywriting_cache_key(item)
+        cached = result_cache.get(cache_key)
+        if cached is not None:
+            return {**cached, "cache": "HIT"}
+        result = run_copywriting(item)
+        result_cache.set(cache_key, result)
+        return {**result, "cache": "MISS"}
+
+    def on_item_done(item_result: dict):
+        if job is not None:
+            job.emit("item_finished", **item_result)
+
+    # Os itens rodam em threads do lote, que herdam o contexto (job e log) daqui
+    with job_output(_job_log_name()):
+        return run_batch(
+            inputs["items"],
+            run_item,
+            group_key=copywriting_runner.group_key,
+            concurrency=inputs["concurrency"],
+            on_item_done=on_item_done,
+        )
+
+def run_dashboard(inputs: dict) -> dict:
+    """Executa a crew de dashboard (roda dentro de um worker do JobManager)"""
+    crew = crew_templates.get("dashboard")
+
+    crew_inputs = {name: inputs[name] for name in ("data_context", "topic", "definicao_do_sistema")}
+
+    # Executa a crew com a saída no log filtrado do job
+    with job_output(_job_log_name()):
+        result = crew.kickoff(inputs=crew_inputs)
+
+    text = _crew_output_text(result)
+    response = {"result": text, "raw": text}
+    if inputs.get("output_format") == "spec":
+        # Especificação validada aqui: o frontend só desenha, sem executar código
+        try:
+            spec = parse_spec(text)
+        except SpecError as e:
+            response.update(spec=None, spec_error=str(e))
+        else:
+            columns = inputs.get("columns")
+            response["spec_warnings"] = validate_columns(spec, columns) if columns else []
+            response["spec"] = spec.model_dump()
+    return response
+
+def _require_api_key():
+    if not os.getenv("OPENAI_API_KEY"):
+        raise HTTPException(500, "OPENAI_API_KEY não configurada no Render.")
+
+async def _require_crews():
+    """Espera o carregamento das crews fora do event loop (503 se o import falhou)"""
+    if crew_loader.ready:
+        return
+    try:
+        await asyncio.to_thread(crew_loader.load)
+    except CrewLoadError as e:
+        raise HTTPException(503, f"Crews indisponíveis: {e}")
+
+def _submit_job(kind: str, fn, inputs: dict):
+    try:
+        return job_manager.submit(kind, fn, inputs)
+    except QueueFullError as e:
+        raise HTTPException(503, f"{e} Tente novamente em alguns instantes.")
+
+def _job_error_detail(job, label: str) -> str:
+    error_msg = job.error or "erro desconhecido"
+    # Se for apenas erro de eventos JSON, retorna uma mensagem mais amigável
+    if "expecting value" in error_msg.lower() and "line 1 column 1" in error_msg.lower():
+        return (
+            "Erro ao processar eventos internos do CrewAI. Isso geralmente não afeta o resultado. "
+            "Se o problema persistir, verifique os logs do servidor."
+        )
+    return f"Erro ao gerar {label}: {error_msg}"
+
+async def _job_response(job, label: str, wait: bool, headers: Optional[dict] = None):
+    """Devolve o job enfileirado (202) ou, com wait=true, aguarda o resultado sem bloquear o event loop"""
+    if not wait:
+        return JSONResponse(status_code=202, content=job.to_dict(), headers=headers)
+
+    await asyncio.wrap_future(job.future)
+    if job.status == JOB_ERROR:
+        raise HTTPException(500, _job_error_detail(job, label), headers=headers)
+    return JSONResponse(content={"success": True, **job.result}, headers=headers)
+
+def _store_in_cache(cache_key: str, fn):
+    """Envolve o runner para gravar o resultado no cache quando o job termina com sucesso"""
+    def run(inputs: dict) -> dict:
+        result = fn(inputs)
+        result_cache.set(cache_key, result)
+        return result
+    return run
+
+def _bypass_cache(http_request: Request) -> bool:
+    return "no-cache" in http_request.headers.get("cache-control", "").lower()
 
 
 @app.get("/")
 def root():
     return {"status": "ok", "message": "API online"}
 
-@app.post("/api/copywriting")
-async def generate_copy(request: CopyRequest):
+@app.get("/health/live")
+def health_live():
+    """Liveness: o processo e o event loop respondem (não depende das crews)"""
+    return {"status": "alive", "pid": os.getpid()}
 
-    api_key = os.getenv("OPENAI_API_KEY")
-    if not api_key:
-        raise HTTPException(500, "OPENAI_API_KEY não configurada no Render.")
+@app.get("/health/ready")
+def health_ready():
+    """Readiness: 200 só com as crews carregadas e aquecidas e o worker aceitando jobs"""
+    if not crew_loader.warm:
+        # Com CREW_WARM_UP=false o aquecimento começa na primeira sonda
+        crew_loader.start_background(warm_up=crew_templates.warm_up)
+    ready = crew_loader.warm and job_manager.accepting
+    if ready:
+        status = "ready"
+    elif not job_manager.accepting:
+        status = "draining"
+    elif crew_loader.error:
+        status = "error"
+    else:
+        status = "starting"
+    content = {
+        "status": status,
+        "crews": crew_loader.state,
+        "error": crew_loader.error,
+        "templates": crew_templates.templates,
+        "llms": crew_templates.warm_llms,
+        "phases_seconds": dict(crew_loader.phases),
+        "pid": os.getpid(),
+    }
+    return JSONResponse(status_code=200 if ready else 503, content=content)
 
-    try:
-        # Desabilita eventos problemáticos antes de criar a crew
-        disable_crewai_events()
-        
-        crew_instance = CreateCrewProject()
-        crew = crew_instance.copywriting_crew()
-        
-        # Executa a crew com supressão de erros de eventos
-        # Nota: Erros de eventos do CrewAI (como "Expecting value: line 1 column 1")
-        # são não-críticos e geralmente não impedem a execução
-        with SuppressCrewAIEventsErrors():
-            result = crew.kickoff(inputs=request.dict())
-        
-        text = result.final_output if hasattr(result, "final_output") else str(result)
-
-        return {"success": True, "result": text}
-
-    except Exception as e:
-        error_msg = str(e)
-        # Erros de eventos do CrewAI são não-críticos, mas se ocorrerem durante kickoff,
-        # podem indicar um problema real. Logamos o erro completo para debug.
-        import traceback
-        print(f"❌ Erro ao gerar copywriting: {error_msg}")
-        print(f"📋 Traceback: {traceback.format_exc()}")
-        
-        # Se for apenas erro de eventos JSON, tenta retornar uma mensagem mais amigável
-        if "expecting value" in error_msg.lower() and "line 1 column 1" in error_msg.lower():
-            raise HTTPException(
-                500, 
-                "Erro ao processar eventos internos do CrewAI. Isso geralmente não afeta o resultado. "
-                "Se o problema persistir, verifique os logs do servidor."
+@app.post("/api/copywriting")
+async def generate_copy(request: CopyRequest, http_request: Request, wait: bool = False):
+    _require_api_key()
+    await _require_crews()
+    inputs = request.dict()
+
+    # Payload idêntico com a mesma configuração de agents/tasks: devolve o resultado salvo
+    cache_key = _copywriting_cache_key(inputs)
+    if not _bypass_cache(http_request):
+        cached = result_cache.get(cache_key)
+        if cached is not None:
+            return JSONResponse(
+                content={"success": True, "status": "done", **cached},
+                headers={"X-Cache": "HIT"},
             )
-        raise HTTPException(500, f"Erro ao gerar copywriting: {error_msg}")
+
+    job = _submit_job("copywriting", _store_in_cache(cache_key, run_copywriting), inputs)
+    return await _job_response(job, "copywriting", wait, headers={"X-Cache": "MISS"})
+
+@app.post("/api/copywriting/batch")
+async def generate_copy_batch(items: List[CopyRequest], wait: bool = False, concurrency: Optional[int] = None):
+    _require_api_key()
+    if not items:
+        raise HTTPException(400, "Envie ao menos um item no lote.")
+    if len(items) > BATCH_MAX_ITEMS:
+        raise HTTPException(400, f"Lote muito grande: máximo de {BATCH_MAX_ITEMS} itens.")
+
+    await _require_crews()
+
+    inputs = {
+        "items": [item.dict() for item in items],
+        "concurrency": max(1, min(concurrency or BATCH_MAX_CONCURRENCY, BATCH_MAX_CONCURRENCY)),
+    }
+    job = _submit_job("copywriting_batch", run_copywriting_batch, inputs)
+    return await _job_response(job, "copywriting em lote", wait)
 
 @app.post("/api/dashboard")
-async def generate_dashboard(request: DashboardRequest):
+async def generate_dashboard(request: DashboardRequest, wait: bool = False):
+    _require_api_key()
 
-    api_key = os.getenv("OPENAI_API_KEY")
-    if not api_key:
-        raise HTTPException(500, "OPENAI_API_KEY não configurada no Render.")
+    data_context = request.data_context
+    columns = None
+    if request.dataset_id:
+        # Dataset já enviado: usa o perfil salvo, sem ler a planilha de novo
+        meta = dataset_store.get(request.dataset_id)
+        if meta is None:
+            raise HTTPException(404, "Dataset não encontrado (envie o arquivo em /api/datasets).")
+        columns = [column["name"] for column in meta["profile"]["columns"]]
+        if not data_context or not data_context.strip():
+            data_context = profile_summary(meta)
+    if not data_context or not data_context.strip():
+        raise HTTPException(400, "Informe data_context ou dataset_id.")
+
+    definicao = request.definicao_do_sistema or ""
+    if request.output_format == "spec":
+        definicao = SPEC_INSTRUCTIONS + ("\n" + definicao if definicao.strip() else "")
+
+    # Prepara os inputs para a crew de dashboard
+    await _require_crews()
+    inputs = {
+        "data_context": data_context,
+        "topic": request.topic or "Análise de Dados",
+        "definicao_do_sistema": definicao,
+        "output_format": request.output_format,
+        "columns": columns,
+    }
+    job = _submit_job("dashboard", run_dashboard, inputs)
+    return await _job_response(job, "dashboard", wait)
 
+@app.post("/api/datasets")
+def upload_dataset(file: UploadFile = File(...)):
+    """Recebe uma planilha (CSV/Excel), armazena em Parquet e devolve o perfil das colunas"""
+    data = file.file.read(DATASET_MAX_BYTES + 1)
+    if len(data) > DATASET_MAX_BYTES:
+        raise HTTPException(413, f"Arquivo maior que o limite de {DATASET_MAX_BYTES // (1024 * 1024)} MB.")
+    if not data:
+        raise HTTPException(400, "Arquivo vazio.")
     try:
-        # Desabilita eventos problemáticos antes de criar a crew
-        disable_crewai_events()
-        
-        crew_instance = CreateCrewProject()
-        crew = crew_instance.dashboard_crew()
-        
-        # Prepara os inputs para a crew de dashboard
-        inputs = {
-            "data_context": request.data_context,
-            "topic": request.topic or "Análise de Dados",
-            "definicao_do_sistema": request.definicao_do_sistema or ""
-        }
-        
-        # Executa a crew com supressão de erros de eventos
-        with SuppressCrewAIEventsErrors():
-            result = crew.kickoff(inputs=inputs)
-        
-        text = result.final_output if hasattr(result, "final_output") else str(result)
-
-        return {"success": True, "result": text, "raw": text}
-
-    except Exception as e:
-        error_msg = str(e)
-        import traceback
-        print(f"❌ Erro ao gerar dashboard: {error_msg}")
-        print(f"📋 Traceback: {traceback.format_exc()}")
-        
-        # Se for apenas erro de eventos JSON, tenta retornar uma mensagem mais amigável
-        if "expecting value" in error_msg.lower() and "line 1 column 1" in error_msg.lower():
-            raise HTTPException(
-                500, 
-                "Erro ao processar eventos internos do CrewAI. Isso geralmente não afeta o resultado. "
-                "Se o problema persistir, verifique os logs do servidor."
-            )
-        raise HTTPException(500, f"Erro ao gerar dashboard: {error_msg}")
+        return dataset_store.ingest(data, file.filename or "")
+    except DatasetError as e:
+        raise HTTPException(400, str(e))
+
+@app.get("/api/datasets/{dataset_id}")
+def get_dataset(dataset_id: str):
+    meta = dataset_store.get(dataset_id)
+    if meta is None:
+        raise HTTPException(404, "Dataset não encontrado.")
+    return meta
+
+@app.get("/api/jobs/{job_id}")
+def get_job(job_id: str):
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(404, "Job não encontrado (ID inválido ou expirado).")
+    data = job.to_dict()
+    if job.status == JOB_ERROR:
+        data["error"] = _job_error_detail(job, job.kind)
+    return data
+
+async def _job_event_stream(job, last_seq: int):
+    """Gera os eventos do job no formato Server-Sent Events até o job terminar"""
+    seq = last_seq
+    while True:
+        for event in job.events_after(seq):
+            seq = event["seq"]
+            yield f"id: {seq}\nevent: {event['type']}\ndata: {json.dumps(event, ensure_ascii=False)}\n\n"
+            if event["type"] == "job_finished":
+                return
+        if not await job.wait_for_events(seq, timeout=15):
+            # Comentário SSE para manter a conexão viva em proxies
+            yield ": ping\n\n"
+
+@app.get("/api/jobs/{job_id}/events")
+async def stream_job_events(job_id: str, http_request: Request, after: int = 0):
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(404, "Job não encontrado (ID inválido ou expirado).")
+    # Reconexões do EventSource enviam o último id recebido
+    last_event_id = http_request.headers.get("last-event-id")
+    if last_event_id and last_event_id.isdigit():
+        after = max(after, int(last_event_id))
+    return StreamingResponse(
+        _job_event_stream(job, after),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.get("/metrics")
+def get_metrics():
+    """Métricas deste worker no formato de texto do Prometheus"""
+    return Response(content=render_metrics(), media_type=METRICS_CONTENT_TYPE)
+
+@app.get("/api/crewai/patches")
+def get_crewai_patches():
+    """Patches aplicados no EventsBus do CrewAI (versão detectada e métodos embrulhados)"""
+    return applied_patches()
+
+@app.get("/api/startup")
+def get_startup_report():
+    """Estado do carregamento das crews, tempo de cada etapa e os imports mais lentos"""
+    return {**crew_loader.report(), "pid": os.getpid()}
+
+@app.on_event("startup")
+def warm_up_crews():
+    # O servidor já responde; o CrewAI e os templates carregam numa thread
+    if CREW_WARM_UP:
+        crew_loader.start_background(warm_up=crew_templates.warm_up)
+
+@app.on_event("shutdown")
+def shutdown_jobs():
+    # Desligamento gracioso: espera as crews em execução (até JOB_DRAIN_SECONDS)
+    interrupted = job_manager.drain()
+    if interrupted:
+        print(f"⚠️ {interrupted} job(s) interrompido(s) no desligamento do worker")
+
+crew_loader.mark("app_import", _APP_IMPORT_STARTED)
 
 
 if __name__ == "__main__":
+    # Execução direta (desenvolvimento); em produção: gunicorn -c gunicorn.conf.py backend_api:app
     import uvicorn
-    uvicorn.run("main:app", host="0.0.0.0", port=int(os.getenv("PORT", 8000)))
+    uvicorn.run(
+        "backend_api:app",
+        host="0.0.0.0",
+        port=int(os.getenv("PORT", 8000)),
+        workers=int(os.getenv("WEB_CONCURRENCY", "1")),
+    )
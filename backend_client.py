@@ -0,0 +1,174 @@
+"""
+Cliente HTTP do backend usado pelo app Streamlit.
+
+Uma única `requests.Session` (o app a guarda com `st.cache_resource`) mantém
+as conexões keep-alive em um pool, em vez de abrir uma conexão TCP/TLS nova a
+cada botão. Erros de conexão e as respostas 502/503/504 do cold start do Render
+são repetidos algumas vezes com backoff exponencial e jitter; um timeout de
+leitura não é repetido (o backend pode ter recebido o pedido). Em um POST só se
+repetem as falhas ao abrir a conexão: se ela cair depois do envio do corpo, o
+job pode já ter sido criado e repetir criaria outro.
+
+Ao carregar a página, `warm_up()` faz um GET leve em segundo plano para acordar
+o backend enquanto o usuário preenche o formulário. Jobs longos são
+acompanhados por polling de GET /api/jobs/{id} (`wait_for_job`), sem segurar
+um socket bloqueado por minutos.
+"""
+import os
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
+
+
+BACKEND_RETRIES = int(os.getenv("BACKEND_RETRIES", "3"))
+# Espera base entre tentativas (dobra a cada tentativa, com jitter)
+BACKEND_BACKOFF_SECONDS = float(os.getenv("BACKEND_BACKOFF_SECONDS", "1.0"))
+BACKEND_BACKOFF_MAX_SECONDS = 20.0
+BACKEND_POOL_SIZE = int(os.getenv("BACKEND_POOL_SIZE", "10"))
+# (conexão, leitura) das requisições comuns
+BACKEND_TIMEOUT = (10, 60)
+# (conexão, leitura) do envio de planilhas para /api/datasets (ingestão + perfil no backend)
+DATASET_UPLOAD_TIMEOUT = (10, 300)
+# Tempo máximo acompanhando um job (polling)
+BACKEND_JOB_TIMEOUT = int(os.getenv("BACKEND_JOB_TIMEOUT", "900"))
+POLL_INTERVAL_SECONDS = 1.0
+POLL_INTERVAL_MAX_SECONDS = 5.0
+# Novo ping de aquecimento só depois desse intervalo desde o último
+WARMUP_INTERVAL_SECONDS = 60
+# O primeiro GET depois do cold start do Render pode levar quase um minuto
+WARMUP_TIMEOUT = (10, 90)
+
+RETRY_STATUSES = {502, 503, 504}
+# Métodos que podem ser repetidos mesmo se a conexão cair depois do envio
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+JOB_FINISHED_STATUSES = {"done", "error"}
+
+
+class JobTimeout(requests.exceptions.Timeout):
+    """O job não terminou dentro do tempo de acompanhamento"""
+
+
+def failed_before_sending(error: requests.exceptions.ConnectionError) -> bool:
+    """True se a conexão nem chegou a ser aberta (o backend não recebeu nada)"""
+    if isinstance(error, requests.exceptions.ConnectTimeout):
+        return True
+    reason = error.args[0] if error.args else None
+    # requests embrulha o MaxRetryError do urllib3, que guarda a causa em `reason`
+    reason = getattr(reason, "reason", reason)
+    return isinstance(reason, NewConnectionError)
+
+
+class BackendClient:
+    """Sessão com o backend: pool de conexões, retries com jitter, aquecimento e polling de jobs"""
+    def __init__(self, base_url: str, retries: int = BACKEND_RETRIES, backoff: float = BACKEND_BACKOFF_SECONDS,
+                 pool_size: int = BACKEND_POOL_SIZE):
+        self.base_url = base_url.rstrip("/")
+        self.retries = retries
+        self.backoff = backoff
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._warmup_lock = threading.Lock()
+        self._warmup_thread: Optional[threading.Thread] = None
+        self._last_warmup = 0.0
+        self.last_warmup_status: Optional[str] = None
+
+    def url(self, path: str) -> str:
+        return f"{self.base_url}/{path.lstrip('/')}"
+
+    def _delay(self, attempt: int, response: Optional[requests.Response] = None) -> float:
+        """Backoff exponencial com jitter (ou o Retry-After do backend, se houver)"""
+        retry_after = response.headers.get("retry-after", "") if response is not None else ""
+        if retry_after.isdigit():
+            return min(float(retry_after), BACKEND_BACKOFF_MAX_SECONDS)
+        ceiling = min(self.backoff * (2 ** attempt), BACKEND_BACKOFF_MAX_SECONDS)
+        return random.uniform(ceiling / 2, ceiling)
+
+    def request(self, method: str, path: str, on_retry: Optional[Callable[[int, str], None]] = None,
+                **kwargs) -> requests.Response:
+        """Requisição com retries em erro de conexão e 502/503/504; `on_retry(tentativa, motivo)` avisa a tela"""
+        kwargs.setdefault("timeout", BACKEND_TIMEOUT)
+        idempotent = method.upper() in IDEMPOTENT_METHODS
+        attempt = 0
+        while True:
+            try:
+                response = self.session.request(method, self.url(path), **kwargs)
+            except requests.exceptions.ConnectionError as e:
+                # Inclui ConnectTimeout; ReadTimeout não é ConnectionError e não é repetido
+                if attempt >= self.retries or not (idempotent or failed_before_sending(e)):
+                    raise
+                reason, response = f"conexão falhou ({type(e).__name__})", None
+            else:
+                if response.status_code not in RETRY_STATUSES or attempt >= self.retries:
+                    return response
+                reason = f"HTTP {response.status_code}"
+                response.close()
+            attempt += 1
+            if on_retry is not None:
+                on_retry(attempt, reason)
+            time.sleep(self._delay(attempt - 1, response))
+
+    def get(self, path: str, **kwargs) -> requests.Response:
+        return self.request("GET", path, **kwargs)
+
+    def post(self, path: str, **kwargs) -> requests.Response:
+        return self.request("POST", path, **kwargs)
+
+    def warm_up(self) -> bool:
+        """Acorda o backend em segundo plano (no máximo um ping por intervalo); True se disparou"""
+        with self._warmup_lock:
+            busy = self._warmup_thread is not None and self._warmup_thread.is_alive()
+            if busy or time.monotonic() - self._last_warmup < WARMUP_INTERVAL_SECONDS:
+                return False
+            self._last_warmup = time.monotonic()
+            self._warmup_thread = threading.Thread(target=self._ping, name="backend-warmup", daemon=True)
+            self._warmup_thread.start()
+            return True
+
+    def _ping(self):
+        try:
+            response = self.get("/", timeout=WARMUP_TIMEOUT)
+            self.last_warmup_status = f"HTTP {response.status_code}"
+        except requests.exceptions.RequestException as e:
+            self.last_warmup_status = type(e).__name__
+
+    def ensure_dataset(self, dataset_id: str, data: bytes, filename: str,
+                       on_retry: Optional[Callable[[int, str], None]] = None) -> str:
+        """Garante o arquivo no backend: consulta pelo hash e só envia se ainda não estiver lá"""
+        response = self.get(f"/api/datasets/{dataset_id}", on_retry=on_retry)
+        if response.status_code == 200:
+            return dataset_id
+        response = self.post("/api/datasets", files={"file": (filename, data)}, on_retry=on_retry,
+                             timeout=DATASET_UPLOAD_TIMEOUT)
+        response.raise_for_status()
+        return response.json()["dataset_id"]
+
+    def get_job(self, job_id: str) -> Dict[str, Any]:
+        response = self.get(f"/api/jobs/{job_id}")
+        response.raise_for_status()
+        return response.json()
+
+    def wait_for_job(self, job_id: str, timeout: float = BACKEND_JOB_TIMEOUT,
+                     on_status: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+        """Consulta o job até terminar (intervalo crescente); devolve o último status"""
+        deadline = time.monotonic() + timeout
+        interval = POLL_INTERVAL_SECONDS
+        while True:
+            job = self.get_job(job_id)
+            if on_status is not None:
+                on_status(job)
+            if job.get("status") in JOB_FINISHED_STATUSES:
+                return job
+            if time.monotonic() + interval > deadline:
+                raise JobTimeout(f"O job {job_id} não terminou em {timeout:.0f} s.")
+            time.sleep(interval)
+            interval = min(interval * 1.5, POLL_INTERVAL_MAX_SECONDS)
+
+    def close(self):
+        self.session.close()
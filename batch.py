@@ -0,0 +1,80 @@
+"""
+Execução em lote de variações de copy que compartilham a mesma pesquisa.
+
+Os itens são agrupados pela chave do primeiro estágio (research_task). Na
+primeira fase roda um item "líder" por grupo, o que grava a pesquisa no cache de
+estágios; na segunda fase os demais itens rodam concorrentemente e reaproveitam
+essa pesquisa, executando apenas copywriting/editing.
+
+Cada lote tem suas threads, mas os itens de todos os lotes do processo dividem
+as mesmas BATCH_MAX_CONCURRENCY vagas (`BATCH_SLOTS`): vários lotes ao mesmo
+tempo não multiplicam as crews em execução. O job do lote ocupa um worker do
+JobManager só esperando os itens, então no pior caso rodam ao mesmo tempo
+(CREW_MAX_WORKERS - lotes em andamento) jobs comuns + BATCH_MAX_CONCURRENCY
+itens de lote, ou seja, menos de CREW_MAX_WORKERS + BATCH_MAX_CONCURRENCY crews.
+"""
+import contextvars
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+
+# Itens de lote rodando ao mesmo tempo, somando todos os lotes do processo
+BATCH_MAX_CONCURRENCY = int(os.getenv("BATCH_MAX_CONCURRENCY", "4"))
+BATCH_SLOTS = threading.BoundedSemaphore(max(1, BATCH_MAX_CONCURRENCY))
+
+
+def group_items(items: List[Dict[str, Any]], group_key: Callable[[Dict[str, Any]], str]) -> "OrderedDict[str, List[int]]":
+    """Índices dos itens agrupados pela chave compartilhada, na ordem de chegada"""
+    groups: "OrderedDict[str, List[int]]" = OrderedDict()
+    for index, item in enumerate(items):
+        groups.setdefault(group_key(item), []).append(index)
+    return groups
+
+
+def run_batch(items: List[Dict[str, Any]], run_item: Callable[[Dict[str, Any]], Dict[str, Any]],
+              group_key: Callable[[Dict[str, Any]], str], concurrency: int,
+              on_item_done: Optional[Callable[[Dict[str, Any]], None]] = None,
+              slots: threading.Semaphore = BATCH_SLOTS) -> Dict[str, Any]:
+    """
+    Executa `run_item` para cada item com no máximo `concurrency` execuções simultâneas.
+
+    Cada item também ocupa uma vaga de `slots`, compartilhada com os outros lotes.
+    Falhas não interrompem o lote: cada item retorna seu próprio resultado ou erro.
+    """
+    groups = group_items(items, group_key)
+    results: List[Optional[Dict[str, Any]]] = [None] * len(items)
+
+    def run_one(index: int):
+        try:
+            with slots:
+                item_result = {"index": index, "success": True, **run_item(items[index])}
+        except Exception as e:
+            item_result = {"index": index, "success": False, "error": str(e)}
+        results[index] = item_result
+        if on_item_done is not None:
+            on_item_done(item_result)
+
+    leaders = [indices[0] for indices in groups.values()]
+    followers = [index for indices in groups.values() for index in indices[1:]]
+
+    def run_phase(pool: ThreadPoolExecutor, indices: List[int]):
+        # Cada item roda em uma cópia do contexto de quem chamou (job atual, log do job)
+        futures = [pool.submit(contextvars.copy_context().run, run_one, index) for index in indices]
+        for future in futures:
+            future.result()
+
+    with ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix="copy-batch") as pool:
+        # Fase 1: um item por grupo (paga a pesquisa uma única vez)
+        run_phase(pool, leaders)
+        # Fase 2: variações restantes reaproveitando a pesquisa cacheada
+        run_phase(pool, followers)
+
+    return {
+        "results": results,
+        "groups": len(groups),
+        "succeeded": sum(1 for r in results if r and r["success"]),
+        "failed": sum(1 for r in results if r and not r["success"]),
+    }
@@ -0,0 +1,83 @@
+"""
+Tamanho do data_context do dashboard: resumo anterior do app.py x context_builder.
+
+O resumo anterior trazia `dict(df.dtypes)`, 10 linhas de amostra com todas as
+colunas e `describe()` de todas as colunas numéricas (e, na definição do
+sistema, o mesmo resumo de novo mais a lista de colunas). Mede os tokens do
+prompt para planilhas de larguras diferentes.
+
+Uso: python benchmarks/bench_context_builder.py [linhas]
+"""
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+
+from context_builder import DEFAULT_TOKEN_BUDGET, _encoder, build_data_context, count_tokens
+from datasets import profile_dataframe
+
+
+def legacy_summary(df: pd.DataFrame, file_name: str) -> str:
+    """Trecho equivalente ao resumo em memória do app.py (csv_summary + columns_info)"""
+    sample_df = pd.concat([df.head(5), df.tail(5)]) if len(df) > 10 else df
+    numeric_cols = df.select_dtypes(include=["number"]).columns.tolist()
+    stats_summary = f"\n- Estatísticas das colunas numéricas:\n{df[numeric_cols].describe().to_string()}" if numeric_cols else ""
+    csv_summary = f"""
+    ARQUIVO CSV CARREGADO:
+    - Nome do arquivo: {file_name}
+    - Dimensões: {df.shape[0]} linhas x {df.shape[1]} colunas
+    - Colunas: {', '.join(df.columns.tolist())}
+    - Tipos de dados: {dict(df.dtypes)}
+    - Amostra de dados (primeiras e últimas linhas):
+    {sample_df.to_string()}
+    {stats_summary}
+
+    NOTA: O DataFrame completo está disponível como 'df' com {df.shape[0]} linhas.
+    """
+    columns_info = "Colunas disponíveis no DataFrame: " + ", ".join(f"'{c}'" for c in df.columns)
+    # data_context + definicao_do_sistema (que repetia o resumo)
+    return csv_summary + csv_summary + columns_info
+
+
+def make_frame(rows: int, extra_metrics: int) -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    data = {
+        "data": pd.date_range("2024-01-01", periods=rows, freq="h").strftime("%d/%m/%Y %H:%M"),
+        "id_evento": np.arange(rows),
+        "campanha": rng.choice(["Promoção Verão", "Lançamento", "Remarketing", "Black Friday"], rows),
+        "canal": rng.choice(["Google Ads", "Meta", "TikTok", "E-mail"], rows),
+        "custo": rng.random(rows).round(2) * 500,
+        "cliques": rng.integers(0, 5000, rows),
+        "conversões": rng.integers(0, 200, rows),
+        "observação": [f"registro {i} importado" for i in range(rows)],
+        "versão_export": "v2",
+    }
+    for i in range(extra_metrics):
+        data[f"métrica_{i:03d}"] = rng.normal(100, 15, rows).round(3)
+    return pd.DataFrame(data)
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    tokenizer = "tiktoken" if _encoder() is not None else "estimativa (~4 caracteres/token)"
+    print(f"{rows} linhas | orçamento {DEFAULT_TOKEN_BUDGET} tokens | contagem: {tokenizer}")
+    print(f"{'colunas':>8} {'anterior':>10} {'novo':>8} {'redução':>8} {'perfil+contexto':>16}")
+    for extra in (0, 20, 100, 300):
+        df = make_frame(rows, extra)
+        legacy_tokens = count_tokens(legacy_summary(df, "campanhas.csv"))
+        start = time.perf_counter()
+        context = build_data_context(profile_dataframe(df), "campanhas.csv", "CSV")
+        elapsed = time.perf_counter() - start
+        new_tokens = count_tokens(context)
+        print(f"{df.shape[1]:>8} {legacy_tokens:>10} {new_tokens:>8} {legacy_tokens / new_tokens:>7.1f}x {elapsed * 1000:>13.0f} ms")
+    print("\nContexto gerado (última planilha):\n")
+    print(context)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""
+Benchmark do custo de montar a crew por request.
+
+Compara o fluxo antigo (`CreateCrewProject().copywriting_crew()` a cada request,
+relendo os YAML e recriando agentes/ferramentas) com o `CrewTemplateCache`
+(template montado uma vez + `crew.copy()` por request).
+
+Uso: python benchmarks/bench_crew_setup.py [n_requests]
+"""
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+
+# Nenhuma chamada ao LLM é feita, mas o Agent exige uma chave configurada
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+os.environ.setdefault("CREWAI_DISABLE_TELEMETRY", "true")
+os.environ.setdefault("OTEL_SDK_DISABLED", "true")
+os.environ.setdefault("CREW_OUTPUT_FILES", "false")
+
+from crew_templates import CrewTemplateCache, import_crew_project
+
+# Mesmo caminho de import do backend (backend_api.crew_loader)
+CreateCrewProject = import_crew_project()
+
+
+def measure(label, fn, n):
+    timings = []
+    for _ in range(n):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    print(f"{label:<32} média {statistics.mean(timings):8.2f} ms | "
+          f"mediana {statistics.median(timings):8.2f} ms | máx {max(timings):8.2f} ms")
+    return statistics.mean(timings)
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+
+    # Aquece imports/caches internos do crewai para não distorcer a primeira medição
+    CreateCrewProject().copywriting_crew()
+
+    for kind in ("copywriting", "dashboard"):
+        cache = CrewTemplateCache(CreateCrewProject)
+        cache.warm_up([kind])
+        print(f"\n== {kind}_crew ({n} requests) ==")
+        before = measure("antes: CreateCrewProject()", lambda: getattr(CreateCrewProject(), f"{kind}_crew")(), n)
+        after = measure("depois: CrewTemplateCache.get", lambda: cache.get(kind), n)
+        print(f"speedup: {before / after:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
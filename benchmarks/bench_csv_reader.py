@@ -0,0 +1,98 @@
+"""
+Leitura de CSVs grandes: loop anterior do app.py x csv_reader.
+
+O loop anterior rodava `chardet.detect` no arquivo inteiro e relia o arquivo
+completo com ',' / ';' / '\\t' para cada codificação candidata. O csv_reader
+identifica codificação e separador em um prefixo e faz uma única leitura.
+
+Gera (uma vez, em um diretório temporário) CSVs sintéticos de ~`tamanho_mb` MB:
+UTF-8 com ',' e cp1252 com ';' (formato comum de exportações do Excel em pt-BR).
+
+Uso: python benchmarks/bench_csv_reader.py [tamanho_mb]
+"""
+import io
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+
+from csv_reader import read_csv_bytes
+
+
+def legacy_read(file_bytes: bytes) -> pd.DataFrame:
+    """Trecho equivalente ao loop de codificações x separadores do app.py"""
+    import chardet
+
+    detected = chardet.detect(file_bytes)
+    encoding = detected.get('encoding', 'utf-8')
+    confidence = detected.get('confidence', 0)
+    encodings_to_try = [
+        encoding if confidence > 0.7 else None,
+        'utf-8', 'latin-1', 'iso-8859-1', 'cp1252', 'windows-1252', 'utf-8-sig'
+    ]
+    encodings_to_try = [e for e in encodings_to_try if e is not None]
+    df = None
+    for enc in encodings_to_try:
+        try:
+            df = pd.read_csv(io.BytesIO(file_bytes), encoding=enc, sep=',')
+            if df.shape[1] == 1:
+                df = pd.read_csv(io.BytesIO(file_bytes), encoding=enc, sep=';')
+            if df.shape[1] == 1:
+                df = pd.read_csv(io.BytesIO(file_bytes), encoding=enc, sep='\t')
+            break
+        except Exception:
+            continue
+    return df
+
+
+def make_csv(path: Path, size_mb: int, sep: str, encoding: str):
+    rng = np.random.default_rng(0)
+    rows = 200_000
+    chunk = pd.DataFrame({
+        "data": pd.date_range("2024-01-01", periods=rows, freq="min").strftime("%d/%m/%Y %H:%M"),
+        "campanha": rng.choice(["Promoção Verão", "Lançamento", "Remarketing", "Black Friday"], rows),
+        "canal": rng.choice(["Google Ads", "Meta", "TikTok", "E-mail"], rows),
+        "custo": rng.random(rows).round(2) * 500,
+        "cliques": rng.integers(0, 5000, rows),
+        "conversões": rng.integers(0, 200, rows),
+        "região": rng.choice(["São Paulo", "Paraná", "Ceará", "Goiás"], rows),
+    })
+    with open(path, "w", encoding=encoding, newline="") as f:
+        chunk.to_csv(f, sep=sep, index=False)
+        while f.tell() < size_mb * 1024 * 1024:
+            chunk.to_csv(f, sep=sep, index=False, header=False)
+
+
+def timed(fn, data):
+    start = time.perf_counter()
+    df = fn(data)
+    return time.perf_counter() - start, df.shape
+
+
+def main():
+    size_mb = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    tmp_dir = Path(tempfile.gettempdir()) / "bench_csv_reader"
+    tmp_dir.mkdir(exist_ok=True)
+    cases = (("utf8_virgula", ",", "utf-8"), ("cp1252_ponto_e_virgula", ";", "cp1252"))
+
+    for name, sep, encoding in cases:
+        path = tmp_dir / f"{name}_{size_mb}mb.csv"
+        if not path.exists():
+            make_csv(path, size_mb, sep, encoding)
+        data = path.read_bytes()
+        print(f"\n{path.name}: {len(data) / 1e6:.0f} MB")
+        legacy_s, legacy_shape = timed(legacy_read, data)
+        print(f"  anterior            {legacy_s:7.2f} s  {legacy_shape}")
+        for engine in ("c", "pyarrow"):
+            new_s, new_shape = timed(lambda d: read_csv_bytes(d, engine=engine)[0], data)
+            print(f"  csv_reader ({engine:<7}) {new_s:7.2f} s  {new_shape}  ({legacy_s / new_s:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
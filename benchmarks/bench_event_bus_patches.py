@@ -0,0 +1,96 @@
+"""
+Custo por evento do EventsBus depois de N requests.
+
+Compara a abordagem anterior (disable_crewai_events() chamada a cada request,
+que embrulhava `emit`/`_handle_sync` de novo a cada chamada) com o registro de
+patches idempotente (crewai_patches). Usa um bus de referência com os métodos
+das versões do CrewAI em que o patch antigo tinha efeito, para isolar o custo
+das camadas de wrapper. O registro também é aplicado no EventsBus instalado
+para mostrar o que seria alterado nesta versão.
+
+Uso: python benchmarks/bench_event_bus_patches.py
+"""
+import json
+import sys
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+
+from crewai_patches import PatchRegistry, find_event_bus_class, patch_event_bus
+
+REQUEST_COUNTS = (0, 10, 100, 500)
+EVENTS = 20_000
+
+
+def make_bus_class():
+    class EventsBus:
+        def __init__(self):
+            self.handled = 0
+
+        def _handle_sync(self, source, event):
+            self.handled += 1
+
+        def emit(self, source, event):
+            return self._handle_sync(source, event)
+    return EventsBus
+
+
+def legacy_patch(bus_class):
+    """Trecho equivalente ao disable_crewai_events() anterior (reembrulha a cada chamada)"""
+    for method_name in ["_handle_sync", "emit"]:
+        original_method = getattr(bus_class, method_name)
+
+        def create_safe_handler(orig_method):
+            def safe_handler(*args, **kwargs):
+                try:
+                    return orig_method(*args, **kwargs)
+                except (ValueError, json.JSONDecodeError, Exception) as e:
+                    error_str = str(e).lower()
+                    if any(keyword in error_str for keyword in [
+                        "expecting value", "json", "jsondecodeerror",
+                        "line 1 column 1", "char 0", "expecting"
+                    ]):
+                        return None
+                    raise
+            return safe_handler
+        setattr(bus_class, method_name, create_safe_handler(original_method))
+
+
+def registry_patch(bus_class, registry):
+    patch_event_bus(bus_class, registry)
+
+
+def per_event_us(bus_class) -> float:
+    bus = bus_class()
+    start = time.perf_counter()
+    for _ in range(EVENTS):
+        bus.emit(None, None)
+    return (time.perf_counter() - start) / EVENTS * 1e6
+
+
+def main():
+    print(f"{'requests':>8} | {'anterior (us/evento)':>20} | {'registro (us/evento)':>20}")
+    for requests in REQUEST_COUNTS:
+        legacy_class = make_bus_class()
+        registry_class = make_bus_class()
+        registry = PatchRegistry()
+        # Ambos aplicam o patch ao importar e depois uma vez por request
+        for _ in range(requests + 1):
+            legacy_patch(legacy_class)
+            registry_patch(registry_class, registry)
+        print(f"{requests:>8} | {per_event_us(legacy_class):>20.2f} | {per_event_us(registry_class):>20.2f}")
+
+    bus_class = find_event_bus_class()
+    if bus_class is not None:
+        registry = PatchRegistry()
+        for _ in range(3):
+            patch_event_bus(bus_class, registry)
+        print("\nEventsBus instalado:", [p["target"] + "." + p["attribute"] for p in registry.applied()])
+        registry.restore()
+
+
+if __name__ == "__main__":
+    sys.setrecursionlimit(10_000)
+    main()
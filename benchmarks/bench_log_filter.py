@@ -0,0 +1,205 @@
+"""
+Microbenchmark do filtro de logs do CrewAI (log_filter.LogFilter).
+
+Reproduz um log verboso gravado de uma execução da crew de copywriting
+(benchmarks/data/crew_verbose.log, com os erros do EventsBus intercalados)
+escrevendo-o como o `print`/rich fazem: um write por linha e outro para o '\\n'.
+Compara a implementação anterior (buffer em string + ~14 regexes por linha)
+com o filtro pré-compilado e mostra o throughput em MB/s.
+
+Uso: python benchmarks/bench_log_filter.py [repeticoes_do_log]
+"""
+import re
+import sys
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+
+from log_filter import LogFilter
+
+LOG_PATH = Path(__file__).resolve().parent / "data" / "crew_verbose.log"
+
+
+class NullIO:
+    """Destino que só conta o que foi escrito"""
+    def __init__(self):
+        self.chars = 0
+
+    def write(self, text):
+        self.chars += len(text)
+
+    def flush(self):
+        pass
+
+
+class FilteredIO:
+    """Destino com o LogFilter na frente (como o dispatcher do output_routing usa o filtro)"""
+    def __init__(self, original_io):
+        self.original_io = original_io
+        self.filter = LogFilter()
+
+    def write(self, text):
+        output = self.filter.feed(text)
+        if output:
+            self.original_io.write(output)
+        return len(text)
+
+    def flush(self):
+        output = self.filter.flush()
+        if output:
+            self.original_io.write(output)
+        self.original_io.flush()
+
+
+class LegacyFilteredIO:
+    """Implementação anterior do FilteredIO (backend_api.py), mantida como referência"""
+    def __init__(self, original_io):
+        self.original_io = original_io
+        self.buffer = ""  # Buffer para acumular mensagens multi-linha
+        self.buffer_size_limit = 5000  # Limite do buffer para evitar acúmulo excessivo
+    
+    def write(self, text):
+        if not text:
+            return
+        
+        # Adiciona ao buffer
+        self.buffer += text
+        
+        # Limita o tamanho do buffer
+        if len(self.buffer) > self.buffer_size_limit:
+            # Mantém apenas as últimas linhas
+            lines = self.buffer.split('\n')
+            self.buffer = '\n'.join(lines[-50:])  # Mantém últimas 50 linhas
+        
+        # Verifica se deve filtrar baseado no buffer acumulado
+        should_filter = self._should_filter(self.buffer)
+        
+        # Se encontrar um erro de eventos, limpa o buffer e não escreve
+        if should_filter:
+            # Limpa o buffer completamente quando encontra erro
+            self.buffer = ""
+            return
+        
+        # Se o texto contém quebra de linha ou o buffer está grande, processa
+        if '\n' in text:
+            # Separa em linhas
+            lines = self.buffer.split('\n')
+            
+            # Verifica cada linha e as linhas anteriores para contexto
+            output_lines = []
+            for i, line in enumerate(lines):
+                # Verifica a linha atual e contexto (linhas anteriores próximas)
+                context = '\n'.join(lines[max(0, i-3):i+1])
+                
+                if not self._should_filter(context):
+                    output_lines.append(line)
+                # Se for erro, não adiciona à saída
+            
+            # Escreve apenas as linhas que não foram filtradas
+            if output_lines:
+                output = '\n'.join(output_lines)
+                if output.strip():  # Só escreve se houver conteúdo
+                    self.original_io.write(output)
+                    self.original_io.flush()
+            
+            # Limpa o buffer após processar
+            self.buffer = ""
+        elif len(self.buffer) > 500:
+            # Se o buffer está grande sem quebra de linha, verifica e escreve se OK
+            if not self._should_filter(self.buffer):
+                self.original_io.write(self.buffer)
+                self.original_io.flush()
+            self.buffer = ""
+    
+    def _should_filter(self, text):
+        """Verifica se o texto deve ser filtrado"""
+        if not text:
+            return False
+        
+        text_lower = text.lower()
+        
+        # Palavras-chave que indicam erro de eventos (verificação rápida)
+        error_keywords = [
+            'crewai eventsbus',
+            'on_agent_logs_execution',
+            'expecting value: line 1 column 1',
+            'expecting value',
+            'expecting',  # Captura erros incompletos também
+            'jsondecodeerror',
+            "action 'none' don't exist",
+            "action 'n/a' don't exist",
+            'sync handler error',
+            'sync handler error in on_agent_logs_execution',
+        ]
+        
+        # Verifica palavras-chave primeiro (mais rápido)
+        for keyword in error_keywords:
+            if keyword in text_lower:
+                return True
+        
+        # Padrões regex mais específicos
+        patterns_to_filter = [
+            r'\[CrewAIEventsBus\].*Sync handler error',
+            r'\[CrewAIEventsBus\].*Sync handler error.*on_agent_logs_execution',
+            r'\[CrewAIEventsBus\].*Expecting',
+            r'\[CrewAIEventsBus\].*Expecting.*',
+            r'\[CrewAIEventsBus\].*',  # Captura qualquer mensagem do CrewAIEventsBus
+            r'Expecting value: line 1 column 1 \(char 0\)',
+            r'Expecting value.*line 1 column 1',
+            r'Expecting.*',  # Captura qualquer erro que comece com "Expecting"
+            r'JSONDecodeError.*Expecting',
+            r'Sync handler error.*on_agent_logs_execution',
+            r'Sync handler error.*on_agent_logs_execution.*Expecting',
+            r"Action 'None' don't exist",
+            r"Action 'N/A' don't exist",
+            r"Action '.*' don't exist",  # Captura qualquer mensagem de ação inexistente
+        ]
+        
+        for pattern in patterns_to_filter:
+            if re.search(pattern, text, re.IGNORECASE | re.DOTALL):
+                return True
+        
+        return False
+    
+    def flush(self):
+        # Antes de fazer flush, verifica o buffer restante
+        if self.buffer and not self._should_filter(self.buffer):
+            self.original_io.write(self.buffer)
+            self.buffer = ""
+        self.original_io.flush()
+    
+    def __getattr__(self, name):
+        # Delega outros atributos/métodos para o IO original
+        return getattr(self.original_io, name)
+
+
+def run(io_class, chunks, total_bytes):
+    sink = NullIO()
+    filtered = io_class(sink)
+    start = time.perf_counter()
+    for chunk in chunks:
+        filtered.write(chunk)
+    filtered.flush()
+    elapsed = time.perf_counter() - start
+    return total_bytes / elapsed / 1e6, sink.chars
+
+
+def main():
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    lines = LOG_PATH.read_text(encoding="utf-8").splitlines() * repeats
+    chunks = []
+    for line in lines:
+        chunks.append(line)
+        chunks.append("\n")
+    total_bytes = sum(len(c.encode("utf-8")) for c in chunks)
+    print(f"Log: {LOG_PATH.name} x{repeats} = {total_bytes / 1e6:.2f} MB em {len(chunks)} writes\n")
+
+    for label, io_class in (("anterior", LegacyFilteredIO), ("log_filter", FilteredIO)):
+        throughput, kept = run(io_class, chunks, total_bytes)
+        print(f"{label:<12} {throughput:8.2f} MB/s | {kept} caracteres mantidos")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Figuras do plotly express com o DataFrame inteiro x com a redução de plot_data.
+
+Para cada tipo de gráfico que o código gerado costuma usar, mede o tempo de
+montar a figura e serializá-la (o que vai para o navegador) e o tamanho do JSON,
+com o `plotly.express` original e com o `ReducedExpress`.
+
+Uso: python benchmarks/bench_plot_data.py [linhas]
+"""
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+
+from plot_data import MAX_PLOT_POINTS, ReducedExpress
+
+
+def make_frame(rows: int) -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({
+        "data": pd.date_range("2024-01-01", periods=rows, freq="min"),
+        "canal": rng.choice(["Google Ads", "Meta", "TikTok", "E-mail"], rows),
+        "custo": rng.random(rows).round(2) * 500,
+        "cliques": rng.integers(0, 5000, rows),
+        "saldo": np.cumsum(rng.normal(0, 10, rows)),
+    })
+
+
+CHARTS = {
+    "line (cor)": lambda p, df: p.line(df, x="data", y="saldo", color="canal"),
+    "scatter": lambda p, df: p.scatter(df, x="cliques", y="custo", color="canal"),
+    "histogram": lambda p, df: p.histogram(df, x="custo"),
+    "bar": lambda p, df: p.bar(df, x="canal", y="custo"),
+    "pie": lambda p, df: p.pie(df, names="canal", values="custo"),
+}
+
+
+def measure(express, df: pd.DataFrame, build):
+    start = time.perf_counter()
+    payload = build(express, df).to_json()
+    return time.perf_counter() - start, len(payload)
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    df = make_frame(rows)
+    reduced = ReducedExpress(px)
+    print(f"{rows} linhas | teto de {MAX_PLOT_POINTS} pontos por figura")
+    print(f"{'gráfico':<12} {'original':>18} {'reduzido':>18}")
+    for name, build in CHARTS.items():
+        original_time, original_size = measure(px, df, build)
+        reduced_time, reduced_size = measure(reduced, df, build)
+        print(f"{name:<12} {original_time * 1000:>7.0f} ms {original_size / 1e6:>6.1f} MB"
+              f" {reduced_time * 1000:>7.0f} ms {reduced_size / 1e6:>6.2f} MB")
+
+
+if __name__ == "__main__":
+    main()
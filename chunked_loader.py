@@ -0,0 +1,266 @@
+"""
+Leitura de CSVs grandes em blocos, sem carregar o arquivo inteiro em memória.
+
+Cada bloco atualiza estatísticas que podem ser combinadas (mergeable):
+- momentos por coluna numérica (contagem, média, M2, mín., máx.), combinados
+  pela fórmula de Chan et al.;
+- contagem de nulos e valores mais frequentes (contador podado, aproximado);
+- amostra uniforme das linhas por "bottom-k": cada linha recebe uma chave
+  aleatória e ficam as k menores (equivale a reservoir sampling, vetorizado).
+
+Os quantis são aproximados a partir da amostra uniforme. Só a amostra é
+materializada como DataFrame (para os gráficos); o tamanho dela e dos blocos é
+derivado do orçamento de memória configurado.
+"""
+import os
+from collections import Counter
+from typing import Any, BinaryIO, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from csv_reader import FALLBACK_ENCODINGS, SNIFF_BYTES, CsvReadError, sniff_dialect
+from datasets import profile_dataframe
+
+
+# Orçamento de memória do modo em blocos (amostra + bloco em leitura)
+MEMORY_BUDGET_MB = float(os.getenv("DASHBOARD_MEMORY_BUDGET_MB", "256"))
+# Arquivos CSV acima deste tamanho são lidos em blocos no dashboard
+STREAMING_THRESHOLD_MB = float(os.getenv("DASHBOARD_STREAMING_THRESHOLD_MB", "50"))
+# Limites da amostra usada nos gráficos
+MAX_SAMPLE_ROWS = int(os.getenv("DASHBOARD_MAX_SAMPLE_ROWS", "200000"))
+MIN_SAMPLE_ROWS = 1000
+# Valores distintos mantidos por coluna no contador de mais frequentes
+TOP_COUNTER_SIZE = 1000
+TOP_K = 5
+QUANTILES = (0.05, 0.25, 0.5, 0.75, 0.95)
+
+_KEY = "__sample_key__"
+_ROW = "__row__"
+
+
+class RunningMoments:
+    """Contagem, média, variância (M2), mínimo e máximo combináveis entre blocos"""
+    __slots__ = ("count", "mean", "m2", "min", "max")
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = float("inf")
+        self.max = float("-inf")
+
+    def update(self, values: np.ndarray):
+        values = values[~np.isnan(values)]
+        if values.size == 0:
+            return
+        other = RunningMoments()
+        other.count = int(values.size)
+        other.mean = float(values.mean())
+        other.m2 = float(((values - other.mean) ** 2).sum())
+        other.min = float(values.min())
+        other.max = float(values.max())
+        self.merge(other)
+
+    def merge(self, other: "RunningMoments"):
+        if other.count == 0:
+            return
+        total = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / total
+        self.m2 += other.m2 + delta ** 2 * self.count * other.count / total
+        self.count = total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    @property
+    def std(self) -> Optional[float]:
+        return (self.m2 / (self.count - 1)) ** 0.5 if self.count > 1 else None
+
+
+class ChunkedCsvSummary:
+    """Estatísticas acumuladas de um CSV lido em blocos + amostra uniforme das linhas"""
+    def __init__(self, sample_rows: int, seed: Optional[int] = None):
+        self.sample_rows = sample_rows
+        self.rows = 0
+        self.columns: List[str] = []
+        self.dtypes: Dict[str, str] = {}
+        self.null_counts: Counter = Counter()
+        self.moments: Dict[str, RunningMoments] = {}
+        self.non_numeric: set = set()
+        self.top_counts: Dict[str, Counter] = {}
+        # Colunas com quase todos os valores distintos (ids, timestamps): sem contador
+        self.high_cardinality: set = set()
+        self.encoding = ""
+        self.delimiter = ""
+        self._rng = np.random.default_rng(seed)
+        self._sample: Optional[pd.DataFrame] = None
+
+    def update(self, chunk: pd.DataFrame):
+        chunk = chunk.dropna(axis=0, how="all")
+        if chunk.empty:
+            return
+        if not self.columns:
+            self.columns = [str(c) for c in chunk.columns]
+        chunk.columns = self.columns
+
+        offset = self.rows
+        self.rows += len(chunk)
+        self.null_counts.update(chunk.isna().sum().to_dict())
+
+        for col in self.columns:
+            series = chunk[col]
+            self.dtypes.setdefault(col, str(series.dtype))
+            if col not in self.non_numeric and pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+                self.moments.setdefault(col, RunningMoments()).update(series.to_numpy(dtype="float64", na_value=np.nan))
+                continue
+            # Coluna que deixou de ser numérica em algum bloco é tratada como categórica
+            if col in self.moments:
+                del self.moments[col]
+            self.non_numeric.add(col)
+            self.dtypes[col] = str(series.dtype)
+            if col in self.high_cardinality:
+                continue
+            counts = series.value_counts(dropna=True)
+            if len(series) >= MIN_SAMPLE_ROWS and len(counts) > len(series) // 2:
+                self.high_cardinality.add(col)
+                self.top_counts.pop(col, None)
+                continue
+            counter = self.top_counts.setdefault(col, Counter())
+            counter.update(counts.to_dict())
+            if len(counter) > 2 * TOP_COUNTER_SIZE:
+                self.top_counts[col] = Counter(dict(counter.most_common(TOP_COUNTER_SIZE)))
+
+        self._update_sample(chunk, offset)
+
+    def _update_sample(self, chunk: pd.DataFrame, offset: int):
+        keys = self._rng.random(len(chunk))
+        if self._sample is not None and len(self._sample) >= self.sample_rows:
+            # Só entram linhas com chave menor que a maior chave da amostra atual
+            threshold = self._sample[_KEY].max()
+            mask = keys < threshold
+            if not mask.any():
+                return
+            chunk, keys = chunk[mask], keys[mask]
+            positions = np.flatnonzero(mask) + offset
+        else:
+            positions = np.arange(offset, offset + len(chunk))
+        candidate = chunk.assign(**{_KEY: keys, _ROW: positions})
+        merged = candidate if self._sample is None else pd.concat([self._sample, candidate], ignore_index=True)
+        if len(merged) > self.sample_rows:
+            merged = merged.nsmallest(self.sample_rows, _KEY)
+        self._sample = merged
+
+    @property
+    def empty_columns(self) -> List[str]:
+        return [c for c in self.columns if self.null_counts.get(c, 0) >= self.rows]
+
+    def sample(self) -> pd.DataFrame:
+        """Amostra uniforme na ordem original do arquivo (sem colunas totalmente vazias)"""
+        if self._sample is None:
+            return pd.DataFrame(columns=self.columns)
+        df = self._sample.sort_values(_ROW).drop(columns=[_KEY, _ROW])
+        return df.drop(columns=self.empty_columns).reset_index(drop=True)
+
+    def quantiles(self, col: str) -> Dict[float, float]:
+        """Quantis aproximados (a partir da amostra uniforme)"""
+        if self._sample is None or col not in self.moments:
+            return {}
+        values = self._sample[col].dropna()
+        if values.empty:
+            return {}
+        return {q: float(v) for q, v in values.quantile(list(QUANTILES)).items()}
+
+    def top_values(self, col: str, k: int = TOP_K) -> List[tuple]:
+        return self.top_counts.get(col, Counter()).most_common(k)
+
+    def to_profile(self) -> Dict[str, Any]:
+        """
+        Perfil no formato de `datasets.profile_dataframe`, para o context_builder.
+
+        Tipos, datas, quantis internos e linhas de amostra vêm da amostra uniforme;
+        linhas, nulos, média, desvio, extremos e mais frequentes, do arquivo inteiro.
+        """
+        sample = self.sample()
+        profile = profile_dataframe(sample)
+        for col in profile["columns"]:
+            name = col["name"]
+            col["null_rate"] = self.null_counts.get(name, 0) / self.rows if self.rows else 0.0
+            moments = self.moments.get(name)
+            if moments is not None and col["kind"] == "numeric":
+                col["mean"], col["std"] = moments.mean, moments.std
+                col["quantiles"].update({"0.0": moments.min, "1.0": moments.max})
+            elif name in self.high_cardinality:
+                # Quase todos os valores distintos: a contagem da amostra não representa o arquivo
+                col["cardinality"] = None
+                col["high_cardinality"] = True
+                col.pop("top", None)
+            elif name in self.top_counts:
+                col["cardinality"] = len(self.top_counts[name])
+                col["top"] = [{"value": str(value), "count": int(count)} for value, count in self.top_values(name)]
+        profile["rows"] = self.rows
+        profile["df_rows"] = len(sample)
+        return profile
+
+    def describe(self) -> pd.DataFrame:
+        """Equivalente ao `df.describe()` das colunas numéricas (quantis aproximados)"""
+        data: Dict[str, Dict[str, Any]] = {}
+        for col, m in self.moments.items():
+            if col in self.empty_columns:
+                continue
+            q = self.quantiles(col)
+            data[col] = {
+                "count": m.count, "mean": m.mean, "std": m.std, "min": m.min,
+                "25%": q.get(0.25), "50%": q.get(0.5), "75%": q.get(0.75), "max": m.max,
+            }
+        return pd.DataFrame(data)
+
+
+def _row_bytes_estimate(fileobj: BinaryIO, dialect: Dict[str, str]) -> float:
+    """Memória média por linha no pandas, medida em um bloco pequeno do início"""
+    fileobj.seek(0)
+    probe = pd.read_csv(fileobj, sep=dialect["delimiter"], encoding=dialect["encoding"], nrows=2000)
+    fileobj.seek(0)
+    if probe.empty:
+        return 1.0
+    return max(1.0, probe.memory_usage(index=False, deep=True).sum() / len(probe))
+
+
+def load_csv_chunked(fileobj: BinaryIO, memory_budget_mb: float = MEMORY_BUDGET_MB,
+                     max_sample_rows: int = MAX_SAMPLE_ROWS) -> ChunkedCsvSummary:
+    """
+    Lê o CSV em blocos dentro do orçamento de memória.
+
+    Metade do orçamento fica para a amostra (2 cópias durante a combinação) e
+    a outra metade para o bloco em leitura.
+    """
+    fileobj.seek(0)
+    dialect = sniff_dialect(fileobj.read(SNIFF_BYTES))
+    encodings = [dialect["encoding"]]
+    if dialect["encoding"] == "utf-8":
+        encodings += list(FALLBACK_ENCODINGS)
+
+    last_error: Optional[Exception] = None
+    for encoding in encodings:
+        dialect = {**dialect, "encoding": encoding}
+        try:
+            row_bytes = _row_bytes_estimate(fileobj, dialect)
+            budget = memory_budget_mb * 1024 * 1024
+            sample_rows = int(max(MIN_SAMPLE_ROWS, min(max_sample_rows, budget / 4 / row_bytes)))
+            chunk_rows = int(max(1000, budget / 2 / row_bytes))
+
+            summary = ChunkedCsvSummary(sample_rows)
+            summary.encoding, summary.delimiter = encoding, dialect["delimiter"]
+            reader = pd.read_csv(fileobj, sep=dialect["delimiter"], encoding=encoding, chunksize=chunk_rows)
+            with reader:
+                for chunk in reader:
+                    summary.update(chunk)
+            return summary
+        except UnicodeDecodeError as e:
+            # Prefixo em UTF-8 válido, mas o restante não: recomeça com outra codificação
+            last_error = e
+            fileobj.seek(0)
+            continue
+        except Exception as e:
+            raise CsvReadError(f"Erro ao ler o CSV em blocos: {e}")
+    raise CsvReadError(f"Erro ao ler o CSV em blocos: {last_error}")
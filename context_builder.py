@@ -0,0 +1,212 @@
+"""
+Monta o `data_context` do dashboard dentro de um orçamento de tokens.
+
+Em vez de `dict(df.dtypes)`, amostra completa e `describe()` de todas as
+colunas, o contexto traz uma linha compacta por coluna (tipo, nulos e as
+estatísticas que importam para aquele tipo), em ordem de relevância, e algumas
+linhas de amostra só com as colunas mais relevantes. As linhas são adicionadas
+enquanto couberem no orçamento; o que sobra vira apenas a lista de nomes (ou a
+contagem de colunas omitidas).
+
+Os tokens são contados com o tiktoken (encoding do gpt-4o) quando o arquivo do
+encoding está disponível localmente; sem ele, usa uma estimativa por caracteres.
+"""
+import os
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+
+
+DEFAULT_TOKEN_BUDGET = int(os.getenv("DASHBOARD_CONTEXT_TOKENS", "1200"))
+TOKENIZER_ENCODING = os.getenv("DASHBOARD_TOKENIZER_ENCODING", "o200k_base")
+
+# Frações do orçamento: linhas detalhadas das colunas, até onde vai a lista de nomes
+# das demais colunas e (o restante) linhas de amostra
+DETAIL_BUDGET_RATIO = 0.55
+NAMES_BUDGET_RATIO = 0.75
+SAMPLE_MAX_ROWS = 5
+SAMPLE_MAX_COLUMNS = 8
+# Tamanho máximo de um valor de texto no contexto
+MAX_VALUE_CHARS = 40
+
+# Nomes de colunas típicos de métricas de marketing (sobem no ranking)
+METRIC_HINTS = (
+    "data", "date", "dia", "mes", "mês", "campanha", "campaign", "canal", "channel", "custo", "cost",
+    "gasto", "spend", "valor", "receita", "revenue", "venda", "sales", "lead", "clique", "click",
+    "impress", "conver", "cpc", "cpm", "ctr", "cpa", "cpl", "roi", "roas", "cac", "ltv",
+)
+
+
+@lru_cache(maxsize=1)
+def _encoder():
+    try:
+        import tiktoken
+        return tiktoken.get_encoding(TOKENIZER_ENCODING)
+    except Exception:
+        # Sem tiktoken ou sem o arquivo do encoding (ambiente sem internet)
+        return None
+
+
+def count_tokens(text: str) -> int:
+    """Tokens do texto no tokenizer do gpt-4o (ou estimativa de ~4 caracteres por token)"""
+    if not text:
+        return 0
+    encoder = _encoder()
+    if encoder is not None:
+        return len(encoder.encode(text, disallowed_special=()))
+    return (len(text) + 3) // 4
+
+
+def _fmt(value: Any) -> str:
+    if value is None:
+        return "-"
+    if isinstance(value, float):
+        if value.is_integer() and abs(value) < 1e15:
+            return str(int(value))
+        return f"{value:.4g}" if abs(value) < 1e4 else f"{value:.0f}"
+    text = str(value).replace("\n", " ")
+    return text if len(text) <= MAX_VALUE_CHARS else text[:MAX_VALUE_CHARS - 1] + "…"
+
+
+def score_column(col: Dict[str, Any], rows: int) -> float:
+    """Relevância da coluna para o dashboard (maior = mais informativa)"""
+    cardinality = col.get("cardinality")
+    kind = col.get("kind")
+    fill = 1.0 - (col.get("null_rate") or 0.0)
+    if cardinality is not None and cardinality <= 1:
+        return 0.05 * fill
+    if kind == "datetime":
+        score = 1.1
+    elif kind == "numeric":
+        score = 1.0
+        if not col.get("std"):
+            score = 0.3
+        elif rows and cardinality == rows and "int" in str(col.get("dtype", "")):
+            score = 0.3  # Sequência/identificador numérico
+    elif kind == "boolean":
+        score = 0.6
+    elif col.get("high_cardinality"):
+        score = 0.15
+    elif cardinality is None or cardinality <= 50:
+        score = 0.9
+    elif rows and cardinality <= rows // 2:
+        score = 0.5
+    else:
+        score = 0.15  # Texto livre ou identificador
+    name = str(col.get("name", "")).lower()
+    if any(hint in name for hint in METRIC_HINTS):
+        score += 0.3
+    return score * max(fill, 0.1)
+
+
+def rank_columns(profile: Dict[str, Any]) -> List[Dict[str, Any]]:
+    rows = profile.get("rows") or 0
+    return sorted(profile["columns"], key=lambda c: score_column(c, rows), reverse=True)
+
+
+def column_line(col: Dict[str, Any]) -> str:
+    """Linha compacta de uma coluna"""
+    kind = col.get("kind")
+    null_rate = col.get("null_rate") or 0.0
+    parts = [f"- {col['name']} [{kind}]"]
+    if null_rate:
+        parts.append(f"nulos {null_rate:.0%}")
+    if kind == "numeric":
+        q = col.get("quantiles") or {}
+        parts.append(
+            f"min {_fmt(q.get('0.0'))} | p50 {_fmt(q.get('0.5'))} | max {_fmt(q.get('1.0'))}"
+            f" | média {_fmt(col.get('mean'))}"
+        )
+    elif kind == "datetime":
+        # Datas sem horário aparecem sem o "T00:00:00" do ISO
+        start, end = (_fmt(col.get(k)).removesuffix("T00:00:00") for k in ("min", "max"))
+        parts.append(f"{start} → {end}")
+    else:
+        if col.get("high_cardinality"):
+            parts.append("quase todos distintos")
+        elif col.get("cardinality") is not None:
+            parts.append(f"{col['cardinality']} distintos")
+        top = col.get("top") or []
+        if top:
+            parts.append("top: " + ", ".join(f"{_fmt(t['value'])} ({t['count']})" for t in top[:3]))
+    return "; ".join(parts)
+
+
+def _sample_lines(profile: Dict[str, Any], columns: List[str], budget: int) -> List[str]:
+    sample = profile.get("sample") or []
+    if not sample or not columns or budget <= 0:
+        return []
+    header = " | ".join(columns)
+    lines = ["Amostra (colunas mais relevantes):", header]
+    used = count_tokens("\n".join(lines))
+    if used > budget:
+        return []
+    # Alterna início e fim da amostra para mostrar os dois extremos
+    ordered = [row for pair in zip(sample, reversed(sample)) for row in pair][:len(sample)]
+    for row in ordered[:SAMPLE_MAX_ROWS]:
+        line = " | ".join(_fmt(row.get(c)) for c in columns)
+        cost = count_tokens(line) + 1
+        if used + cost > budget:
+            break
+        lines.append(line)
+        used += cost
+    return lines if len(lines) > 2 else []
+
+
+def build_data_context(profile: Dict[str, Any], file_name: str = "", file_type: str = "",
+                       token_budget: Optional[int] = None) -> str:
+    """Contexto compacto (esquema + estatísticas + amostra) que cabe em `token_budget` tokens"""
+    budget = token_budget or DEFAULT_TOKEN_BUDGET
+    rows = profile.get("rows") or 0
+    columns = profile["columns"]
+    df_rows = profile.get("df_rows", rows)
+
+    header = [
+        f"ARQUIVO {file_type} CARREGADO: {file_name}".strip(),
+        f"Dimensões: {rows} linhas x {len(columns)} colunas",
+        "Colunas (por relevância):",
+    ]
+    if df_rows != rows:
+        note = (f"NOTA: 'df' é uma amostra aleatória uniforme de {df_rows} das {rows} linhas; "
+                "as estatísticas acima são do arquivo inteiro.")
+    else:
+        note = f"NOTA: O DataFrame completo está disponível como 'df' com {rows} linhas."
+
+    used = count_tokens("\n".join(header)) + count_tokens(note) + 2
+    detail_budget = int(budget * DETAIL_BUDGET_RATIO)
+    names_budget = int(budget * NAMES_BUDGET_RATIO)
+
+    ranked = rank_columns(profile)
+    lines: List[str] = []
+    included: List[str] = []
+    for col in ranked:
+        line = column_line(col)
+        cost = count_tokens(line) + 1
+        if used + cost > detail_budget:
+            break
+        lines.append(line)
+        included.append(col["name"])
+        used += cost
+
+    remaining = [c["name"] for c in ranked[len(included):]]
+    if remaining:
+        # Colunas que não couberam: só os nomes, enquanto houver espaço
+        names: List[str] = []
+        prefix_cost = count_tokens(f"Outras colunas ({len(remaining)}): ") + 1
+        names_used = used + prefix_cost
+        for name in remaining:
+            cost = count_tokens(f"{name}, ")
+            if names_used + cost > names_budget:
+                break
+            names.append(name)
+            names_used += cost
+        if names:
+            omitted = len(remaining) - len(names)
+            suffix = f" (+{omitted} omitidas)" if omitted else ""
+            lines.append(f"Outras colunas ({len(remaining)}): " + ", ".join(names) + suffix)
+            used = names_used
+        else:
+            lines.append(f"+{len(remaining)} colunas omitidas")
+            used += count_tokens(lines[-1]) + 1
+
+    sample_lines = _sample_lines(profile, included[:SAMPLE_MAX_COLUMNS], budget - used)
+    return "\n".join(header + lines + sample_lines + [note])
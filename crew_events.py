@@ -0,0 +1,273 @@
+"""
+Ponte entre o CrewAI e os eventos dos jobs.
+
+Os handlers são registrados uma única vez no `crewai_event_bus` e descobrem a
+qual job o evento pertence pelo contextvar `jobs.current_job` (o CrewAI copia o
+contexto da thread que emitiu o evento ao chamar os handlers).
+
+Os handlers comuns do event bus rodam em um pool de threads, então podem chegar
+depois dos tokens da task seguinte. Por isso o fim de cada task vem do
+`task_callback` da crew (síncrono, na thread do job) e o início é anunciado no
+primeiro sinal que chegar (evento de início, primeiro token ou fim da task).
+
+Os mesmos handlers alimentam as métricas (ver metrics): duração das tasks, das
+chamadas ao LLM e das ferramentas vêm dos timestamps dos próprios eventos, que
+são criados na thread da crew e por isso são exatos mesmo com a entrega fora de
+ordem; os tokens de cada agente são lidos dos LLMs ao fim do kickoff (só o que
+foi gasto desde a leitura anterior, ver `_record_token_usage`).
+
+O label `agent` das métricas é a chave do agente no agents.yaml (ex:
+`market_researcher`), e não o `role`: depois do kickoff o role traz os inputs do
+usuário interpolados ("... para Sapatos XYZ") e cada valor novo viraria uma série
+nova guardada para sempre. Roles que não batem com nenhum template viram "other".
+"""
+import os
+import re
+import threading
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, Hashable, List, Optional, Pattern, Tuple
+
+from jobs import current_job, emit_job_event
+from metrics import LLM_CALL_SECONDS, LLM_STREAM_CHUNKS, LLM_TOKENS, TASK_SECONDS, TOOL_SECONDS
+
+
+STREAM_TOKENS = os.getenv("CREW_STREAM_TOKENS", "true").lower() in ("1", "true", "yes")
+
+_installed = False
+_install_lock = threading.Lock()
+
+# Campos de uso de tokens dos LLMs do CrewAI exportados como `type` em crew_llm_tokens_total
+_TOKEN_FIELDS = {"prompt_tokens": "prompt", "completion_tokens": "completion", "cached_prompt_tokens": "cached"}
+
+# Label dos agentes fora dos templates registrados
+OTHER_AGENT = "other"
+# Role do agents.yaml (com os {placeholders} como curinga) -> chave do agente
+_agent_patterns: Dict[str, Pattern] = {}
+_agent_patterns_lock = threading.Lock()
+_PLACEHOLDER = re.compile(r"\{[A-Za-z_][A-Za-z0-9_]*\}")
+
+# Contador de uso de cada LLM (dict compartilhado pelo template e seus clones) -> último total somado
+_token_totals: "OrderedDict[int, Tuple[dict, Dict[str, int]]]" = OrderedDict()
+_token_totals_lock = threading.Lock()
+_MAX_TOKEN_COUNTERS = 256
+
+
+class _EventSpans:
+    """Pareia eventos de início e fim pela chave, na ordem em que foram criados
+
+    Os handlers rodam em um pool de threads: o fim de uma chamada pode ser tratado
+    antes do início, ou o início da chamada seguinte antes do fim da anterior.
+    """
+    def __init__(self, max_keys: int = 2000):
+        self.max_keys = max_keys
+        self._spans: "OrderedDict[Hashable, Tuple[Deque[float], Deque[Tuple[float, Any]]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, key: Hashable, timestamp: float, end: Any = None) -> List[Tuple[float, Any]]:
+        """Registra um início (`end=None`) ou um fim (com os dados do fim); devolve os pares fechados"""
+        with self._lock:
+            starts, ends = self._spans.get(key) or self._spans.setdefault(key, (deque(), deque()))
+            if end is None:
+                starts.append(timestamp)
+            else:
+                ends.append((timestamp, end))
+            closed = []
+            while starts and ends:
+                started = starts.popleft()
+                finished, data = ends.popleft()
+                closed.append((max(finished - started, 0.0), data))
+            if not starts and not ends:
+                del self._spans[key]
+            while len(self._spans) > self.max_keys:
+                # Inícios sem fim (crew abortada): descarta os mais antigos
+                self._spans.popitem(last=False)
+        return closed
+
+
+_task_spans = _EventSpans()
+_llm_spans = _EventSpans()
+
+
+def _task_name(task) -> str:
+    if task is None:
+        return ""
+    return task.name or (task.description or "")[:60]
+
+
+def register_agent_keys(agents_config: Dict[str, Dict[str, Any]]):
+    """Registra os roles do agents.yaml para converter roles (já interpolados) na chave do agente"""
+    patterns = {}
+    for key, config in (agents_config or {}).items():
+        role = str((config or {}).get("role") or "").strip()
+        if role:
+            parts = [re.escape(part) for part in _PLACEHOLDER.split(role)]
+            patterns[key] = re.compile(".*?".join(parts), re.DOTALL)
+    with _agent_patterns_lock:
+        _agent_patterns.update(patterns)
+
+
+def agent_key(role: Optional[str]) -> str:
+    """Chave estável do agente (agents.yaml) a partir do role, interpolado ou não"""
+    role = (role or "").strip()
+    with _agent_patterns_lock:
+        patterns = list(_agent_patterns.items())
+    for key, pattern in patterns:
+        if pattern.fullmatch(role):
+            return key
+    return OTHER_AGENT
+
+
+def _agent_role(task) -> str:
+    """Role do agente da task, para os eventos do job (texto exibido ao usuário)"""
+    agent = getattr(task, "agent", None)
+    return (agent.role or "").strip() if agent is not None else ""
+
+
+def _timestamp(event) -> float:
+    return event.timestamp.timestamp()
+
+
+def _observe_task(event, status: Optional[str] = None):
+    """Início (`status=None`) ou fim de uma task; observa a duração quando o par fecha"""
+    end = None
+    if status is not None:
+        end = {"task": _task_name(event.task), "agent": agent_key(_agent_role(event.task)), "status": status}
+    for seconds, labels in _task_spans.add(str(event.task_id or id(event.task)), _timestamp(event), end):
+        TASK_SECONDS.observe(seconds, **labels)
+
+
+def _observe_llm_call(event, status: Optional[str] = None, model: str = ""):
+    """Início (`status=None`) ou fim de uma chamada ao LLM de um agente numa task"""
+    end = None
+    if status is not None:
+        end = {"agent": agent_key(event.agent_role), "model": model or "", "status": status}
+    for seconds, labels in _llm_spans.add((event.agent_id, event.task_id), _timestamp(event), end):
+        LLM_CALL_SECONDS.observe(seconds, **labels)
+
+
+def _record_token_usage(crew):
+    """Soma por agente os tokens gastos desde a última leitura de cada LLM
+
+    O `Crew.copy()` faz cópia rasa dos LLMs: o template e todos os clones dividem
+    o mesmo contador de uso, que acumula o total do processo. Por isso só entra
+    nas métricas a diferença para o último total já somado, o que conta cada
+    token uma única vez, mesmo com kickoffs simultâneos.
+    """
+    for agent in getattr(crew, "agents", None) or []:
+        llm = getattr(agent, "llm", None)
+        usage = getattr(llm, "_token_usage", None)
+        if not isinstance(usage, dict):
+            continue
+        current = {field: int(usage.get(field) or 0) for field in _TOKEN_FIELDS}
+        with _token_totals_lock:
+            entry = _token_totals.pop(id(usage), None)
+            # Guarda o próprio dict: o id não é reaproveitado enquanto ele estiver aqui
+            previous = entry[1] if entry is not None and entry[0] is usage else {}
+            _token_totals[id(usage)] = (usage, current)
+            while len(_token_totals) > _MAX_TOKEN_COUNTERS:
+                _token_totals.popitem(last=False)
+        key = agent_key(getattr(agent, "_original_role", None) or agent.role)
+        model = str(getattr(llm, "model", "") or "")
+        for field, token_type in _TOKEN_FIELDS.items():
+            delta = current[field] - previous.get(field, 0)
+            if delta > 0:
+                LLM_TOKENS.inc(delta, agent=key, model=model, type=token_type)
+
+
+def _announce_task(task_name: str, agent: str = ""):
+    """Emite `task_started` uma única vez por task do job atual"""
+    job = current_job.get()
+    if job is not None and task_name and job.announce_task(task_name):
+        job.emit("task_started", task=task_name, agent=agent)
+
+
+def _on_task_output(output):
+    """task_callback da crew: chamado na thread do job logo após cada task"""
+    task_name = output.name or (output.description or "")[:60]
+    _announce_task(task_name, output.agent)
+    emit_job_event("task_completed", task=task_name, agent=output.agent, output=output.raw)
+
+
+def prepare_crew_for_jobs(crew, agents_config: Optional[Dict[str, Dict[str, Any]]] = None):
+    """Ajusta um template de crew para publicar eventos (usado ao montar os templates)
+
+    `agents_config` (o agents.yaml do projeto) dá as chaves usadas no label `agent` das métricas.
+    """
+    if agents_config:
+        register_agent_keys(agents_config)
+    crew.task_callback = _on_task_output
+    if not STREAM_TOKENS:
+        return
+    # Liga o streaming dos LLMs para emitir os tokens conforme são gerados
+    for agent in crew.agents:
+        llm = getattr(agent, "llm", None)
+        if llm is not None and hasattr(llm, "stream"):
+            llm.stream = True
+
+
+def install_job_event_handlers():
+    """Registra os handlers no event bus do CrewAI (idempotente)"""
+    global _installed
+    with _install_lock:
+        if _installed:
+            return
+        from crewai.events import crewai_event_bus
+        from crewai.events.types.crew_events import CrewKickoffCompletedEvent, CrewKickoffFailedEvent
+        from crewai.events.types.llm_events import (
+            LLMCallCompletedEvent,
+            LLMCallFailedEvent,
+            LLMCallStartedEvent,
+            LLMStreamChunkEvent,
+        )
+        from crewai.events.types.task_events import TaskCompletedEvent, TaskFailedEvent, TaskStartedEvent
+        from crewai.events.types.tool_usage_events import ToolUsageFinishedEvent
+
+        @crewai_event_bus.on(TaskStartedEvent)
+        def on_task_started(source, event):
+            _announce_task(_task_name(event.task), _agent_role(event.task))
+            _observe_task(event)
+
+        @crewai_event_bus.on(TaskCompletedEvent)
+        def on_task_completed(source, event):
+            _observe_task(event, "ok")
+
+        @crewai_event_bus.on(TaskFailedEvent)
+        def on_task_failed(source, event):
+            emit_job_event("task_failed", task=_task_name(event.task), error=event.error)
+            _observe_task(event, "error")
+
+        @crewai_event_bus.on(LLMCallStartedEvent)
+        def on_llm_call_started(source, event):
+            _observe_llm_call(event)
+
+        @crewai_event_bus.on(LLMCallCompletedEvent)
+        def on_llm_call_completed(source, event):
+            _observe_llm_call(event, "ok", event.model or getattr(source, "model", ""))
+
+        @crewai_event_bus.on(LLMCallFailedEvent)
+        def on_llm_call_failed(source, event):
+            _observe_llm_call(event, "error", getattr(source, "model", ""))
+
+        @crewai_event_bus.on(ToolUsageFinishedEvent)
+        def on_tool_finished(source, event):
+            seconds = (event.finished_at - event.started_at).total_seconds()
+            TOOL_SECONDS.observe(max(seconds, 0.0), tool=event.tool_name, agent=agent_key(event.agent_role),
+                                 status="cache" if event.from_cache else "ok")
+
+        @crewai_event_bus.on(CrewKickoffCompletedEvent)
+        def on_crew_completed(source, event):
+            _record_token_usage(source)
+
+        @crewai_event_bus.on(CrewKickoffFailedEvent)
+        def on_crew_failed(source, event):
+            _record_token_usage(source)
+
+        # Chunks de streaming são entregues de forma síncrona, na ordem em que chegam
+        @crewai_event_bus.on(LLMStreamChunkEvent)
+        def on_stream_chunk(source, event):
+            if event.chunk:
+                _announce_task(event.task_name or "", (event.agent_role or "").strip())
+                emit_job_event("token", task=event.task_name or "", delta=event.chunk)
+                LLM_STREAM_CHUNKS.inc(agent=agent_key(event.agent_role))
+
+        _installed = True
@@ -0,0 +1,140 @@
+"""
+Cache de templates das crews.
+
+Construir um `CreateCrewProject()` relê `config/agents.yaml` e `config/tasks.yaml`,
+instancia o `ScrapeWebsiteTool` e todos os `Agent`. Aqui isso acontece uma única
+vez por processo: cada crew (copywriting, dashboard) é montada uma vez como
+template e cada request recebe um `crew.copy()`, que clona agentes e tasks
+(estado mutável da execução) mas reaproveita ferramentas, LLMs e configuração.
+
+A classe pode ser passada pronta ou por um `loader` (ex: `CrewLoader.load`), que
+só é chamado no primeiro uso: o import do CrewAI sai do startup do servidor.
+`import_crew_project()` é o único caminho de import da classe do projeto
+(backend, benchmarks e testes usam o mesmo).
+"""
+import sys
+import threading
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional
+
+from result_cache import hash_files
+
+
+# Raiz do pacote `create_crew_project` (crew.py, config/, tools/)
+CREW_PROJECT_SRC = (Path(__file__).resolve().parent / "projeto_agente" / "src" / "projeto_agente"
+                    / "create_crew_project" / "src")
+
+
+def import_crew_project():
+    """Classe `CreateCrewProject` (importa o CrewAI e o crewai_tools: leva segundos)"""
+    src = str(CREW_PROJECT_SRC)
+    if src not in sys.path:
+        sys.path.append(src)
+    from create_crew_project.crew import CreateCrewProject
+    return CreateCrewProject
+
+
+def warm_up_llm(llm) -> str:
+    """Deixa o cliente do LLM pronto para a primeira chamada, sem requisição à API"""
+    client = getattr(llm, "client", None)
+    if client is not None:
+        # O SDK da OpenAI/Anthropic importa os recursos (chat.completions, messages) no primeiro acesso
+        for path in ("chat.completions", "messages"):
+            target = client
+            for attr in path.split("."):
+                target = getattr(target, attr, None)
+                if target is None:
+                    break
+    return str(getattr(llm, "model", None) or llm)
+
+
+class CrewTemplateCache:
+    """Mantém uma instância do projeto e um template por crew, entregando clones baratos"""
+    def __init__(self, crew_class=None, prepare: Optional[Callable[[object], None]] = None,
+                 loader: Optional[Callable[[], type]] = None):
+        if crew_class is None and loader is None:
+            raise ValueError("Informe crew_class ou loader.")
+        self._crew_class = crew_class
+        self._loader = loader
+        # Ajuste aplicado uma vez em cada template recém-montado (os clones herdam)
+        self._prepare = prepare
+        self._project = None
+        self._templates: Dict[str, object] = {}
+        self._config_hash = None
+        # Modelos cujos clientes foram preparados no warm_up
+        self.warm_llms: List[str] = []
+        self._lock = threading.Lock()
+
+    @property
+    def crew_class(self):
+        """Classe do projeto; com `loader`, importada na primeira chamada"""
+        if self._crew_class is None:
+            self._crew_class = self._loader()
+        return self._crew_class
+
+    def config_files(self) -> List[Path]:
+        """Arquivos YAML de agents/tasks usados pela classe da crew"""
+        crew_class = self.crew_class
+        base_dir = Path(getattr(crew_class, "base_directory", "."))
+        return [
+            base_dir / getattr(crew_class, "original_agents_config_path", "config/agents.yaml"),
+            base_dir / getattr(crew_class, "original_tasks_config_path", "config/tasks.yaml"),
+        ]
+
+    @property
+    def config_hash(self) -> str:
+        """Hash dos YAML; entra nas chaves de cache para invalidá-las quando a config muda"""
+        if self._config_hash is None:
+            self._config_hash = hash_files(self.config_files())
+        return self._config_hash
+
+    @property
+    def project(self):
+        """Instância única do projeto (YAML parseado uma vez por processo)"""
+        if self._project is None:
+            with self._lock:
+                if self._project is None:
+                    self._project = self.crew_class()
+        return self._project
+
+    def template(self, name: str):
+        """Crew montada uma vez via `<name>_crew()`; nunca deve ser executada diretamente"""
+        template = self._templates.get(name)
+        if template is None:
+            project = self.project
+            with self._lock:
+                template = self._templates.get(name)
+                if template is None:
+                    builder = getattr(project, f"{name}_crew", None)
+                    if builder is None:
+                        raise KeyError(f"Crew desconhecida: {name}")
+                    template = builder()
+                    if self._prepare is not None:
+                        self._prepare(template)
+                    self._templates[name] = template
+        return template
+
+    def get(self, name: str):
+        """Clone da crew pronto para um `kickoff()` por request"""
+        return self.template(name).copy()
+
+    def warm_up(self, names: Iterable[str] = ("copywriting", "dashboard")):
+        """Monta antecipadamente os templates e os clientes dos LLMs (ex: no startup do servidor)"""
+        llms = {}
+        for name in names:
+            for agent in getattr(self.template(name), "agents", []):
+                llm = getattr(agent, "llm", None)
+                if llm is not None:
+                    llms[id(llm)] = llm
+        self.warm_llms = sorted({warm_up_llm(llm) for llm in llms.values()})
+
+    @property
+    def templates(self) -> List[str]:
+        return sorted(self._templates)
+
+    def clear(self):
+        with self._lock:
+            self._templates.clear()
+            self.warm_llms = []
+            self._project = None
+            self._config_hash = None
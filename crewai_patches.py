@@ -0,0 +1,191 @@
+"""
+Patches do EventsBus do CrewAI aplicados uma única vez por processo.
+
+Antes os métodos do `CrewAIEventsBus` eram embrulhados de novo a cada request,
+então cada evento passava por uma camada extra de try/except por request já
+atendido. Aqui cada patch é registrado por (classe, método): reaplicar é no-op,
+e o registro guarda o que foi alterado (e em qual versão do CrewAI) para
+diagnóstico via `applied_patches()`.
+
+O local do event bus e os nomes dos métodos mudaram entre versões do CrewAI,
+por isso os alvos são procurados nas localizações conhecidas e só os métodos
+existentes na versão instalada são embrulhados.
+"""
+import functools
+import importlib
+import json
+import logging
+import sys
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from log_filter import is_noise
+
+
+# Onde o EventsBus já morou: crewai >= 1.0, 0.1xx e versões antigas
+BUS_LOCATIONS: Tuple[Tuple[str, str], ...] = (
+    ("crewai.events.event_bus", "CrewAIEventsBus"),
+    ("crewai.events.bus", "CrewAIEventsBus"),
+    ("crewai.utilities.events.crewai_event_bus", "CrewAIEventsBus"),
+)
+
+# Métodos que despacham eventos/handlers (apenas os presentes na versão instalada são usados)
+BUS_METHODS: Tuple[str, ...] = (
+    "on_agent_logs_execution",
+    "_handle_sync",
+    "_call_handlers",
+    "_handle_event",
+    "handle",
+    "emit",
+    "_emit",
+)
+
+# Trechos que identificam os erros de JSON (não críticos) dos handlers de eventos
+JSON_ERROR_KEYWORDS = ("expecting value", "json", "jsondecodeerror", "line 1 column 1", "char 0", "expecting")
+
+# Atributo que marca um método já embrulhado por este módulo
+_PATCH_MARKER = "__crewai_patch__"
+
+
+def crewai_version() -> Optional[str]:
+    try:
+        from importlib.metadata import version
+        return version("crewai")
+    except Exception:
+        return None
+
+
+def is_json_error(error: BaseException) -> bool:
+    """True para os erros de parsing de JSON que os handlers do CrewAI geram sem impacto"""
+    if isinstance(error, json.JSONDecodeError) or "jsondecodeerror" in type(error).__name__.lower():
+        return True
+    message = str(error).lower()
+    return any(keyword in message for keyword in JSON_ERROR_KEYWORDS)
+
+
+def suppress_json_errors(method: Callable) -> Callable:
+    """Embrulha `method` para ignorar silenciosamente erros de JSON (demais erros sobem)"""
+    @functools.wraps(method)
+    def wrapper(*args, **kwargs):
+        try:
+            return method(*args, **kwargs)
+        except Exception as e:
+            if is_json_error(e):
+                return None
+            raise
+    return wrapper
+
+
+class PatchRegistry:
+    """Registro idempotente de patches em atributos de classes/objetos"""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._patches: Dict[Tuple[int, str], Dict[str, Any]] = {}
+
+    def apply(self, owner: Any, name: str, wrapper_factory: Callable[[Callable], Callable],
+              version: Optional[str] = None) -> bool:
+        """Substitui `owner.name` por `wrapper_factory(original)` uma única vez; True se aplicou agora"""
+        with self._lock:
+            key = (id(owner), name)
+            if key in self._patches:
+                return False
+            original = getattr(owner, name, None)
+            if not callable(original):
+                return False
+            if getattr(original, _PATCH_MARKER, False):
+                # Já embrulhado (ex.: outro registro no mesmo processo)
+                return False
+            patched = wrapper_factory(original)
+            setattr(patched, _PATCH_MARKER, True)
+            setattr(owner, name, patched)
+            self._patches[key] = {
+                "target": f"{getattr(owner, '__module__', '')}.{getattr(owner, '__qualname__', owner)}",
+                "attribute": name,
+                "crewai_version": version,
+                "owner": owner,
+                "original": original,
+            }
+            return True
+
+    def applied(self) -> List[Dict[str, Any]]:
+        """O que foi alterado (sem as referências aos originais)"""
+        with self._lock:
+            return [
+                {k: v for k, v in patch.items() if k not in ("owner", "original")}
+                for patch in self._patches.values()
+            ]
+
+    def restore(self):
+        """Desfaz todos os patches (útil em benchmarks/diagnóstico)"""
+        with self._lock:
+            for patch in self._patches.values():
+                setattr(patch["owner"], patch["attribute"], patch["original"])
+            self._patches.clear()
+
+
+registry = PatchRegistry()
+
+_installed = False
+_install_lock = threading.Lock()
+
+
+def find_event_bus_class():
+    """Classe do EventsBus da versão instalada do CrewAI (ou None)"""
+    for module_name, class_name in BUS_LOCATIONS:
+        try:
+            module = importlib.import_module(module_name)
+        except ImportError:
+            continue
+        bus_class = getattr(module, class_name, None)
+        if bus_class is not None:
+            return bus_class
+    return None
+
+
+def patch_event_bus(bus_class, patch_registry: PatchRegistry = registry, version: Optional[str] = None) -> int:
+    """Embrulha os métodos de despacho existentes em `bus_class`; devolve quantos foram aplicados agora"""
+    applied = 0
+    for method_name in BUS_METHODS:
+        if method_name in dir(bus_class):
+            applied += patch_registry.apply(bus_class, method_name, suppress_json_errors, version)
+    return applied
+
+
+class _FilteredBusHandler(logging.Handler):
+    """Handler do logger do EventsBus que descarta os erros de eventos conhecidos"""
+    def emit(self, record):
+        message = record.getMessage()
+        if is_noise(message):
+            return
+        print(f"[CrewAI] {message}", file=sys.stderr)
+
+
+def _install_bus_logger_handler():
+    bus_logger = logging.getLogger("crewai.events.bus")
+    if any(isinstance(h, _FilteredBusHandler) for h in bus_logger.handlers):
+        return
+    for handler in list(bus_logger.handlers):
+        bus_logger.removeHandler(handler)
+    bus_logger.addHandler(_FilteredBusHandler())
+    bus_logger.setLevel(logging.CRITICAL)
+
+
+def install_crewai_patches() -> List[Dict[str, Any]]:
+    """Aplica os patches do EventsBus (idempotente) e devolve a lista do que está aplicado"""
+    global _installed
+    with _install_lock:
+        if not _installed:
+            try:
+                bus_class = find_event_bus_class()
+                if bus_class is not None:
+                    patch_event_bus(bus_class, registry, crewai_version())
+            except Exception as e:
+                print(f"⚠️ Não foi possível aplicar os patches do CrewAI EventsBus: {e}")
+            _install_bus_logger_handler()
+            _installed = True
+    return registry.applied()
+
+
+def applied_patches() -> Dict[str, Any]:
+    """Resumo para diagnóstico: versão do CrewAI e métodos embrulhados"""
+    return {"crewai_version": crewai_version(), "installed": _installed, "patches": registry.applied()}
@@ -0,0 +1,169 @@
+"""
+Leitura de CSV em uma única passada.
+
+A codificação e o delimitador são identificados a partir de um prefixo limitado
+do arquivo (BOM, UTF-8 estrito, chardet no prefixo e fallbacks de 8 bits; depois
+`csv.Sniffer` e contagem de candidatos por linha). Com o dialeto definido o
+arquivo é lido uma única vez, com o engine do pyarrow quando disponível.
+"""
+import codecs
+import csv
+import io
+import os
+from collections import Counter
+from typing import Any, Dict, Optional, Tuple
+
+import pandas as pd
+
+
+# Bytes do início do arquivo usados para identificar codificação e delimitador
+SNIFF_BYTES = int(os.getenv("CSV_SNIFF_BYTES", str(64 * 1024)))
+# Engine do pandas: "pyarrow" (padrão, se instalado) ou "c"
+CSV_ENGINE = os.getenv("CSV_ENGINE", "pyarrow")
+
+DELIMITERS = (",", ";", "\t", "|")
+FALLBACK_ENCODINGS = ("cp1252", "latin-1")
+
+_BOMS = (
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+)
+
+
+class CsvReadError(ValueError):
+    """O conteúdo não pôde ser lido como CSV"""
+
+
+def _decode_prefix(prefix: bytes, encoding: str) -> Optional[str]:
+    """Decodifica o prefixo tolerando um caractere multibyte cortado no final"""
+    decoder = codecs.getincrementaldecoder(encoding)()
+    try:
+        return decoder.decode(prefix, final=False)
+    except (UnicodeDecodeError, LookupError):
+        return None
+
+
+def sniff_encoding(prefix: bytes) -> Tuple[str, str]:
+    """(codificação, texto decodificado do prefixo)"""
+    for bom, encoding in _BOMS:
+        if prefix.startswith(bom):
+            text = _decode_prefix(prefix, encoding)
+            if text is not None:
+                return encoding, text
+
+    text = _decode_prefix(prefix, "utf-8")
+    if text is not None:
+        return "utf-8", text
+
+    try:
+        import chardet
+        detected = chardet.detect(prefix)
+        if detected.get("encoding") and (detected.get("confidence") or 0) > 0.7:
+            encoding = codecs.lookup(detected["encoding"]).name
+            text = _decode_prefix(prefix, encoding)
+            if text is not None:
+                return encoding, text
+    except (ImportError, LookupError):
+        pass
+
+    for encoding in FALLBACK_ENCODINGS:
+        text = _decode_prefix(prefix, encoding)
+        if text is not None:
+            return encoding, text
+    raise CsvReadError("Não foi possível identificar a codificação do CSV.")
+
+
+def sniff_delimiter(text: str) -> str:
+    """Delimitador mais provável no texto do prefixo"""
+    lines = [line for line in text.splitlines()[:50] if line.strip()]
+    if len(lines) > 1:
+        # Descarta a última linha (pode estar cortada pelo limite do prefixo)
+        lines = lines[:-1]
+    sample = "\n".join(lines)
+    try:
+        return csv.Sniffer().sniff(sample, delimiters="".join(DELIMITERS)).delimiter
+    except csv.Error:
+        pass
+    # Fallback: delimitador com contagem igual (e maior que zero) no maior número de linhas
+    best, best_score = ",", 0
+    for delimiter in DELIMITERS:
+        counts = Counter(line.count(delimiter) for line in lines)
+        count, score = counts.most_common(1)[0] if counts else (0, 0)
+        if count and score > best_score:
+            best, best_score = delimiter, score
+    return best
+
+
+def sniff_dialect(data: bytes, sniff_bytes: int = SNIFF_BYTES) -> Dict[str, str]:
+    """Codificação e delimitador a partir dos primeiros `sniff_bytes` bytes"""
+    encoding, text = sniff_encoding(data[:sniff_bytes])
+    return {"encoding": encoding, "delimiter": sniff_delimiter(text)}
+
+
+def _pyarrow_available() -> bool:
+    try:
+        import pyarrow  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def read_csv_bytes(data: bytes, engine: Optional[str] = None, **read_kwargs: Any) -> Tuple[pd.DataFrame, Dict[str, str]]:
+    """
+    Lê um CSV (bytes) com uma única passada de parsing.
+
+    Retorna (DataFrame, {"encoding", "delimiter", "engine"}).
+    """
+    if not data:
+        raise CsvReadError("Arquivo CSV vazio.")
+    dialect = sniff_dialect(data)
+    engine = engine or CSV_ENGINE
+    if engine == "pyarrow" and not _pyarrow_available():
+        engine = "c"
+
+    def parse(selected_engine: str, encoding: str) -> pd.DataFrame:
+        return pd.read_csv(
+            io.BytesIO(data),
+            sep=dialect["delimiter"],
+            encoding=encoding,
+            engine=selected_engine,
+            **read_kwargs,
+        )
+
+    # O prefixo pode ser UTF-8 válido e o restante do arquivo não (ex.: acentos só no fim);
+    # nesse caso (raro) o arquivo é lido de novo com as codificações de 8 bits
+    encodings = [dialect["encoding"]]
+    if dialect["encoding"] == "utf-8":
+        encodings += list(FALLBACK_ENCODINGS)
+
+    last_error: Optional[Exception] = None
+    for encoding in encodings:
+        for selected_engine in dict.fromkeys((engine, "c")):
+            try:
+                df = parse(selected_engine, encoding)
+            except UnicodeDecodeError as e:
+                last_error = e
+                break  # Próxima codificação
+            except Exception as e:
+                if selected_engine == "c":
+                    # Erro de estrutura: outra codificação não resolveria
+                    raise CsvReadError(f"Erro ao ler o CSV: {e}")
+                # O pyarrow é mais estrito (ex.: linhas com colunas a mais); o engine C é o fallback
+                last_error = e
+                continue
+            if _has_undecoded_bytes(df):
+                # O pyarrow não falha com UTF-8 inválido: devolve a coluna como bytes
+                last_error = UnicodeDecodeError(encoding, b"", 0, 1, "bytes inválidos para a codificação")
+                break
+            return df, {**dialect, "encoding": encoding, "engine": selected_engine}
+    raise CsvReadError(f"Erro ao ler o CSV: {last_error}")
+
+
+def _has_undecoded_bytes(df: pd.DataFrame) -> bool:
+    for col in df.select_dtypes(include="object").columns:
+        series = df[col]
+        index = series.first_valid_index()
+        if index is not None and isinstance(series[index], bytes):
+            return True
+    return False
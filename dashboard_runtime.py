@@ -0,0 +1,191 @@
+"""
+Execução do código de dashboard gerado pela crew.
+
+O código é extraído da resposta, limpo (sem releitura do arquivo ou cópias do
+DataFrame) e guardado em disco pela chave dataset + prompt, então o mesmo
+pedido não volta ao backend. Como no DiskCache, os dashboards guardados expiram
+(TTL desde a criação) e, acima do máximo de entradas, saem os usados há mais
+tempo. A compilação (`compile()`) acontece uma vez por
+código no processo e as bibliotecas do namespace de execução são importadas uma
+única vez; nos reruns do Streamlit (interação com os widgets do dashboard) só o
+`exec` do code object já compilado é refeito.
+
+O `plotly`/`plotly.express` do código gerado (no namespace e no `import`) são
+as versões com redução de pontos de `plot_data`.
+"""
+import builtins
+import hashlib
+import json
+import os
+import re
+import time
+import uuid
+from functools import lru_cache
+from pathlib import Path
+from types import CodeType
+from typing import Any, Dict, Optional
+
+from plot_data import PLOT_HELPERS, reduced_plotly_modules
+from result_cache import DEFAULT_CACHE_DIR
+
+
+DASHBOARD_CACHE_DIR = Path(os.getenv("DASHBOARD_CACHE_DIR", DEFAULT_CACHE_DIR / "dashboards"))
+# Dashboards guardados em disco: validade e quantidade máxima (0 = sem limite)
+DASHBOARD_CACHE_TTL_SECONDS = float(os.getenv("DASHBOARD_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+DASHBOARD_CACHE_MAX_ENTRIES = int(os.getenv("DASHBOARD_CACHE_MAX_ENTRIES", "500"))
+# Code objects mantidos em memória (um por código distinto)
+COMPILED_CACHE_SIZE = int(os.getenv("DASHBOARD_COMPILED_CACHE_SIZE", "64"))
+
+CODE_BLOCK_PATTERN = re.compile(r"```python\n(.*?)```", re.DOTALL)
+# Variáveis de DataFrame que o modelo costuma criar em vez de usar 'df'
+DATAFRAME_ALIAS_PATTERN = re.compile(r"\b(data_df|df_data|df_copy|data)\s*=")
+
+
+def extract_code(raw_result: str) -> Optional[str]:
+    """Bloco ```python da resposta da crew (ou None)"""
+    match = CODE_BLOCK_PATTERN.search(raw_result or "")
+    return match.group(1) if match else None
+
+
+def sanitize_code(code: str) -> str:
+    """Remove leituras de arquivo e cópias do DataFrame: o código deve usar o 'df' já carregado"""
+    lines = []
+    for line in code.split("\n"):
+        # Leituras de arquivo (CSV ou Excel): o DataFrame já está disponível
+        if ("pd.read_csv" in line or "pd.read_excel" in line) and ("uploaded_file" not in line.lower() and "io.BytesIO" not in line):
+            continue
+        # Novas variáveis de DataFrame (data_df, df_data etc.)
+        if DATAFRAME_ALIAS_PATTERN.search(line) and "df" in line.lower():
+            continue
+        lines.append(line.replace("data_df", "df"))
+    return "\n".join(lines)
+
+
+def dashboard_key(source: str, payload: Dict[str, Any]) -> str:
+    """Chave do dashboard: origem dos dados (hash do arquivo/aba ou texto) + prompt enviado à crew"""
+    digest = hashlib.sha256(source.encode("utf-8"))
+    digest.update(json.dumps(payload, sort_keys=True, ensure_ascii=False).encode("utf-8"))
+    return digest.hexdigest()
+
+
+@lru_cache(maxsize=COMPILED_CACHE_SIZE)
+def compile_dashboard(code: str) -> CodeType:
+    """Code object do dashboard, compilado uma única vez por código"""
+    return compile(code, "<dashboard>", "exec")
+
+
+def dashboard_builtins(modules: Dict[str, Any], base: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """`__builtins__` do código gerado: `import` dos nomes em `modules` devolve essas versões
+
+    Cobre `import plotly.express as px`, `import plotly.express`,
+    `from plotly import express` e `from plotly.express import line`. Com
+    `base` (outro `__builtins__` do dashboard) os desvios se somam.
+    """
+    base = base if base is not None else vars(builtins)
+    original_import = base["__import__"]
+
+    def dashboard_import(name, globals=None, locals=None, fromlist=(), level=0):
+        if level == 0:
+            if fromlist and name in modules:
+                return modules[name]
+            top_level = name.partition(".")[0]
+            if not fromlist and top_level in modules:
+                return modules[top_level]
+        return original_import(name, globals, locals, fromlist, level)
+
+    return {**base, "__import__": dashboard_import}
+
+
+def plotting_namespace() -> Dict[str, Any]:
+    """Bibliotecas de gráficos do código gerado (plotly express com redução) e as funções de `plot_data`"""
+    namespace: Dict[str, Any] = dict(PLOT_HELPERS)
+    modules = reduced_plotly_modules()
+    if modules:
+        import plotly.graph_objects as go
+        namespace.update(plotly=modules["plotly"], px=modules["plotly.express"], go=go)
+    namespace["__builtins__"] = dashboard_builtins(modules)
+    return namespace
+
+
+@lru_cache(maxsize=1)
+def _base_namespace() -> Dict[str, Any]:
+    """Bibliotecas disponíveis para o código gerado (importadas uma vez por processo)"""
+    import pandas as pd
+    import streamlit as st
+
+    namespace: Dict[str, Any] = {"pd": pd, "pandas": pd, "st": st, "streamlit": st}
+    try:
+        import numpy as np
+        namespace.update(np=np, numpy=np)
+    except ImportError:
+        pass
+    namespace.update(plotting_namespace())
+    return namespace
+
+
+def run_dashboard(code: str, df=None):
+    """Executa o código compilado em um namespace novo (o código gerado pode alterar as globais)"""
+    namespace = {**_base_namespace(), "__name__": "__dashboard__"}
+    if df is not None:
+        namespace["df"] = df
+    exec(compile_dashboard(code), namespace)
+
+
+class DashboardStore:
+    """Dashboards gerados (resposta + código limpo ou especificação) em JSON, pela chave dataset + prompt"""
+    def __init__(self, base_dir: Optional[Path] = None, ttl_seconds: float = DASHBOARD_CACHE_TTL_SECONDS,
+                 max_entries: int = DASHBOARD_CACHE_MAX_ENTRIES):
+        self.base_dir = Path(base_dir or DASHBOARD_CACHE_DIR)
+        self.base_dir.mkdir(parents=True, exist_ok=True)
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+
+    def _path(self, key: str) -> Path:
+        return self.base_dir / f"{key}.json"
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        if not key.isalnum():
+            return None
+        path = self._path(key)
+        try:
+            entry = json.loads(path.read_text(encoding="utf-8"))
+            if self.ttl_seconds and time.time() - entry.get("created_at", 0) > self.ttl_seconds:
+                path.unlink()
+                return None
+            os.utime(path)  # último acesso (LRU)
+            return entry
+        except (OSError, ValueError):
+            return None
+
+    def put(self, key: str, raw_result: str, code: Optional[str], **extra: Any) -> Dict[str, Any]:
+        """Salva o dashboard; `extra` guarda campos do modo especificação (spec, spec_warnings, spec_error)"""
+        entry = {"key": key, "raw_result": raw_result, "code": code, **extra, "created_at": time.time()}
+        path = self._path(key)
+        tmp_path = path.with_suffix(f".{uuid.uuid4().hex}.tmp")
+        tmp_path.write_text(json.dumps(entry, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp_path, path)
+        self._evict(keep=path)
+        return entry
+
+    def _evict(self, keep: Path):
+        """Remove os expirados e, acima de `max_entries`, os usados há mais tempo"""
+        entries = []
+        for path in self.base_dir.glob("*.json"):
+            try:
+                entries.append((path.stat().st_mtime, path))
+            except OSError:
+                continue
+        now = time.time()
+        excess = len(entries) - self.max_entries if self.max_entries else 0
+        for accessed_at, path in sorted(entries):
+            if path == keep:
+                continue
+            # O mtime só cresce com o acesso: sem acesso há mais que o TTL, já expirou pela criação
+            expired = self.ttl_seconds and now - accessed_at > self.ttl_seconds
+            if not expired and excess <= 0:
+                continue
+            try:
+                path.unlink()
+            except OSError:
+                continue
+            excess -= 1
@@ -0,0 +1,644 @@
+"""
+Execução isolada do código de dashboard gerado pela crew.
+
+O código roda em um pool de processos pré-aquecidos (pandas, numpy, pyarrow e
+plotly já importados), com limite de tempo de CPU por execução, limite de
+memória (espaço de endereçamento) por processo e timeout de relógio no lado do
+servidor: um dashboard travado ou que aloca demais derruba só o seu worker,
+que é substituído por outro, e não o Streamlit de todos os usuários. As
+variáveis de ambiente com chaves/tokens não chegam aos workers.
+
+Acesso a arquivos: cada worker roda em um diretório temporário vazio e, no
+código gerado, `open` e o import de `os`, `io`, `pathlib`, `subprocess` (e
+outros módulos de sistema, ver BLOCKED_MODULES) falham. Isso barra o acesso
+casual, mas não é uma fronteira de segurança: o código ainda roda em Python no
+mesmo usuário e pode chegar ao sistema de arquivos por dentro das bibliotecas
+(ex: `pd.read_csv("/caminho")`). Para isolar de fato os arquivos do app (.env,
+código), rode os workers com um usuário sem permissão neles
+(DASHBOARD_SANDBOX_UID/GID, com o servidor iniciado como root) ou em um container.
+
+O DataFrame é gravado uma vez em formato Arrow IPC em memória compartilhada
+(/dev/shm) e os workers o abrem com `pa.memory_map`: a leitura do arquivo não
+passa pelo pipe nem por uma cópia intermediária, mas o `to_pandas()` ainda copia
+os dados para o DataFrame. Por isso cada worker mantém em cache os últimos
+DataFrames recebidos e a conversão acontece uma vez por worker.
+
+Dentro do worker, `st` é um gravador: as chamadas do Streamlit viram uma lista
+de operações (figuras plotly como JSON, matplotlib como PNG, altair como spec
+Vega-Lite) que o servidor reproduz com o Streamlit real (`replay`). Widgets
+recebem chaves estáveis; o valor escolhido pelo usuário volta para o worker na
+execução seguinte, então filtros continuam funcionando.
+"""
+import atexit
+import datetime
+import io
+import os
+import queue
+import re
+import signal
+import tempfile
+import threading
+import traceback
+import uuid
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from dashboard_runtime import compile_dashboard, dashboard_builtins, plotting_namespace
+
+
+# Execução isolada ligada por padrão (DASHBOARD_SANDBOX=false executa no próprio processo)
+SANDBOX_ENABLED = os.getenv("DASHBOARD_SANDBOX", "true").lower() not in ("0", "false", "no")
+SANDBOX_WORKERS = int(os.getenv("DASHBOARD_SANDBOX_WORKERS", "2"))
+# Tempo de CPU por execução e memória adicional por worker (além das bibliotecas importadas)
+SANDBOX_CPU_SECONDS = int(os.getenv("DASHBOARD_SANDBOX_CPU_SECONDS", "10"))
+SANDBOX_MEMORY_MB = int(os.getenv("DASHBOARD_SANDBOX_MEMORY_MB", "1024"))
+# Timeout de relógio (inclui a espera por um worker livre)
+SANDBOX_TIMEOUT = float(os.getenv("DASHBOARD_SANDBOX_TIMEOUT", "30"))
+# Diretório dos DataFrames em Arrow IPC (tmpfs no Linux) e quantos ficam publicados
+SANDBOX_SHM_DIR = Path(os.getenv("DASHBOARD_SANDBOX_SHM_DIR", "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()))
+SANDBOX_MAX_FRAMES = int(os.getenv("DASHBOARD_SANDBOX_MAX_FRAMES", "8"))
+
+# Usuário/grupo sem privilégios para os workers (só aplicado se o servidor roda como root;
+# o Python e as bibliotecas precisam ser legíveis por esse usuário)
+SANDBOX_UID = os.getenv("DASHBOARD_SANDBOX_UID")
+SANDBOX_GID = os.getenv("DASHBOARD_SANDBOX_GID") or SANDBOX_UID
+
+# Módulos que o código gerado não pode importar (arquivos, processos, rede, interpretador)
+BLOCKED_MODULES = frozenset({
+    "os", "io", "sys", "pathlib", "subprocess", "shutil", "glob", "tempfile", "socket",
+    "importlib", "ctypes", "multiprocessing", "builtins", "pty", "signal",
+})
+
+# Variáveis de ambiente removidas nos workers
+SECRET_ENV_PATTERN = re.compile(r"KEY|TOKEN|SECRET|PASSWORD|CREDENTIAL", re.IGNORECASE)
+
+MAIN_CONTAINER = 0
+SIDEBAR_CONTAINER = -1
+
+# Chamadas que devolvem um ou mais containers (DeltaGenerator) usados com `with` ou `col.metric(...)`
+MULTI_CONTAINER_CALLS = {"columns", "tabs"}
+# Chamadas sem efeito no dashboard isolado
+IGNORED_CALLS = {"set_page_config", "rerun", "experimental_rerun", "balloons", "snow", "toast"}
+# Decoradores do Streamlit: no worker só executam a função
+PASSTHROUGH_DECORATORS = {"cache_data", "cache_resource", "cache", "experimental_memo", "experimental_singleton", "fragment"}
+
+
+class SandboxError(RuntimeError):
+    """O worker não concluiu a execução (timeout, limite de CPU/memória ou falha do processo)"""
+
+
+class DashboardCodeError(RuntimeError):
+    """O código gerado levantou uma exceção dentro do worker"""
+
+
+# --- Worker ------------------------------------------------------------------
+
+class _StopDashboard(Exception):
+    """`st.stop()` dentro do código gerado"""
+
+
+def _arg(args: tuple, kwargs: Dict[str, Any], position: int, name: str, default: Any = None) -> Any:
+    if name in kwargs:
+        return kwargs[name]
+    return args[position] if len(args) > position else default
+
+
+def _widget_default(name: str, args: tuple, kwargs: Dict[str, Any]) -> Any:
+    """Valor inicial do widget, igual ao que o Streamlit devolveria na primeira execução"""
+    if name in ("selectbox", "radio"):
+        options = list(_arg(args, kwargs, 1, "options", []))
+        index = kwargs.get("index", 0)
+        return options[index] if index is not None and 0 <= index < len(options) else None
+    if name == "multiselect":
+        default = _arg(args, kwargs, 2, "default", None)
+        if default is None:
+            return []
+        return list(default) if isinstance(default, (list, tuple, set)) else [default]
+    if name == "select_slider":
+        options = list(_arg(args, kwargs, 1, "options", []))
+        value = kwargs.get("value")
+        if value is not None:
+            return tuple(value) if isinstance(value, list) else value
+        return options[0] if options else None
+    if name == "slider":
+        value = _arg(args, kwargs, 3, "value", None)
+        if value is not None:
+            return tuple(value) if isinstance(value, list) else value
+        min_value = _arg(args, kwargs, 1, "min_value", None)
+        return min_value if min_value is not None else 0
+    if name in ("checkbox", "toggle"):
+        return bool(_arg(args, kwargs, 1, "value", False))
+    if name == "number_input":
+        value = _arg(args, kwargs, 3, "value", "min")
+        if value == "min":
+            min_value = _arg(args, kwargs, 1, "min_value", None)
+            return min_value if min_value is not None else 0.0
+        return value
+    if name in ("text_input", "text_area"):
+        return _arg(args, kwargs, 1, "value", "") or ""
+    if name == "date_input":
+        value = _arg(args, kwargs, 1, "value", "today")
+        return datetime.date.today() if value in ("today", "default_value_today") else value
+    if name == "time_input":
+        value = _arg(args, kwargs, 1, "value", "now")
+        return datetime.datetime.now().time().replace(second=0, microsecond=0) if value == "now" else value
+    if name == "color_picker":
+        return _arg(args, kwargs, 1, "value", None) or "#000000"
+    if name == "file_uploader":
+        return None
+    # Botões
+    return False
+
+
+WIDGET_CALLS = {
+    "selectbox", "radio", "multiselect", "select_slider", "slider", "checkbox", "toggle",
+    "number_input", "text_input", "text_area", "date_input", "time_input", "color_picker",
+    "file_uploader", "button", "download_button", "form_submit_button",
+}
+
+
+def _pack(value: Any, depth: int = 0) -> Any:
+    """Converte argumentos das chamadas em valores que podem voltar ao servidor"""
+    if depth > 20:
+        return None
+    if isinstance(value, _Container):
+        return {"__container__": value._cid}
+    if isinstance(value, (str, bytes, int, float, bool, type(None), datetime.date, datetime.time)):
+        return value
+    if isinstance(value, (list, tuple)):
+        packed = [_pack(v, depth + 1) for v in value]
+        return packed if isinstance(value, list) else tuple(packed)
+    if isinstance(value, dict):
+        return {k: _pack(v, depth + 1) for k, v in value.items()}
+    module = type(value).__module__ or ""
+    if module.startswith("plotly") and hasattr(value, "to_json"):
+        return {"__plotly__": value.to_json()}
+    if module.startswith("matplotlib") and hasattr(value, "savefig"):
+        buffer = io.BytesIO()
+        value.savefig(buffer, format="png", bbox_inches="tight")
+        return {"__png__": buffer.getvalue()}
+    if module.startswith("altair") and hasattr(value, "to_dict"):
+        return {"__vega_lite__": value.to_dict()}
+    if module.startswith("pandas.io.formats.style"):
+        # Styler: envia os dados (a formatação depende de funções do código gerado)
+        return value.data
+    if callable(value):
+        # Callbacks (on_change etc.) não existem fora do worker
+        return None
+    return value
+
+
+def _unpack(value: Any, containers: Dict[int, Any]) -> Any:
+    if isinstance(value, list):
+        return [_unpack(v, containers) for v in value]
+    if isinstance(value, tuple):
+        return tuple(_unpack(v, containers) for v in value)
+    if isinstance(value, dict):
+        if "__container__" in value and len(value) == 1:
+            return containers.get(value["__container__"])
+        if "__plotly__" in value and len(value) == 1:
+            import plotly.io as pio
+            return pio.from_json(value["__plotly__"], skip_invalid=True)
+        if "__png__" in value and len(value) == 1:
+            return value["__png__"]
+        if "__vega_lite__" in value and len(value) == 1:
+            return value["__vega_lite__"]
+        return {k: _unpack(v, containers) for k, v in value.items()}
+    return value
+
+
+class _Recorder:
+    """Lista de operações do Streamlit feitas pelo código gerado"""
+    def __init__(self, widget_values: Dict[str, Any], key_prefix: str):
+        self.ops: List[Dict[str, Any]] = []
+        self.widget_values = widget_values
+        self.key_prefix = key_prefix
+        self.widget_keys: List[str] = []
+        self.stack = [MAIN_CONTAINER]
+        self._next_id = 1
+        self._widget_count = 0
+
+    def new_container(self) -> "_Container":
+        cid = self._next_id
+        self._next_id += 1
+        return _Container(self, cid)
+
+    def call(self, target: int, name: str, args: tuple, kwargs: Dict[str, Any]) -> Any:
+        if name in IGNORED_CALLS:
+            return None
+        if name == "stop":
+            raise _StopDashboard()
+        if name == "pyplot":
+            figure = _arg(args, kwargs, 0, "fig", None)
+            if figure is None:
+                import matplotlib.pyplot as plt
+                figure = plt.gcf()
+            name, args, kwargs = "image", (figure,), {}
+        elif name == "altair_chart":
+            # O gráfico vai como spec Vega-Lite
+            name = "vega_lite_chart"
+
+        op: Dict[str, Any] = {"target": target, "name": name}
+        result: Any
+        if name in WIDGET_CALLS:
+            self._widget_count += 1
+            key = str(kwargs.get("key") or f"{self.key_prefix}{name}_{self._widget_count}")
+            kwargs = {**kwargs, "key": key}
+            self.widget_keys.append(key)
+            result = self.widget_values[key] if key in self.widget_values else _widget_default(name, args, kwargs)
+            format_func = kwargs.get("format_func")
+            if callable(format_func):
+                # Rótulos calculados aqui: a função do código gerado não sai do worker
+                options = list(_arg(args, kwargs, 1, "options", []))
+                try:
+                    op["format_labels"] = [[option, str(format_func(option))] for option in options]
+                except Exception:
+                    pass
+        elif name in MULTI_CONTAINER_CALLS:
+            spec = _arg(args, kwargs, 0, "spec" if name == "columns" else "tabs", 1)
+            count = spec if isinstance(spec, int) else len(spec)
+            result = [self.new_container() for _ in range(count)]
+            op["created"] = [c._cid for c in result]
+        else:
+            # Como no Streamlit, cada elemento devolve um container (expander, empty, form, gráfico...)
+            result = self.new_container()
+            op["created"] = result._cid
+
+        op["args"] = _pack(args)
+        op["kwargs"] = _pack(kwargs)
+        self.ops.append(op)
+        return result
+
+
+class _NoopContext:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+def _passthrough(*args, **kwargs):
+    # @st.cache_data e @st.cache_data(ttl=...)
+    if len(args) == 1 and callable(args[0]) and not kwargs:
+        return args[0]
+    return lambda func: func
+
+
+class _Container:
+    """Container do Streamlit no worker: as chamadas viram operações gravadas"""
+    def __init__(self, recorder: _Recorder, cid: int):
+        self._recorder = recorder
+        self._cid = cid
+
+    def _target(self) -> int:
+        return self._cid
+
+    def __getattr__(self, name: str) -> Callable:
+        if name.startswith("__"):
+            raise AttributeError(name)
+        if name in PASSTHROUGH_DECORATORS:
+            return _passthrough
+        if name == "spinner":
+            return lambda *args, **kwargs: _NoopContext()
+        return lambda *args, **kwargs: self._recorder.call(self._target(), name, args, kwargs)
+
+    def __enter__(self):
+        self._recorder.stack.append(self._cid)
+        return self
+
+    def __exit__(self, *exc):
+        self._recorder.stack.pop()
+        return False
+
+
+class _StreamlitProxy(_Container):
+    """Módulo `st` do código gerado: escreve no container ativo (`with col:`)"""
+    def __init__(self, recorder: _Recorder):
+        super().__init__(recorder, MAIN_CONTAINER)
+        self.sidebar = _Container(recorder, SIDEBAR_CONTAINER)
+        self.session_state: Dict[str, Any] = dict(recorder.widget_values)
+
+    def _target(self) -> int:
+        return self._recorder.stack[-1]
+
+
+def _scrub_environment():
+    for name in list(os.environ):
+        if SECRET_ENV_PATTERN.search(name):
+            del os.environ[name]
+
+
+def _blocked_open(*args, **kwargs):
+    raise PermissionError("Dashboards não podem abrir arquivos: use o DataFrame `df`.")
+
+
+def _restricted_builtins(base: Dict[str, Any]) -> Dict[str, Any]:
+    """`__builtins__` do código gerado sem `open` e sem o import de BLOCKED_MODULES"""
+    original_import = base["__import__"]
+
+    def restricted_import(name, globals=None, locals=None, fromlist=(), level=0):
+        if level == 0 and name.partition(".")[0] in BLOCKED_MODULES:
+            raise ImportError(f"O módulo '{name}' não está disponível nos dashboards.")
+        return original_import(name, globals, locals, fromlist, level)
+
+    return {**base, "__import__": restricted_import, "open": _blocked_open}
+
+
+def _isolate_worker() -> str:
+    """Diretório de trabalho vazio e, se configurado, troca para o usuário sem privilégios"""
+    workdir = tempfile.mkdtemp(prefix="dashboard-sandbox-")
+    os.chdir(workdir)
+    if SANDBOX_UID and hasattr(os, "setuid") and os.geteuid() == 0:
+        os.setgroups([])
+        os.setgid(int(SANDBOX_GID))
+        os.setuid(int(SANDBOX_UID))
+    return workdir
+
+
+def _address_space_bytes() -> int:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[0]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+def _limit_memory(memory_mb: int):
+    try:
+        import resource
+    except ImportError:
+        return  # Windows: só o timeout de relógio se aplica
+    # O limite é o que já está mapeado (bibliotecas importadas) + o orçamento do código gerado
+    limit = _address_space_bytes() + memory_mb * 1024 * 1024
+    try:
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    except (ValueError, OSError):
+        pass
+
+
+def _limit_cpu(cpu_seconds: int):
+    try:
+        import resource
+    except ImportError:
+        return
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    soft = int(usage.ru_utime + usage.ru_stime) + cpu_seconds + 1
+    _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+    if hard != resource.RLIM_INFINITY:
+        soft = min(soft, hard)
+    try:
+        # Ao passar do limite o kernel envia SIGXCPU e o worker termina
+        resource.setrlimit(resource.RLIMIT_CPU, (soft, hard))
+    except (ValueError, OSError):
+        pass
+
+
+def _load_frame(path: str, frames: "OrderedDict[str, Any]"):
+    df = frames.get(path)
+    if df is None:
+        import pyarrow as pa
+        with pa.memory_map(path, "r") as source:
+            df = pa.ipc.open_file(source).read_all().to_pandas()
+        frames[path] = df
+        while len(frames) > SANDBOX_MAX_FRAMES:
+            frames.popitem(last=False)
+    frames.move_to_end(path)
+    # Cópia rasa (copy-on-write): alterações do código gerado não afetam o cache
+    return df.copy(deep=False)
+
+
+def _execute(task: Dict[str, Any], frames: "OrderedDict[str, Any]", namespace_base: Dict[str, Any]) -> Dict[str, Any]:
+    recorder = _Recorder(task.get("widget_values") or {}, task.get("key_prefix", ""))
+    proxy = _StreamlitProxy(recorder)
+    namespace = {**namespace_base, "st": proxy, "streamlit": proxy, "__name__": "__dashboard__"}
+    # `import streamlit as st` no código gerado também recebe o proxy (e não o Streamlit real do worker)
+    namespace["__builtins__"] = _restricted_builtins(
+        dashboard_builtins({"streamlit": proxy}, base=namespace_base["__builtins__"])
+    )
+    error = None
+    try:
+        if task.get("frame_path"):
+            namespace["df"] = _load_frame(task["frame_path"], frames)
+        exec(compile_dashboard(task["code"]), namespace)
+    except _StopDashboard:
+        pass
+    except MemoryError:
+        error = "O código do dashboard passou do limite de memória."
+    except Exception as e:
+        tb = traceback.extract_tb(e.__traceback__)
+        lines = [f"linha {frame.lineno}" for frame in tb if frame.filename == "<dashboard>"]
+        where = f" ({lines[-1]})" if lines else ""
+        error = f"{type(e).__name__}: {e}{where}"
+    try:
+        import matplotlib.pyplot as plt
+        plt.close("all")
+    except ImportError:
+        pass
+    return {"ops": recorder.ops, "widget_keys": recorder.widget_keys, "error": error}
+
+
+def _worker_main(conn, cpu_seconds: int, memory_mb: int):
+    """Loop do worker: recebe tarefas pelo pipe até receber None"""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    _scrub_environment()
+    # Pré-aquecimento: bibliotecas que o código gerado usa
+    import numpy as np
+    import pandas as pd
+    import pyarrow as pa
+    pa.table({"_": [0]}).to_pandas()  # carrega o pyarrow.pandas_compat antes de trocar de usuário
+    namespace_base: Dict[str, Any] = {"pd": pd, "pandas": pd, "np": np, "numpy": np, **plotting_namespace()}
+    _isolate_worker()
+    _limit_memory(memory_mb)
+
+    frames: "OrderedDict[str, Any]" = OrderedDict()
+    while True:
+        try:
+            task = conn.recv()
+        except (EOFError, OSError):
+            return
+        if task is None:
+            return
+        _limit_cpu(cpu_seconds)
+        try:
+            result = _execute(task, frames, namespace_base)
+            conn.send(result)
+        except MemoryError:
+            conn.send({"ops": [], "widget_keys": [], "error": "O código do dashboard passou do limite de memória."})
+        except Exception as e:
+            # Resultado que não pôde ser enviado (ex.: objeto não serializável)
+            conn.send({"ops": [], "widget_keys": [], "error": f"Resultado do dashboard inválido: {e}"})
+
+
+# --- Servidor ----------------------------------------------------------------
+
+class _Worker:
+    def __init__(self, process, conn):
+        self.process = process
+        self.conn = conn
+
+    def kill(self):
+        try:
+            self.process.kill()
+            self.process.join(timeout=5)
+        except Exception:
+            pass
+        self.conn.close()
+
+
+class SandboxPool:
+    """Pool de workers pré-aquecidos que executam o código de dashboard com limites"""
+    def __init__(self, workers: int = SANDBOX_WORKERS, cpu_seconds: int = SANDBOX_CPU_SECONDS,
+                 memory_mb: int = SANDBOX_MEMORY_MB, timeout: float = SANDBOX_TIMEOUT,
+                 shm_dir: Optional[Path] = None):
+        import multiprocessing
+        # spawn: o servidor do Streamlit tem várias threads, fork não é seguro
+        self._ctx = multiprocessing.get_context("spawn")
+        self.cpu_seconds = cpu_seconds
+        self.memory_mb = memory_mb
+        self.timeout = timeout
+        self.shm_dir = Path(shm_dir or SANDBOX_SHM_DIR)
+        self._idle: "queue.Queue[_Worker]" = queue.Queue()
+        self._frames: "OrderedDict[str, str]" = OrderedDict()
+        self._frames_lock = threading.Lock()
+        self._closed = False
+        for _ in range(max(1, workers)):
+            self._idle.put(self._spawn())
+        atexit.register(self.close)
+
+    def _spawn(self) -> _Worker:
+        parent_conn, child_conn = self._ctx.Pipe()
+        process = self._ctx.Process(
+            target=_worker_main, args=(child_conn, self.cpu_seconds, self.memory_mb),
+            name="dashboard-sandbox", daemon=True,
+        )
+        process.start()
+        child_conn.close()
+        return _Worker(process, parent_conn)
+
+    def publish(self, data_key: str, df) -> str:
+        """Grava o DataFrame em Arrow IPC na memória compartilhada (uma vez por `data_key`)"""
+        with self._frames_lock:
+            path = self._frames.get(data_key)
+            if path is not None and os.path.exists(path):
+                self._frames.move_to_end(data_key)
+                return path
+            path = str(self.shm_dir / f"dashboard_{data_key}.arrow")
+            self._write_frame(df, path)
+            self._frames[data_key] = path
+            while len(self._frames) > SANDBOX_MAX_FRAMES:
+                _, old_path = self._frames.popitem(last=False)
+                try:
+                    os.unlink(old_path)
+                except OSError:
+                    pass
+            return path
+
+    @staticmethod
+    def _write_frame(df, path: str):
+        import pyarrow as pa
+        try:
+            table = pa.Table.from_pandas(df)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            # Colunas de texto com tipos misturados: envia como string
+            mixed = df.select_dtypes(include="object").columns
+            table = pa.Table.from_pandas(df.astype({col: "string" for col in mixed}))
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with pa.OSFile(tmp_path, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+        os.replace(tmp_path, path)
+
+    def run(self, code: str, data_key: Optional[str] = None, df=None,
+            widget_values: Optional[Dict[str, Any]] = None, key_prefix: str = "") -> Dict[str, Any]:
+        """Executa o código em um worker e devolve {"ops", "widget_keys", "error"}"""
+        if self._closed:
+            raise SandboxError("O sandbox de dashboards foi encerrado.")
+        frame_path = self.publish(data_key or uuid.uuid4().hex, df) if df is not None else None
+        try:
+            worker = self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise SandboxError("Todos os workers de dashboard estão ocupados. Tente novamente.")
+
+        healthy = False
+        try:
+            worker.conn.send({
+                "code": code,
+                "frame_path": frame_path,
+                "widget_values": widget_values or {},
+                "key_prefix": key_prefix,
+            })
+            if not worker.conn.poll(self.timeout):
+                raise SandboxError(f"O código do dashboard passou de {self.timeout:.0f}s e foi interrompido.")
+            result = worker.conn.recv()
+            healthy = True
+            return result
+        except (EOFError, OSError):
+            worker.process.join(timeout=1)
+            raise SandboxError(self._exit_reason(worker.process.exitcode))
+        finally:
+            if healthy:
+                self._idle.put(worker)
+            else:
+                # Worker travado ou morto: substitui por um novo
+                worker.kill()
+                if not self._closed:
+                    self._idle.put(self._spawn())
+
+    def _exit_reason(self, exitcode: Optional[int]) -> str:
+        if hasattr(signal, "SIGXCPU") and exitcode == -signal.SIGXCPU:
+            return f"O código do dashboard passou do limite de {self.cpu_seconds}s de CPU e foi interrompido."
+        if exitcode == -signal.SIGKILL:
+            return "O worker do dashboard foi encerrado pelo sistema (possível excesso de memória)."
+        return f"O worker do dashboard terminou inesperadamente (código {exitcode})."
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        while True:
+            try:
+                worker = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                worker.conn.send(None)
+            except (OSError, ValueError):
+                pass
+            worker.process.join(timeout=2)
+            worker.kill()
+        with self._frames_lock:
+            for path in self._frames.values():
+                try:
+                    os.unlink(path)
+                except OSError:
+                    pass
+            self._frames.clear()
+
+
+def replay(result: Dict[str, Any]):
+    """Reproduz no Streamlit real as operações gravadas no worker"""
+    import streamlit as st
+
+    containers: Dict[int, Any] = {MAIN_CONTAINER: st, SIDEBAR_CONTAINER: st.sidebar}
+    for op in result.get("ops", []):
+        target = containers.get(op["target"], st)
+        args = _unpack(op.get("args", ()), containers)
+        kwargs = _unpack(op.get("kwargs", {}), containers)
+        labels = op.get("format_labels")
+        if labels is not None:
+            try:
+                mapping = {option: label for option, label in labels}
+                kwargs["format_func"] = lambda option, mapping=mapping: mapping.get(option, str(option))
+            except TypeError:
+                kwargs.pop("format_func", None)
+        else:
+            kwargs.pop("format_func", None)
+        output = getattr(target, op["name"])(*args, **kwargs)
+        created = op.get("created")
+        if isinstance(created, list):
+            containers.update(zip(created, output))
+        elif created is not None:
+            containers[created] = output
+    if result.get("error"):
+        raise DashboardCodeError(result["error"])
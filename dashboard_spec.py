@@ -0,0 +1,495 @@
+"""
+Modo estruturado do dashboard: especificação JSON validada + renderizador interno.
+
+Em vez de código Python, a crew devolve um JSON com KPIs, filtros e gráficos
+(tipo, colunas x/y/cor, agregação, granularidade de tempo). A especificação é
+validada (pydantic) e conferida contra as colunas do dataset; o renderizador
+faz as agregações com groupby vetorizado do pandas e monta as figuras plotly
+a partir das tabelas já agregadas, sem `exec`.
+
+As tabelas agregadas ficam em cache por dataset + gráfico + valores dos
+filtros: redesenhar o dashboard (rerun do Streamlit) ou voltar a um filtro já
+usado não recalcula nada.
+"""
+import datetime
+import hashlib
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Literal, Optional
+
+import numpy as np
+import pandas as pd
+from pydantic import BaseModel, ConfigDict, Field, ValidationError
+
+from datasets import detect_dates
+from plot_data import HISTOGRAM_BINS, MAX_PLOT_POINTS, bin_counts, downsample, sample_rows
+
+
+# Tabelas agregadas mantidas em memória (dataset + gráfico + filtros)
+AGG_CACHE_SIZE = int(os.getenv("DASHBOARD_AGG_CACHE_SIZE", "256"))
+# Filtros categóricos com mais valores distintos que isso viram busca por texto
+MAX_FILTER_OPTIONS = 200
+
+ChartType = Literal["bar", "line", "area", "scatter", "histogram", "pie", "box"]
+Aggregation = Literal["sum", "mean", "median", "count", "nunique", "min", "max"]
+TimeGrain = Literal["D", "W", "M", "Q", "Y"]
+
+_JSON_BLOCK_PATTERN = re.compile(r"```(?:json)?\s*\n(.*?)```", re.DOTALL)
+
+
+class SpecError(ValueError):
+    """A resposta da crew não é uma especificação de dashboard válida"""
+
+
+class KpiSpec(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+
+    label: str
+    column: Optional[str] = None  # Sem coluna (ou agg=count): total de linhas
+    agg: Aggregation = "sum"
+    format: Literal["number", "currency", "percent"] = "number"
+
+
+class FilterSpec(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+
+    column: str
+    label: Optional[str] = None
+
+
+class ChartSpec(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+
+    type: ChartType
+    title: str = ""
+    x: Optional[str] = None
+    y: Optional[str] = None
+    color: Optional[str] = None
+    agg: Aggregation = "sum"
+    time_grain: Optional[TimeGrain] = None
+    top_n: Optional[int] = Field(default=None, ge=1, le=100)
+
+
+class DashboardSpec(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+
+    title: str = "Dashboard"
+    kpis: List[KpiSpec] = Field(default_factory=list, max_length=8)
+    filters: List[FilterSpec] = Field(default_factory=list, max_length=6)
+    charts: List[ChartSpec] = Field(default_factory=list, max_length=12)
+    insights: List[str] = Field(default_factory=list)
+
+
+SPEC_INSTRUCTIONS = """
+Você é um Data Scientist Senior especialista em dashboards de marketing.
+Monte o dashboard como uma ESPECIFICAÇÃO JSON (não escreva código Python).
+Responda com a análise em texto e, no final, UM bloco ```json com este formato:
+
+```json
+{
+  "title": "Título do dashboard",
+  "kpis": [{"label": "Investimento total", "column": "custo", "agg": "sum", "format": "currency"}],
+  "filters": [{"column": "canal", "label": "Canal"}],
+  "charts": [
+    {"type": "line", "title": "Custo por mês", "x": "data", "y": "custo", "agg": "sum", "time_grain": "M"},
+    {"type": "bar", "title": "Conversões por campanha", "x": "campanha", "y": "conversões", "agg": "sum", "top_n": 10}
+  ],
+  "insights": ["Frase curta e acionável sobre os dados"]
+}
+```
+
+REGRAS:
+- Use APENAS colunas listadas em DADOS RECEBIDOS, com o nome exato.
+- "type": bar, line, area, scatter, histogram, pie ou box.
+- "agg": sum, mean, median, count, nunique, min ou max ("count" não precisa de "y").
+- "time_grain" (D, W, M, Q, Y) só para "x" de data; "color" é uma coluna categórica opcional.
+- histogram usa só "x" (numérica); scatter usa "x" e "y" numéricas; pie usa "x" (categorias) e "y".
+- "format" dos KPIs: number, currency ou percent.
+- No máximo 8 KPIs, 6 filtros e 12 gráficos.
+"""
+
+
+def extract_json(text: str) -> str:
+    """Último bloco ```json da resposta (ou o trecho entre o primeiro '{' e o último '}')"""
+    blocks = _JSON_BLOCK_PATTERN.findall(text or "")
+    for block in reversed(blocks):
+        if block.lstrip().startswith("{"):
+            return block
+    start, end = (text or "").find("{"), (text or "").rfind("}")
+    if start == -1 or end <= start:
+        raise SpecError("A resposta não contém uma especificação JSON.")
+    return text[start:end + 1]
+
+
+def parse_spec(text: str) -> DashboardSpec:
+    """Especificação validada a partir da resposta da crew"""
+    try:
+        data = json.loads(extract_json(text))
+    except json.JSONDecodeError as e:
+        raise SpecError(f"JSON da especificação inválido: {e}")
+    try:
+        return DashboardSpec.model_validate(data)
+    except ValidationError as e:
+        raise SpecError(f"Especificação fora do formato esperado: {e.error_count()} erro(s). {e.errors()[0]['msg']}")
+
+
+def validate_columns(spec: DashboardSpec, columns: List[str]) -> List[str]:
+    """Remove da especificação itens com colunas inexistentes; devolve os avisos"""
+    known = set(columns)
+    warnings: List[str] = []
+
+    def missing(*names: Optional[str]) -> List[str]:
+        return [name for name in names if name is not None and name not in known]
+
+    kpis = []
+    for kpi in spec.kpis:
+        bad = missing(kpi.column)
+        if bad:
+            warnings.append(f"KPI '{kpi.label}' ignorado: coluna inexistente {bad[0]!r}.")
+        else:
+            kpis.append(kpi)
+    filters = []
+    for item in spec.filters:
+        if missing(item.column):
+            warnings.append(f"Filtro ignorado: coluna inexistente {item.column!r}.")
+        else:
+            filters.append(item)
+    charts = []
+    for chart in spec.charts:
+        bad = missing(chart.x, chart.y, chart.color)
+        if bad:
+            warnings.append(f"Gráfico '{chart.title or chart.type}' ignorado: coluna inexistente {bad[0]!r}.")
+        elif chart.x is None and chart.type not in ("box",):
+            warnings.append(f"Gráfico '{chart.title or chart.type}' ignorado: sem coluna 'x'.")
+        elif chart.type in ("scatter", "box") and chart.y is None:
+            warnings.append(f"Gráfico '{chart.title or chart.type}' ignorado: sem coluna 'y'.")
+        else:
+            charts.append(chart)
+    spec.kpis, spec.filters, spec.charts = kpis, filters, charts
+    return warnings
+
+
+# --- Agregações --------------------------------------------------------------
+
+def _is_datetime_like(series: pd.Series) -> bool:
+    return pd.api.types.is_datetime64_any_dtype(series)
+
+
+def _as_datetime(series: pd.Series) -> pd.Series:
+    if _is_datetime_like(series):
+        return series
+    # Texto com datas (ex.: "31/01/2024"): mesmos formatos do perfil do dataset
+    dates = detect_dates(series)
+    return dates if dates is not None else pd.to_datetime(series, errors="coerce")
+
+
+def date_columns(spec: "DashboardSpec") -> List[str]:
+    """Colunas que a especificação usa como data (eixo x temporal)"""
+    return list(dict.fromkeys(
+        chart.x for chart in spec.charts
+        if chart.x and (chart.time_grain or chart.type in ("line", "area"))
+    ))
+
+
+def prepare_frame(df: pd.DataFrame, columns: List[str]) -> pd.DataFrame:
+    """Converte (uma vez) as colunas de texto que são datas; as demais ficam como estão"""
+    converted = {}
+    for column in columns:
+        if column in df.columns and not _is_datetime_like(df[column]) and not pd.api.types.is_numeric_dtype(df[column]):
+            dates = detect_dates(df[column])
+            if dates is not None:
+                converted[column] = dates
+    return df.assign(**converted) if converted else df
+
+
+def _auto_grain(dates: pd.Series) -> TimeGrain:
+    span = dates.max() - dates.min()
+    if pd.isna(span):
+        return "D"
+    days = span.days
+    if days > 3 * 365:
+        return "Q" if days > 8 * 365 else "M"
+    if days > 120:
+        return "W"
+    return "D"
+
+
+def _time_bucket(series: pd.Series, grain: Optional[str]) -> pd.Series:
+    dates = _as_datetime(series)
+    grain = grain or _auto_grain(dates)
+    if grain == "D":
+        return dates.dt.floor("D")
+    # Períodos: "M" → início do mês, "W" → início da semana etc.
+    return dates.dt.to_period(grain).dt.start_time
+
+
+def _x_values(df: pd.DataFrame, chart: ChartSpec) -> pd.Series:
+    series = df[chart.x]
+    if chart.time_grain or (chart.type in ("line", "area") and _is_datetime_like(series)):
+        return _time_bucket(series, chart.time_grain)
+    return series
+
+
+def _value_column(chart: ChartSpec) -> str:
+    if chart.agg == "count" or chart.y is None:
+        return "registros"
+    return chart.y
+
+
+def aggregate(df: pd.DataFrame, chart: ChartSpec) -> pd.DataFrame:
+    """Tabela pequena (já agregada) com os dados do gráfico"""
+    if chart.type == "histogram":
+        values = pd.to_numeric(df[chart.x], errors="coerce").to_numpy(dtype="float64", na_value=np.nan)
+        if not np.isfinite(values).any():
+            return pd.DataFrame({chart.x: [], "registros": []})
+        counts, edges = bin_counts(values, HISTOGRAM_BINS)
+        return pd.DataFrame({chart.x: (edges[:-1] + edges[1:]) / 2, "registros": counts, "largura": np.diff(edges)})
+
+    if chart.type == "scatter":
+        columns = [c for c in dict.fromkeys((chart.x, chart.y, chart.color)) if c]
+        data = df[columns].dropna(subset=[chart.x, chart.y])
+        return sample_rows(data, MAX_PLOT_POINTS).reset_index(drop=True)
+
+    if chart.type == "box":
+        # Estatísticas do box plot calculadas aqui: o navegador recebe 5 números por grupo
+        values = pd.to_numeric(df[chart.y], errors="coerce")
+        keys = [df[chart.x]] if chart.x else [pd.Series("Todos", index=df.index)]
+        grouped = values.groupby(keys, observed=True, dropna=True)
+        stats = grouped.quantile([0.0, 0.25, 0.5, 0.75, 1.0]).unstack()
+        stats.columns = ["min", "q1", "mediana", "q3", "max"]
+        return stats.reset_index().rename(columns={stats.index.name or "index": chart.x or "grupo"})
+
+    x_values = _x_values(df, chart).rename(chart.x)
+    keys = [x_values] + ([df[chart.color]] if chart.color else [])
+    value_name = _value_column(chart)
+    if value_name == "registros":
+        table = df.groupby(keys, observed=True, dropna=True).size().rename(value_name)
+    else:
+        values = pd.to_numeric(df[chart.y], errors="coerce") if chart.agg not in ("nunique", "count") else df[chart.y]
+        table = values.groupby(keys, observed=True, dropna=True).agg(chart.agg).rename(value_name)
+    table = table.reset_index()
+
+    is_time = _is_datetime_like(table[chart.x])
+    if chart.type in ("bar", "pie") and not is_time:
+        totals = table.groupby(chart.x, observed=True)[value_name].sum().sort_values(ascending=False)
+        order = totals.index[:chart.top_n] if chart.top_n else totals.index
+        table = table[table[chart.x].isin(order)]
+        table[chart.x] = pd.Categorical(table[chart.x], categories=list(order), ordered=True)
+        table = table.sort_values(chart.x)
+    else:
+        table = table.sort_values(chart.x)
+        if chart.type in ("line", "area"):
+            # Séries longas (ex.: granularidade diária de vários anos) passam pelo LTTB
+            table = downsample(table, chart.x, value_name, MAX_PLOT_POINTS, by=chart.color)
+    return table.reset_index(drop=True)
+
+
+def build_figure(chart: ChartSpec, data: pd.DataFrame):
+    """Figura plotly a partir da tabela agregada"""
+    import plotly.express as px
+    import plotly.graph_objects as go
+
+    title = chart.title or None
+    if chart.type == "histogram":
+        figure = go.Figure(go.Bar(x=data[chart.x], y=data["registros"], width=data["largura"]))
+        figure.update_layout(title=title, xaxis_title=chart.x, yaxis_title="registros", bargap=0.02)
+        return figure
+    if chart.type == "box":
+        group = chart.x or "grupo"
+        figure = go.Figure(go.Box(
+            x=data[group].astype(str), q1=data["q1"], median=data["mediana"], q3=data["q3"],
+            lowerfence=data["min"], upperfence=data["max"], name=chart.y,
+        ))
+        figure.update_layout(title=title, yaxis_title=chart.y)
+        return figure
+    if chart.type == "scatter":
+        return px.scatter(data, x=chart.x, y=chart.y, color=chart.color, title=title)
+
+    value = _value_column(chart)
+    if chart.type == "pie":
+        return px.pie(data, names=chart.x, values=value, title=title)
+    if chart.type == "line":
+        return px.line(data, x=chart.x, y=value, color=chart.color, title=title, markers=len(data) <= 60)
+    if chart.type == "area":
+        return px.area(data, x=chart.x, y=value, color=chart.color, title=title)
+    return px.bar(data, x=chart.x, y=value, color=chart.color, title=title)
+
+
+def compute_kpi(df: pd.DataFrame, kpi: KpiSpec) -> Any:
+    if kpi.column is None or kpi.agg == "count":
+        return int(df[kpi.column].count()) if kpi.column else len(df)
+    series = df[kpi.column]
+    if kpi.agg != "nunique":
+        series = pd.to_numeric(series, errors="coerce")
+    value = series.agg(kpi.agg)
+    return None if pd.isna(value) else value
+
+
+def format_kpi(value: Any, fmt: str) -> str:
+    if value is None:
+        return "-"
+    if fmt == "percent":
+        # Aceita tanto 0.125 quanto 12.5
+        number = float(value) * 100 if abs(float(value)) <= 1 else float(value)
+        return f"{number:,.1f}%".replace(",", "X").replace(".", ",").replace("X", ".")
+    if isinstance(value, (int, np.integer)):
+        text = f"{int(value):,}"
+    else:
+        text = f"{float(value):,.2f}"
+    text = text.replace(",", "X").replace(".", ",").replace("X", ".")
+    return f"R$ {text}" if fmt == "currency" else text
+
+
+def apply_filters(df: pd.DataFrame, selections: Dict[str, Any]) -> pd.DataFrame:
+    """Aplica as seleções dos filtros com uma única máscara vetorizada"""
+    mask = np.ones(len(df), dtype=bool)
+    for column, selection in selections.items():
+        if selection is None:
+            continue
+        series = df[column]
+        if isinstance(selection, tuple) and len(selection) == 2:
+            low, high = selection
+            if isinstance(low, datetime.date):
+                dates = _as_datetime(series)
+                mask &= ((dates >= pd.Timestamp(low)) & (dates < pd.Timestamp(high) + pd.Timedelta(days=1))).to_numpy()
+            else:
+                mask &= series.between(low, high).to_numpy()
+        elif isinstance(selection, list):
+            if selection:
+                mask &= series.isin(selection).to_numpy()
+        elif isinstance(selection, str) and selection:
+            mask &= series.astype(str).str.contains(selection, case=False, regex=False, na=False).to_numpy()
+    return df if mask.all() else df[mask]
+
+
+class AggregateCache:
+    """LRU de tabelas agregadas por dataset + gráfico + filtros"""
+    def __init__(self, max_entries: int = AGG_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, pd.DataFrame]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(data_key: str, item: BaseModel, selections: Dict[str, Any]) -> str:
+        raw = json.dumps([data_key, type(item).__name__, item.model_dump(), selections], sort_keys=True, default=str)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get_or_compute(self, key: str, compute) -> pd.DataFrame:
+        with self._lock:
+            table = self._entries.get(key)
+            if table is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return table
+            self.misses += 1
+        table = compute()
+        with self._lock:
+            self._entries[key] = table
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return table
+
+
+aggregate_cache = AggregateCache()
+
+# DataFrames com as colunas de data já convertidas (por dataset)
+_prepared_frames: "OrderedDict[str, pd.DataFrame]" = OrderedDict()
+_prepared_lock = threading.Lock()
+
+
+def _prepared(df: pd.DataFrame, data_key: str, columns: List[str]) -> pd.DataFrame:
+    columns = sorted(set(columns))
+    key = f"{data_key}:{','.join(columns)}"
+    with _prepared_lock:
+        prepared = _prepared_frames.get(key)
+        if prepared is not None:
+            _prepared_frames.move_to_end(key)
+            return prepared
+    prepared = prepare_frame(df, columns)
+    with _prepared_lock:
+        _prepared_frames[key] = prepared
+        while len(_prepared_frames) > 4:
+            _prepared_frames.popitem(last=False)
+    return prepared
+
+
+# --- Streamlit ---------------------------------------------------------------
+
+def _filter_widget(st, df: pd.DataFrame, item: FilterSpec, key: str) -> Any:
+    """Widget do filtro conforme o tipo da coluna; devolve a seleção"""
+    series = df[item.column]
+    label = item.label or item.column
+    if pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+        low, high = series.min(), series.max()
+        if pd.isna(low) or low == high:
+            return None
+        low, high = (int(low), int(high)) if pd.api.types.is_integer_dtype(series) else (float(low), float(high))
+        selection = st.slider(label, low, high, (low, high), key=key)
+        return None if tuple(selection) == (low, high) else tuple(selection)
+    if _is_datetime_like(series) and series.notna().any():
+        start, end = series.min().date(), series.max().date()
+        selection = st.date_input(label, (start, end), min_value=start, max_value=end, key=key)
+        if isinstance(selection, (list, tuple)) and len(selection) == 2 and tuple(selection) != (start, end):
+            return tuple(selection)
+        return None
+    options = series.dropna().unique()
+    if len(options) > MAX_FILTER_OPTIONS:
+        return st.text_input(f"{label} (contém)", key=key) or None
+    return st.multiselect(label, sorted(options, key=str), key=key) or None
+
+
+def render_spec(spec: DashboardSpec, df: pd.DataFrame, data_key: str):
+    """Desenha o dashboard da especificação no Streamlit"""
+    import streamlit as st
+
+    st.title(spec.title)
+    prefix = f"spec_{data_key[:8]}_"
+    df = _prepared(df, data_key, date_columns(spec) + [item.column for item in spec.filters])
+
+    selections: Dict[str, Any] = {}
+    if spec.filters:
+        columns = st.columns(min(len(spec.filters), 3))
+        for index, item in enumerate(spec.filters):
+            with columns[index % len(columns)]:
+                selection = _filter_widget(st, df, item, f"{prefix}filtro_{item.column}")
+            if selection is not None:
+                selections[item.column] = selection
+
+    filtered: Optional[pd.DataFrame] = None
+
+    def current() -> pd.DataFrame:
+        # A máscara dos filtros só é calculada se algum resultado não estiver em cache
+        nonlocal filtered
+        if filtered is None:
+            filtered = apply_filters(df, selections)
+        return filtered
+
+    if spec.kpis:
+        columns = st.columns(min(len(spec.kpis), 4))
+        for index, kpi in enumerate(spec.kpis):
+            key = aggregate_cache.key(data_key, kpi, selections)
+            table = aggregate_cache.get_or_compute(key, lambda kpi=kpi: pd.DataFrame({"valor": [compute_kpi(current(), kpi)]}))
+            columns[index % len(columns)].metric(kpi.label, format_kpi(table["valor"].iloc[0], kpi.format))
+
+    if spec.charts:
+        st.divider()
+        columns = st.columns(2)
+        for index, chart in enumerate(spec.charts):
+            key = aggregate_cache.key(data_key, chart, selections)
+            try:
+                table = aggregate_cache.get_or_compute(key, lambda chart=chart: aggregate(current(), chart))
+                figure = build_figure(chart, table)
+            except Exception as e:
+                columns[index % 2].warning(f"Não foi possível montar o gráfico '{chart.title or chart.type}': {e}")
+                continue
+            columns[index % 2].plotly_chart(figure, use_container_width=True, key=f"{prefix}grafico_{index}")
+
+    if spec.insights:
+        st.divider()
+        st.subheader("Insights")
+        st.markdown("\n".join(f"- {insight}" for insight in spec.insights))
@@ -0,0 +1,321 @@
+"""
+Datasets enviados para o dashboard: ingestão única, armazenamento colunar e perfil.
+
+O arquivo (CSV/Excel) é identificado pelo hash do conteúdo. Na primeira vez ele
+é lido, limpo (linhas/colunas totalmente vazias), gravado em Parquet e perfilado;
+o perfil fica ao lado em JSON. Reenvios do mesmo arquivo (ou dashboards feitos
+a partir do `dataset_id`) não fazem parsing nem profiling de novo.
+
+O perfil é calculado de forma vetorizada sobre o DataFrame inteiro: tipos,
+proporção de nulos, cardinalidade, quantis/média/desvio das colunas numéricas,
+top-k das categóricas e detecção de colunas de data em texto.
+
+Os datasets guardados expiram: os que não são usados há mais de
+DATASET_TTL_SECONDS são apagados e, acima de DATASET_STORE_MAX_MB no total, os
+usados há mais tempo saem primeiro (LRU, como no DiskCache). O acesso é marcado
+no mtime do JSON a cada `get()`.
+"""
+import hashlib
+import json
+import math
+import os
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import pandas as pd
+
+from context_builder import build_data_context
+from csv_reader import CsvReadError, read_csv_bytes
+from excel_loader import ExcelReadError, ExcelWorkbook
+from result_cache import DEFAULT_CACHE_DIR
+
+
+DATASET_DIR = Path(os.getenv("DATASET_DIR", DEFAULT_CACHE_DIR / "datasets"))
+# Datasets sem uso há mais que isso são apagados (0 = nunca expiram)
+DATASET_TTL_SECONDS = float(os.getenv("DATASET_TTL_SECONDS", str(7 * 24 * 3600)))
+# Tamanho máximo dos Parquet guardados; acima disso saem os usados há mais tempo (0 = sem limite)
+DATASET_STORE_MAX_BYTES = int(os.getenv("DATASET_STORE_MAX_MB", "2048")) * 1024 * 1024
+
+# Quantis calculados para as colunas numéricas
+PROFILE_QUANTILES = (0.0, 0.05, 0.25, 0.5, 0.75, 0.95, 1.0)
+# Quantidade de valores mais frequentes por coluna categórica
+PROFILE_TOP_K = 5
+# Linhas do início e do fim guardadas como amostra
+PROFILE_SAMPLE_ROWS = 5
+# Amostra usada para detectar datas em colunas de texto (e fração mínima de acertos)
+DATE_SAMPLE_SIZE = 200
+DATE_MIN_RATIO = 0.9
+# Formatos testados (vetorizados) antes do parsing genérico, que é lento; dia antes do mês
+DATE_FORMATS = (
+    "ISO8601",
+    "%d/%m/%Y", "%d/%m/%Y %H:%M", "%d/%m/%Y %H:%M:%S",
+    "%d-%m-%Y", "%d.%m.%Y",
+    "%m/%d/%Y", "%m/%d/%Y %H:%M", "%m/%d/%Y %H:%M:%S",
+)
+
+PROFILE_VERSION = 1
+
+
+class DatasetError(ValueError):
+    """Arquivo enviado não pôde ser lido como planilha"""
+
+
+def content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def _json_value(value: Any) -> Any:
+    """Converte escalares do numpy/pandas em tipos JSON (NaN/NaT viram None)"""
+    try:
+        if pd.isna(value):
+            return None
+    except (TypeError, ValueError):
+        pass
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    if hasattr(value, "item"):
+        value = value.item()
+    if isinstance(value, float) and (math.isnan(value) or math.isinf(value)):
+        return None
+    if isinstance(value, (str, int, float, bool)):
+        return value
+    return str(value)
+
+
+def _read_csv(data: bytes) -> pd.DataFrame:
+    try:
+        df, _ = read_csv_bytes(data)
+    except CsvReadError as e:
+        raise DatasetError(str(e))
+    return df
+
+
+def _read_excel(data: bytes, filename: str) -> pd.DataFrame:
+    try:
+        return ExcelWorkbook(data, filename).sheet()
+    except ExcelReadError as e:
+        raise DatasetError(str(e))
+
+
+def read_upload(data: bytes, filename: str) -> pd.DataFrame:
+    """Lê o arquivo enviado (pela extensão) e remove linhas/colunas totalmente vazias"""
+    name = (filename or "").lower()
+    if name.endswith(".csv"):
+        df = _read_csv(data)
+    elif name.endswith((".xlsx", ".xls")):
+        df = _read_excel(data, filename)
+    else:
+        raise DatasetError(f"Formato de arquivo não suportado: {filename}")
+    # Uma única máscara de nulos para as duas limpezas (evita duas cópias completas)
+    empty = df.isna()
+    df = df.loc[~empty.all(axis=1), ~empty.all(axis=0)]
+    df.columns = [str(c) for c in df.columns]
+    return df.reset_index(drop=True)
+
+
+def detect_dates(series: pd.Series) -> Optional[pd.Series]:
+    """Converte uma coluna de texto em datas se a amostra for quase toda de datas"""
+    non_null = series.dropna()
+    if non_null.empty:
+        return None
+    sample = non_null.sample(min(len(non_null), DATE_SAMPLE_SIZE), random_state=0).astype(str)
+    if sample.str.fullmatch(r"[-+]?\d+([.,]\d+)?").mean() > 0.5:
+        return None  # Números em texto não são datas
+    for date_format in DATE_FORMATS + ("mixed",):
+        parsed = pd.to_datetime(sample, errors="coerce", format=date_format)
+        if parsed.notna().mean() >= DATE_MIN_RATIO:
+            return _parse_dates(series, date_format)
+    return None
+
+
+def _parse_dates(series: pd.Series, date_format: str) -> pd.Series:
+    """Coluna inteira no formato identificado (strptime do pyarrow, bem mais rápido que o do pandas)"""
+    if date_format not in ("ISO8601", "mixed"):
+        try:
+            import pyarrow as pa
+            import pyarrow.compute as pc
+        except ImportError:
+            pa = None
+        if pa is not None:
+            try:
+                parsed = pc.strptime(pa.array(series, from_pandas=True), format=date_format, unit="us", error_is_null=True)
+                return pd.Series(parsed.to_numpy(zero_copy_only=False), index=series.index, name=series.name)
+            except (pa.ArrowException, TypeError):
+                pass
+    return pd.to_datetime(series, errors="coerce", format=date_format)
+
+
+def profile_dataframe(df: pd.DataFrame) -> Dict[str, Any]:
+    """Perfil completo do DataFrame, serializável em JSON"""
+    rows = int(len(df))
+    null_rate = df.isna().mean() if rows else pd.Series(0.0, index=df.columns)
+    cardinality = df.nunique(dropna=True)
+
+    numeric = df.select_dtypes(include="number")
+    numeric_stats: Dict[str, Dict[str, Any]] = {}
+    if not numeric.empty:
+        quantiles = numeric.quantile(list(PROFILE_QUANTILES))
+        means, stds = numeric.mean(), numeric.std()
+        for col in numeric.columns:
+            numeric_stats[col] = {
+                "mean": _json_value(means[col]),
+                "std": _json_value(stds[col]),
+                "quantiles": {str(q): _json_value(quantiles.at[q, col]) for q in PROFILE_QUANTILES},
+            }
+
+    columns: List[Dict[str, Any]] = []
+    for col in df.columns:
+        series = df[col]
+        info: Dict[str, Any] = {
+            "name": col,
+            "dtype": str(series.dtype),
+            "kind": "numeric" if col in numeric_stats else "categorical",
+            "null_rate": _json_value(null_rate[col]),
+            "cardinality": int(cardinality[col]),
+        }
+        if col in numeric_stats:
+            info.update(numeric_stats[col])
+        else:
+            dates = series if pd.api.types.is_datetime64_any_dtype(series) else None
+            if dates is None and (series.dtype == object or pd.api.types.is_string_dtype(series)):
+                dates = detect_dates(series)
+            if dates is not None:
+                info["kind"] = "datetime"
+                info["min"] = _json_value(dates.min())
+                info["max"] = _json_value(dates.max())
+            elif pd.api.types.is_bool_dtype(series):
+                info["kind"] = "boolean"
+            top = series.value_counts(dropna=True).head(PROFILE_TOP_K)
+            info["top"] = [{"value": _json_value(v), "count": int(c)} for v, c in top.items()]
+        columns.append(info)
+
+    if rows > 2 * PROFILE_SAMPLE_ROWS:
+        sample_df = pd.concat([df.head(PROFILE_SAMPLE_ROWS), df.tail(PROFILE_SAMPLE_ROWS)])
+    else:
+        sample_df = df
+    sample = [
+        {col: _json_value(value) for col, value in record.items()}
+        for record in sample_df.to_dict(orient="records")
+    ]
+
+    return {
+        "version": PROFILE_VERSION,
+        "rows": rows,
+        "columns_count": int(df.shape[1]),
+        "columns": columns,
+        "sample": sample,
+    }
+
+
+def profile_summary(meta: Dict[str, Any], token_budget: Optional[int] = None) -> str:
+    """Texto do perfil para o data_context da crew de dashboard (dentro do orçamento de tokens)"""
+    return build_data_context(meta["profile"], meta.get("filename", ""), meta.get("file_type", ""), token_budget)
+
+
+class DatasetStore:
+    """Datasets em Parquet + perfil JSON, endereçados pelo hash do arquivo original"""
+    def __init__(self, base_dir: Optional[Path] = None, ttl_seconds: float = DATASET_TTL_SECONDS,
+                 max_bytes: int = DATASET_STORE_MAX_BYTES):
+        self.base_dir = Path(base_dir or DATASET_DIR)
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.base_dir.mkdir(parents=True, exist_ok=True)
+        self._locks: Dict[str, threading.Lock] = {}
+        self._locks_lock = threading.Lock()
+
+    def _paths(self, dataset_id: str):
+        return self.base_dir / f"{dataset_id}.parquet", self.base_dir / f"{dataset_id}.json"
+
+    def _lock_for(self, dataset_id: str) -> threading.Lock:
+        with self._locks_lock:
+            return self._locks.setdefault(dataset_id, threading.Lock())
+
+    def get(self, dataset_id: str) -> Optional[Dict[str, Any]]:
+        """Metadados + perfil do dataset (ou None se não existir)"""
+        if not dataset_id.isalnum():
+            return None
+        data_path, meta_path = self._paths(dataset_id)
+        if not (data_path.exists() and meta_path.exists()):
+            return None
+        try:
+            if self.ttl_seconds and time.time() - meta_path.stat().st_mtime > self.ttl_seconds:
+                return None
+            meta = json.loads(meta_path.read_text(encoding="utf-8"))
+            os.utime(meta_path)  # último acesso (TTL e LRU)
+        except (OSError, ValueError):
+            return None
+        if meta.get("profile", {}).get("version") != PROFILE_VERSION:
+            return None
+        return meta
+
+    def load(self, dataset_id: str, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """DataFrame do dataset (lendo apenas `columns`, se informado)"""
+        data_path, _ = self._paths(dataset_id)
+        return pd.read_parquet(data_path, columns=columns)
+
+    def ingest(self, data: bytes, filename: str) -> Dict[str, Any]:
+        """Armazena e perfila o arquivo; se o conteúdo já existe, devolve o perfil salvo"""
+        dataset_id = content_hash(data)
+        with self._lock_for(dataset_id):
+            meta = self.get(dataset_id)
+            if meta is not None:
+                return {**meta, "cached": True}
+
+            df = read_upload(data, filename)
+            data_path, meta_path = self._paths(dataset_id)
+            self._write_parquet(df, data_path)
+            meta = {
+                "dataset_id": dataset_id,
+                "filename": filename,
+                "file_type": "CSV" if filename.lower().endswith(".csv") else "Excel",
+                "size_bytes": len(data),
+                "profile": profile_dataframe(df),
+            }
+            tmp_path = meta_path.with_suffix(f".{uuid.uuid4().hex}.tmp")
+            tmp_path.write_text(json.dumps(meta, ensure_ascii=False), encoding="utf-8")
+            os.replace(tmp_path, meta_path)
+        self.evict(keep=dataset_id)
+        return {**meta, "cached": False}
+
+    def evict(self, keep: Optional[str] = None) -> int:
+        """Apaga os datasets expirados e os usados há mais tempo acima de `max_bytes`"""
+        entries = []
+        for meta_path in self.base_dir.glob("*.json"):
+            data_path = meta_path.with_suffix(".parquet")
+            try:
+                entries.append((meta_path.stat().st_mtime, data_path.stat().st_size, meta_path.stem))
+            except OSError:
+                continue
+        now = time.time()
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for accessed_at, size, dataset_id in sorted(entries):
+            if dataset_id == keep:
+                continue
+            expired = self.ttl_seconds and now - accessed_at > self.ttl_seconds
+            if not expired and (not self.max_bytes or total <= self.max_bytes):
+                continue
+            with self._lock_for(dataset_id):
+                for path in self._paths(dataset_id):
+                    try:
+                        path.unlink()
+                    except FileNotFoundError:
+                        pass
+            total -= size
+            removed += 1
+        return removed
+
+    @staticmethod
+    def _write_parquet(df: pd.DataFrame, path: Path):
+        tmp_path = path.with_suffix(f".{uuid.uuid4().hex}.tmp")
+        try:
+            df.to_parquet(tmp_path, index=False)
+        except Exception:
+            # Colunas de texto com tipos misturados: grava como string
+            mixed = df.select_dtypes(include="object").columns
+            df = df.astype({col: "string" for col in mixed})
+            df.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, path)
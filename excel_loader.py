@@ -0,0 +1,73 @@
+"""
+Leitura de planilhas Excel abrindo o workbook uma única vez.
+
+O formato é identificado pelos bytes iniciais (.xlsx é um zip, .xls é OLE2),
+então não há tentativa e erro entre engines. O workbook fica aberto e cada aba
+só é convertida em DataFrame quando pedida; o resultado fica em cache, então
+trocar de aba (ou voltar para uma já lida) não relê o arquivo. Arquivos .xlsx
+são abertos pelo openpyxl em modo read-only, que lê as linhas em streaming em
+vez de montar o workbook inteiro em memória.
+"""
+import io
+import threading
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+
+_XLSX_MAGIC = b"PK\x03\x04"
+_XLS_MAGIC = b"\xd0\xcf\x11\xe0"
+
+
+class ExcelReadError(ValueError):
+    """O conteúdo não pôde ser lido como planilha Excel"""
+
+
+def detect_engine(data: bytes) -> str:
+    """Engine do pandas para o conteúdo (openpyxl para .xlsx, xlrd para .xls)"""
+    if data.startswith(_XLSX_MAGIC):
+        return "openpyxl"
+    if data.startswith(_XLS_MAGIC):
+        return "xlrd"
+    raise ExcelReadError("Formato Excel não reconhecido (esperado .xlsx ou .xls).")
+
+
+class ExcelWorkbook:
+    """Workbook aberto uma vez, com as abas carregadas sob demanda e cacheadas"""
+    def __init__(self, data: bytes, filename: str = ""):
+        self.filename = filename
+        self.engine = detect_engine(data)
+        try:
+            # O leitor openpyxl do pandas abre o workbook em read-only/data_only
+            self._book = pd.ExcelFile(io.BytesIO(data), engine=self.engine)
+        except ImportError as e:
+            raise ExcelReadError(f"Dependência ausente para ler o arquivo ({self.engine}): {e}")
+        except Exception as e:
+            raise ExcelReadError(f"Erro ao abrir o arquivo Excel: {e}")
+        self.sheet_names: List[str] = [str(name) for name in self._book.sheet_names]
+        self._sheets: Dict[str, pd.DataFrame] = {}
+        self._lock = threading.Lock()
+
+    def sheet(self, name: Optional[str] = None) -> pd.DataFrame:
+        """DataFrame da aba `name` (padrão: primeira aba), lido só na primeira vez"""
+        if not self.sheet_names:
+            raise ExcelReadError("O arquivo Excel não tem abas.")
+        name = name if name is not None else self.sheet_names[0]
+        if name not in self.sheet_names:
+            raise ExcelReadError(f"Aba não encontrada: {name}")
+        with self._lock:
+            df = self._sheets.get(name)
+            if df is None:
+                try:
+                    df = self._book.parse(sheet_name=name)
+                except Exception as e:
+                    raise ExcelReadError(f"Erro ao ler a aba '{name}': {e}")
+                self._sheets[name] = df
+        return df
+
+    @property
+    def loaded_sheets(self) -> List[str]:
+        return list(self._sheets)
+
+    def close(self):
+        self._book.close()
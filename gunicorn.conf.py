@@ -0,0 +1,77 @@
+"""
+Configuração do gunicorn para o backend em produção (vários workers uvicorn).
+
+    gunicorn -c gunicorn.conf.py backend_api:app
+
+O número de workers vem de WEB_CONCURRENCY ou é calculado pela CPU e pela
+memória disponível (limite do cgroup do container, se houver): cada worker
+importa o CrewAI e roda até CREW_MAX_WORKERS crews, então a memória costuma
+limitar antes da CPU. Com mais de um worker, os jobs ficam no store
+compartilhado (JOB_STORE_URL; padrão SQLite em .cache/jobs.sqlite3).
+
+No desligamento (deploy/restart), cada worker para de aceitar jobs e espera
+as crews em execução por até JOB_DRAIN_SECONDS; o `graceful_timeout` do
+gunicorn dá essa folga antes de matar o processo.
+"""
+import multiprocessing
+import os
+
+# Memória estimada por worker (CrewAI + crews em execução)
+WORKER_MEMORY_MB = int(os.getenv("WORKER_MEMORY_MB", "768"))
+MAX_WORKERS = int(os.getenv("MAX_WEB_WORKERS", "8"))
+# Fração da memória disponível destinada aos workers
+MEMORY_FRACTION = 0.8
+
+
+def available_memory_mb():
+    """Limite de memória do container (cgroup v2/v1) ou a memória disponível da máquina"""
+    for path in ("/sys/fs/cgroup/memory.max", "/sys/fs/cgroup/memory/memory.limit_in_bytes"):
+        try:
+            with open(path) as f:
+                value = f.read().strip()
+        except OSError:
+            continue
+        # "max" ou valores gigantes = sem limite no cgroup
+        if value.isdigit() and int(value) < 1 << 60:
+            return int(value) // (1024 * 1024)
+    try:
+        with open("/proc/meminfo") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) // 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+def default_workers():
+    by_cpu = multiprocessing.cpu_count()
+    memory_mb = available_memory_mb()
+    by_memory = int(memory_mb * MEMORY_FRACTION // WORKER_MEMORY_MB) if memory_mb else by_cpu
+    return max(1, min(by_cpu, by_memory, MAX_WORKERS))
+
+
+workers = int(os.getenv("WEB_CONCURRENCY") or default_workers())
+# Os workers herdam o ambiente: o backend usa WEB_CONCURRENCY para escolher o store de jobs
+os.environ["WEB_CONCURRENCY"] = str(workers)
+
+worker_class = "uvicorn_worker.UvicornWorker"
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+# Cada worker importa o app (CrewAI, patches, threads do JobManager) depois do fork
+preload_app = False
+
+# As crews rodam em threads do JobManager; o event loop continua respondendo ao heartbeat
+timeout = 120
+keepalive = 5
+graceful_timeout = int(float(os.getenv("JOB_DRAIN_SECONDS", "120"))) + 30
+
+accesslog = "-"
+errorlog = "-"
+loglevel = os.getenv("LOG_LEVEL", "info")
+
+
+def on_starting(server):
+    server.log.info(
+        "Iniciando %s worker(s) (memória disponível: %s MB, %s MB por worker, store de jobs: %s)",
+        workers, available_memory_mb(), WORKER_MEMORY_MB, os.getenv("JOB_STORE_URL") or ("sqlite" if workers > 1 else "memory"),
+    )
@@ -0,0 +1,174 @@
+"""
+Estado dos jobs compartilhado entre processos (modo com vários workers).
+
+Com um único processo os jobs vivem só na memória do JobManager. Com N workers
+(gunicorn), o POST que cria o job e o GET /api/jobs/{id} (ou o SSE) podem cair
+em processos diferentes: cada worker grava o status, o resultado e os eventos
+dos seus jobs em um store compartilhado e os outros workers leem de lá.
+
+- `SqliteJobStore`: arquivo SQLite (WAL), para vários workers na mesma máquina;
+- `RedisJobStore`: servidor compatível com Redis (Redis, Valkey, KeyDB...),
+  para workers em máquinas diferentes (requer o pacote `redis`);
+- `create_job_store()`: escolhe pelo JOB_STORE_URL (`sqlite:///caminho`,
+  `redis://...`, `memory`). Sem a variável, usa SQLite quando
+  WEB_CONCURRENCY > 1 e só memória com um único worker.
+"""
+import json
+import os
+from abc import ABC, abstractmethod
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from result_cache import DEFAULT_CACHE_DIR
+
+
+JOB_STORE_URL = os.getenv("JOB_STORE_URL", "")
+# Jobs finalizados (e seus eventos) ficam no store por esse tempo
+JOB_STORE_TTL_SECONDS = float(os.getenv("JOB_TTL_SECONDS", "3600"))
+# Jobs de outro worker ainda em execução expiram do Redis depois desse tempo sem atualização
+JOB_STORE_RUNNING_TTL_SECONDS = 24 * 3600
+
+
+class JobStore(ABC):
+    """Registro (status/resultado) e eventos de cada job, visíveis para todos os workers"""
+    @abstractmethod
+    def save(self, record: Dict[str, Any]):
+        """Grava o registro do job (substitui o anterior)"""
+
+    @abstractmethod
+    def load(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Registro do job ou None"""
+
+    @abstractmethod
+    def append_events(self, job_id: str, events: List[Dict[str, Any]]):
+        """Acrescenta eventos (já numerados por `seq`, em ordem) em uma única gravação"""
+
+    @abstractmethod
+    def events_after(self, job_id: str, seq: int) -> List[Dict[str, Any]]:
+        """Eventos com `seq` maior que o informado"""
+
+    def prune(self, ttl_seconds: float):
+        """Remove jobs finalizados há mais de `ttl_seconds` (no Redis a expiração é automática)"""
+
+
+class SqliteJobStore(JobStore):
+    """Store em um arquivo SQLite compartilhado pelos processos da mesma máquina"""
+    def __init__(self, path: Optional[Path] = None):
+        self.path = Path(path or DEFAULT_CACHE_DIR / "jobs.sqlite3")
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                " id TEXT PRIMARY KEY, status TEXT NOT NULL, record TEXT NOT NULL,"
+                " finished_at REAL, updated_at REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS job_events ("
+                " job_id TEXT NOT NULL, seq INTEGER NOT NULL, event TEXT NOT NULL,"
+                " PRIMARY KEY (job_id, seq))"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_finished ON jobs(finished_at)")
+
+    def _connect(self) -> sqlite3.Connection:
+        # Uma conexão por thread (sqlite3 não compartilha conexões entre threads)
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            # Eventos de token são muitos e pequenos: fsync só nos checkpoints do WAL
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def save(self, record: Dict[str, Any]):
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO jobs (id, status, record, finished_at, updated_at) VALUES (?, ?, ?, ?, ?)",
+                (record["job_id"], record["status"], json.dumps(record, ensure_ascii=False),
+                 record.get("finished_at"), time.time()),
+            )
+
+    def load(self, job_id: str) -> Optional[Dict[str, Any]]:
+        row = self._connect().execute("SELECT record FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def append_events(self, job_id: str, events: List[Dict[str, Any]]):
+        conn = self._connect()
+        with conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO job_events (job_id, seq, event) VALUES (?, ?, ?)",
+                [(job_id, event["seq"], json.dumps(event, ensure_ascii=False)) for event in events],
+            )
+
+    def events_after(self, job_id: str, seq: int) -> List[Dict[str, Any]]:
+        rows = self._connect().execute(
+            "SELECT event FROM job_events WHERE job_id = ? AND seq > ? ORDER BY seq", (job_id, seq)
+        ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def prune(self, ttl_seconds: float):
+        conn = self._connect()
+        cutoff = time.time() - ttl_seconds
+        with conn:
+            expired = [row[0] for row in conn.execute(
+                "SELECT id FROM jobs WHERE finished_at IS NOT NULL AND finished_at < ?", (cutoff,)
+            )]
+            for job_id in expired:
+                conn.execute("DELETE FROM job_events WHERE job_id = ?", (job_id,))
+                conn.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+
+
+class RedisJobStore(JobStore):
+    """Store em um servidor compatível com Redis (só comandos básicos: SET/GET/RPUSH/LRANGE/EXPIRE)"""
+    def __init__(self, url: str, prefix: str = "crew:job:", ttl_seconds: float = JOB_STORE_TTL_SECONDS):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("JOB_STORE_URL aponta para Redis, mas o pacote 'redis' não está instalado (pip install redis).")
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+        self.ttl_seconds = int(ttl_seconds)
+
+    def _ttl(self, record: Dict[str, Any]) -> int:
+        return self.ttl_seconds if record.get("finished_at") else JOB_STORE_RUNNING_TTL_SECONDS
+
+    def save(self, record: Dict[str, Any]):
+        key = self.prefix + record["job_id"]
+        ttl = self._ttl(record)
+        pipe = self.client.pipeline()
+        pipe.set(key, json.dumps(record, ensure_ascii=False), ex=ttl)
+        pipe.expire(key + ":events", ttl)
+        pipe.execute()
+
+    def load(self, job_id: str) -> Optional[Dict[str, Any]]:
+        value = self.client.get(self.prefix + job_id)
+        return json.loads(value) if value else None
+
+    def append_events(self, job_id: str, events: List[Dict[str, Any]]):
+        # A lista guarda os eventos na ordem de `seq` (o job grava os lotes em ordem)
+        self.client.rpush(f"{self.prefix}{job_id}:events", *[json.dumps(event, ensure_ascii=False) for event in events])
+
+    def events_after(self, job_id: str, seq: int) -> List[Dict[str, Any]]:
+        values = self.client.lrange(f"{self.prefix}{job_id}:events", seq, -1)
+        return [json.loads(value) for value in values]
+
+
+def create_job_store(url: Optional[str] = None) -> Optional[JobStore]:
+    """Store configurado pelo JOB_STORE_URL (None = jobs só na memória deste processo)"""
+    url = JOB_STORE_URL if url is None else url
+    if not url:
+        url = "sqlite" if int(os.getenv("WEB_CONCURRENCY", "1") or 1) > 1 else "memory"
+    if url == "memory":
+        return None
+    if url == "sqlite":
+        return SqliteJobStore()
+    if url.startswith("sqlite:///"):
+        return SqliteJobStore(Path(url[len("sqlite:///"):]))
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisJobStore(url)
+    raise ValueError(f"JOB_STORE_URL não suportada: {url!r} (use sqlite:///caminho, redis://... ou memory).")
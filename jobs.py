@@ -0,0 +1,358 @@
+"""
+Fila de jobs para executar as crews fora do event loop do uvicorn.
+
+As rotas POST apenas enfileiram o trabalho e devolvem um job_id; a execução
+(`crew.kickoff()`, que é síncrona e pode levar minutos) acontece em um pool
+limitado de threads. O status/resultado é consultado via GET /api/jobs/{id}.
+
+Cada job também guarda uma lista ordenada de eventos (início/fim de task,
+tokens do LLM) que pode ser acompanhada em tempo real via SSE.
+
+Com vários workers, status, resultado e eventos também vão para um store
+compartilhado (ver job_store): qualquer worker responde sobre qualquer job
+(`RemoteJob`). No desligamento, `drain()` para de aceitar jobs, devolve os
+ainda enfileirados como erro (para serem reenviados a outro worker) e espera
+as crews em execução terminarem.
+"""
+import asyncio
+import contextvars
+import os
+import threading
+import time
+import traceback
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait as wait_futures
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple, Union
+
+from job_store import JobStore
+from metrics import JOB_QUEUE_SECONDS, JOB_SECONDS
+
+
+# Estados possíveis de um job
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_ERROR = "error"
+
+# Campos do registro do job (o restante de `to_dict()` é o resultado)
+JOB_RECORD_FIELDS = {"success", "job_id", "kind", "status", "created_at", "started_at", "finished_at", "error"}
+
+# Tokens do LLM que chegam dentro dessa janela viram um único evento `token`
+TOKEN_MERGE_SECONDS = float(os.getenv("JOB_TOKEN_MERGE_SECONDS", "0.25"))
+
+# Eventos `token` vão para o store compartilhado em lotes, no máximo a cada intervalo
+# (eventos de ciclo de vida gravam o lote na hora)
+STORE_FLUSH_SECONDS = float(os.getenv("JOB_STORE_FLUSH_SECONDS", "1.0"))
+
+# Intervalo de consulta ao store compartilhado ao acompanhar jobs de outro worker
+REMOTE_POLL_SECONDS = 0.5
+
+# Job em execução na thread/contexto atual (usado para rotear eventos da crew)
+current_job: contextvars.ContextVar[Optional["Job"]] = contextvars.ContextVar("current_job", default=None)
+
+
+class QueueFullError(Exception):
+    """Levantada quando a fila de jobs atingiu o limite configurado"""
+
+
+class Job:
+    """Representa uma execução de crew enfileirada"""
+    def __init__(self, kind: str, inputs: Dict[str, Any], store: Optional[JobStore] = None):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.inputs = inputs
+        self.status = JOB_QUEUED
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.future = None
+        self.events: List[Dict[str, Any]] = []
+        self._events_lock = threading.Lock()
+        self._waiters: List[Tuple[asyncio.AbstractEventLoop, asyncio.Event]] = []
+        # Tasks da crew cujo início já foi anunciado (os eventos do CrewAI chegam fora de ordem)
+        self.announced_tasks: Set[str] = set()
+        # Evento `token` ainda aberto: recebe os próximos trechos da mesma task até a janela fechar
+        self._pending_token: Optional[Dict[str, Any]] = None
+        # Store compartilhado entre workers (None = só memória)
+        self.store = store
+        # Eventos ainda não gravados no store e lock que mantém a ordem das gravações
+        self._unsaved: List[Dict[str, Any]] = []
+        self._store_lock = threading.Lock()
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (JOB_DONE, JOB_ERROR)
+
+    def emit(self, event_type: str, **data):
+        """Registra um evento e acorda quem estiver acompanhando o job via SSE
+
+        Trechos de `token` seguidos da mesma task são juntados em um só evento a
+        cada TOKEN_MERGE_SECONDS (ou antes do próximo evento de outro tipo): um
+        copy gera milhares de trechos e o log de eventos fica na memória até o TTL.
+        """
+        now = time.time()
+        batch = None
+        with self._events_lock:
+            pending = self._pending_token
+            if event_type == "token":
+                if pending is not None and pending["task"] == data.get("task"):
+                    pending["delta"] += data.get("delta", "")
+                    if now - pending["ts"] < TOKEN_MERGE_SECONDS:
+                        return
+                    self._append(pending)
+                    self._pending_token = None
+                else:
+                    if pending is not None:
+                        self._append(pending)
+                    self._pending_token = {"type": "token", "ts": now, "task": "", "delta": "", **data}
+                    if pending is None:
+                        return
+            else:
+                if pending is not None:
+                    self._append(pending)
+                    self._pending_token = None
+                self._append({"type": event_type, "ts": now, **data})
+            waiters = list(self._waiters)
+            if self._unsaved and (event_type != "token" or now - self._unsaved[0]["ts"] >= STORE_FLUSH_SECONDS):
+                batch, self._unsaved = self._unsaved, []
+                # Pego antes de soltar `_events_lock`: os lotes chegam ao store na ordem dos `seq`
+                self._store_lock.acquire()
+        if batch:
+            # I/O do store fora do `_events_lock` (SSE e a thread da crew não esperam o disco)
+            try:
+                self.store.append_events(self.id, batch)
+            finally:
+                self._store_lock.release()
+        for loop, waiter in waiters:
+            loop.call_soon_threadsafe(waiter.set)
+
+    def _append(self, event: Dict[str, Any]):
+        """Numera e guarda o evento (com `_events_lock`)"""
+        event = {"seq": len(self.events) + 1, **event}
+        self.events.append(event)
+        if self.store is not None:
+            self._unsaved.append(event)
+
+    def announce_task(self, task_name: str) -> bool:
+        """True apenas na primeira vez que a task é anunciada neste job"""
+        with self._events_lock:
+            if task_name in self.announced_tasks:
+                return False
+            self.announced_tasks.add(task_name)
+            return True
+
+    def events_after(self, seq: int) -> List[Dict[str, Any]]:
+        with self._events_lock:
+            return self.events[seq:]
+
+    async def wait_for_events(self, seq: int, timeout: float) -> bool:
+        """Aguarda (sem bloquear o event loop) eventos com número maior que `seq`"""
+        waiter = asyncio.Event()
+        entry = (asyncio.get_running_loop(), waiter)
+        with self._events_lock:
+            if len(self.events) > seq:
+                return True
+            self._waiters.append(entry)
+        try:
+            await asyncio.wait_for(waiter.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            with self._events_lock:
+                self._waiters.remove(entry)
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = {
+            "success": self.status != JOB_ERROR,
+            "job_id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+        if self.result:
+            data.update(self.result)
+        if self.error:
+            data["error"] = self.error
+        return data
+
+    def save(self):
+        """Publica status/resultado no store compartilhado (se houver)"""
+        if self.store is not None:
+            self.store.save(self.to_dict())
+
+
+class RemoteJob:
+    """Job de outro worker, lido do store compartilhado (somente leitura)"""
+    future = None
+
+    def __init__(self, record: Dict[str, Any], store: JobStore):
+        self.record = record
+        self.store = store
+        self.id = record["job_id"]
+        self.kind = record.get("kind", "")
+        self.status = record.get("status", JOB_QUEUED)
+        self.error = record.get("error")
+        self.result = {k: v for k, v in record.items() if k not in JOB_RECORD_FIELDS} or None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (JOB_DONE, JOB_ERROR)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return dict(self.record)
+
+    def events_after(self, seq: int) -> List[Dict[str, Any]]:
+        return self.store.events_after(self.id, seq)
+
+    async def wait_for_events(self, seq: int, timeout: float) -> bool:
+        """Consulta o store até surgirem eventos depois de `seq` (ou o timeout)"""
+        deadline = time.monotonic() + timeout
+        while True:
+            if self.store.events_after(self.id, seq):
+                return True
+            if time.monotonic() >= deadline:
+                return False
+            await asyncio.sleep(min(REMOTE_POLL_SECONDS, max(0.0, deadline - time.monotonic())))
+
+
+def emit_job_event(event_type: str, **data):
+    """Emite um evento no job do contexto atual (não faz nada fora de um job)"""
+    job = current_job.get()
+    if job is not None:
+        job.emit(event_type, **data)
+
+
+class JobManager:
+    """Pool limitado de workers que executa as crews e guarda o estado dos jobs"""
+    def __init__(self, max_workers: Optional[int] = None, max_queue: Optional[int] = None,
+                 ttl_seconds: Optional[float] = None, store: Optional[JobStore] = None,
+                 drain_seconds: Optional[float] = None):
+        self.max_workers = max_workers or int(os.getenv("CREW_MAX_WORKERS", "2"))
+        # Limite de jobs pendentes (enfileirados + rodando); 0 = sem limite
+        self.max_queue = max_queue if max_queue is not None else int(os.getenv("CREW_MAX_QUEUE", "20"))
+        # Tempo que jobs finalizados ficam disponíveis para consulta
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else float(os.getenv("JOB_TTL_SECONDS", "3600"))
+        # Tempo máximo esperando as crews em execução no desligamento
+        self.drain_seconds = drain_seconds if drain_seconds is not None else float(os.getenv("JOB_DRAIN_SECONDS", "120"))
+        self.store = store
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="crew-job")
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._accepting = True
+
+    def submit(self, kind: str, fn: Callable[[Dict[str, Any]], Dict[str, Any]], inputs: Dict[str, Any]) -> Job:
+        """Enfileira `fn(inputs)` e devolve o Job imediatamente"""
+        job = Job(kind, inputs, store=self.store)
+        with self._lock:
+            if not self._accepting:
+                raise QueueFullError("Worker em desligamento.")
+            self._prune()
+            if self.max_queue and self.pending() >= self.max_queue:
+                raise QueueFullError(f"Fila de jobs cheia ({self.max_queue} pendentes).")
+            self._jobs[job.id] = job
+        job.save()
+        job.future = self._executor.submit(self._run, job, fn)
+        return job
+
+    def get(self, job_id: str) -> Optional[Union[Job, RemoteJob]]:
+        """Job deste processo ou, com store compartilhado, de outro worker"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None and self.store is not None:
+            record = self.store.load(job_id)
+            if record is not None:
+                return RemoteJob(record, self.store)
+        return job
+
+    @property
+    def accepting(self) -> bool:
+        """False depois de `drain()` (worker em desligamento)"""
+        return self._accepting
+
+    def pending(self) -> int:
+        """Quantidade de jobs ainda não finalizados (fila + em execução)"""
+        return sum(1 for job in self._jobs.values() if not job.finished)
+
+    def counts(self) -> Dict[str, int]:
+        """Jobs deste processo ainda não finalizados, por estado"""
+        counts = {JOB_QUEUED: 0, JOB_RUNNING: 0}
+        with self._lock:
+            for job in self._jobs.values():
+                if job.status in counts:
+                    counts[job.status] += 1
+        return counts
+
+    def shutdown(self, wait: bool = True):
+        self._executor.shutdown(wait=wait)
+
+    def drain(self, timeout: Optional[float] = None) -> int:
+        """Desligamento gracioso: recusa novos jobs, devolve os enfileirados como erro e
+        espera os em execução até `timeout`; devolve quantos jobs ficaram sem terminar"""
+        timeout = self.drain_seconds if timeout is None else timeout
+        with self._lock:
+            self._accepting = False
+            unfinished = [job for job in self._jobs.values() if not job.finished]
+        running = []
+        for job in unfinished:
+            # Ainda na fila: cancela e avisa para reenviar (outro worker atende)
+            if job.future is not None and job.future.cancel():
+                self._finish_interrupted(job, "Job cancelado: o worker foi desligado antes de iniciar. Envie novamente.")
+            else:
+                running.append(job)
+        if running:
+            print(f"⏳ Aguardando {len(running)} job(s) em execução terminar (até {timeout:.0f} s)...")
+            wait_futures([job.future for job in running if job.future is not None], timeout=timeout)
+        interrupted = [job for job in unfinished if not job.finished]
+        for job in interrupted:
+            self._finish_interrupted(job, "Job interrompido: o worker foi desligado durante a execução. Envie novamente.")
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        return len(interrupted)
+
+    def _finish_interrupted(self, job: Job, message: str):
+        job.error = message
+        job.status = JOB_ERROR
+        job.finished_at = time.time()
+        JOB_SECONDS.observe(job.finished_at - job.created_at, kind=job.kind, status=job.status)
+        job.save()
+        job.emit("job_finished", **job.to_dict())
+
+    def _run(self, job: Job, fn: Callable[[Dict[str, Any]], Dict[str, Any]]):
+        token = current_job.set(job)
+        job.status = JOB_RUNNING
+        job.started_at = time.time()
+        JOB_QUEUE_SECONDS.observe(job.started_at - job.created_at, kind=job.kind)
+        job.save()
+        job.emit("job_started", kind=job.kind)
+        try:
+            job.result = fn(job.inputs)
+            job.status = JOB_DONE
+        except Exception as e:
+            job.error = str(e)
+            job.status = JOB_ERROR
+            print(f"❌ Erro no job {job.kind} ({job.id}): {job.error}")
+            print(f"📋 Traceback: {traceback.format_exc()}")
+        finally:
+            job.finished_at = time.time()
+            current_job.reset(token)
+            JOB_SECONDS.observe(job.finished_at - job.created_at, kind=job.kind, status=job.status)
+            # Status gravado antes do evento: quem vê o job_finished já lê o resultado no store
+            job.save()
+            job.emit("job_finished", **job.to_dict())
+
+    def _prune(self):
+        """Remove jobs finalizados há mais tempo que o TTL"""
+        now = time.time()
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job.finished and job.finished_at and now - job.finished_at > self.ttl_seconds
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+        if expired and self.store is not None:
+            self.store.prune(self.ttl_seconds)
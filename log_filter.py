@@ -0,0 +1,108 @@
+"""
+Filtro das mensagens de erro (não críticas) do EventsBus do CrewAI.
+
+Todos os padrões ficam em uma única regex pré-compilada e a saída é avaliada
+linha a linha em tempo linear. Uma linha com erro é descartada e, logo depois
+dela, também as linhas com cara de traceback (`Traceback ...`, `  File "..."`
+com a linha de código seguinte, os `^^^` e a linha da exceção); a primeira linha
+que não tem esse formato volta a ser exibida. O estado entre escritas é só o
+pedaço de linha ainda incompleto (lista de fragmentos, sem concatenação a cada
+write) e se o traceback de um erro ainda está em andamento.
+"""
+import re
+
+
+# Termos que identificam os erros de eventos do CrewAI (comparação case-insensitive)
+NOISE_PATTERN = re.compile(
+    r"crewai ?eventsbus"
+    r"|on_agent_logs_execution"
+    r"|expecting"
+    r"|jsondecodeerror"
+    r"|sync handler error"
+    r"|action '[^'\n]*' don't exist",
+    re.IGNORECASE,
+)
+
+# Linhas que continuam o traceback de um erro (comparadas no início da linha)
+TRACEBACK_PATTERN = re.compile(
+    r"Traceback \(most recent call last\):"
+    r"|\s+File \""
+    r"|\s*[\^~]+\s*$"
+    r"|During handling of the above exception"
+    r"|The above exception was the direct cause"
+    r"|[A-Za-z_][\w.]*(?:Error|Exception)\b"
+)
+# Linha `  File "..."` do traceback: a seguinte (indentada) é o código daquela linha
+TRACEBACK_FILE_PATTERN = re.compile(r"\s+File \"")
+
+# Tamanho máximo de uma linha sem quebra antes de ser avaliada e escrita
+MAX_PENDING_CHARS = 500
+
+
+def is_noise(text: str) -> bool:
+    """True se o texto contém alguma mensagem de erro de eventos do CrewAI"""
+    return NOISE_PATTERN.search(text) is not None
+
+
+class LogFilter:
+    """Filtro incremental: recebe pedaços de texto e devolve apenas o que deve ser exibido"""
+    def __init__(self, max_pending_chars: int = MAX_PENDING_CHARS):
+        self.max_pending_chars = max_pending_chars
+        self._pending = []        # Fragmentos da linha atual (ainda sem '\n')
+        self._pending_len = 0
+        self._in_traceback = False  # Descartando o traceback de um erro
+        self._after_file = False    # Linha anterior foi um `  File "..."` descartado
+
+    def feed(self, text: str) -> str:
+        if not text:
+            return ""
+
+        newline = text.rfind("\n")
+        if newline == -1:
+            self._pending.append(text)
+            self._pending_len += len(text)
+            if self._pending_len > self.max_pending_chars:
+                return self._take_pending()
+            return ""
+
+        head, tail = text[:newline + 1], text[newline + 1:]
+        if self._pending:
+            head = "".join(self._pending) + head
+            self._pending = []
+            self._pending_len = 0
+        if tail:
+            self._pending.append(tail)
+            self._pending_len = len(tail)
+
+        # Caminho rápido: nenhum erro no bloco e nenhum traceback em andamento
+        if not self._in_traceback and NOISE_PATTERN.search(head) is None:
+            return head
+
+        return "".join(line for line in head.splitlines(keepends=True) if self._keep(line))
+
+    def flush(self) -> str:
+        """Devolve a linha incompleta restante (se não for erro)"""
+        return self._take_pending()
+
+    def _keep(self, line: str) -> bool:
+        """Avalia uma linha: False para erros e para a continuação do traceback"""
+        if NOISE_PATTERN.search(line) is not None:
+            self._in_traceback, self._after_file = True, False
+            return False
+        if self._in_traceback:
+            if self._after_file and line[:1].isspace() and line.strip():
+                self._after_file = False
+                return False
+            if TRACEBACK_PATTERN.match(line) is not None:
+                self._after_file = TRACEBACK_FILE_PATTERN.match(line) is not None
+                return False
+            self._in_traceback = self._after_file = False
+        return True
+
+    def _take_pending(self) -> str:
+        if not self._pending:
+            return ""
+        text = "".join(self._pending)
+        self._pending = []
+        self._pending_len = 0
+        return text if self._keep(text) else ""
@@ -0,0 +1,257 @@
+"""
+Métricas do backend no formato de texto do Prometheus (GET /metrics).
+
+Implementação mínima, sem dependências: counters, gauges e histogramas com
+labels, guardados na memória do processo. Os valores que já são contados por
+outros objetos (hits/misses dos caches, fila do JobManager) são lidos na hora
+da coleta pelos `collector`s registrados em `REGISTRY`.
+
+Quem alimenta cada métrica:
+
+- backend_api: latência das requisições HTTP (middleware), caches e fila;
+- jobs: duração dos jobs (da fila ao fim) e tempo de espera na fila;
+- crew_events: handlers do event bus do CrewAI (tasks, chamadas ao LLM,
+  ferramentas como o scraping) e tokens por agente no fim de cada kickoff;
+- stage_cache: estágios do copywriting servidos do cache x executados.
+
+Com vários workers (gunicorn) cada processo expõe as próprias métricas: o
+Prometheus deve coletar cada worker ou somar as séries com `sum()`.
+"""
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+
+# Buckets em segundos: requisições HTTP, chamadas/ferramentas e execuções longas (tasks/jobs)
+HTTP_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+CALL_BUCKETS = (0.1, 0.25, 0.5, 1, 2, 5, 10, 20, 30, 60, 120)
+RUN_BUCKETS = (1, 2, 5, 10, 20, 30, 60, 120, 300, 600, 1200)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value))
+
+
+def _format_labels(names: Iterable[str], values: Iterable[str]) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Metric:
+    """Base: nome, ajuda e valores por combinação de labels"""
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, object]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name}: labels esperados {self.labelnames}, recebidos {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in items]
+
+    def render(self) -> str:
+        header = f"# HELP {self.name} {_escape(self.documentation)}\n# TYPE {self.name} {self.kind}\n"
+        return header + "".join(line + "\n" for line in self.samples())
+
+
+class Counter(Metric):
+    """Valor que só cresce (a taxa vem do `rate()` no Prometheus)"""
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        if amount < 0:
+            raise ValueError("Counter só aumenta.")
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def set_total(self, value: float, **labels):
+        """Total mantido por outro objeto (ex: DiskCache.hits), copiado na coleta"""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+
+class Gauge(Metric):
+    """Valor instantâneo (fila, proporção de acertos...)"""
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+
+class Histogram(Metric):
+    """Distribuição em buckets cumulativos, com soma e contagem por labels"""
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (),
+                 buckets: Iterable[float] = CALL_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state["counts"][i] += 1
+                    break
+            state["sum"] += value
+            state["count"] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Observa a duração do bloco `with`"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = sorted((key, {"counts": list(s["counts"]), "sum": s["sum"], "count": s["count"]})
+                           for key, s in self._values.items())
+        lines = []
+        names = self.labelnames + ("le",)
+        for key, state in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, state["counts"]):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_format_labels(names, key + (_format_value(bound),))} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(state['sum'])}")
+            lines.append(f"{self.name}_count{labels} {state['count']}")
+        return lines
+
+
+class Registry:
+    """Conjunto de métricas do processo e funções que atualizam valores na coleta"""
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+        self._collectors: List[Callable[[], None]] = []
+        self._lock = threading.Lock()
+
+    def register(self, metric: Metric) -> Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Métrica já registrada: {metric.name}")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def collector(self, fn: Callable[[], None]) -> Callable[[], None]:
+        """Registra `fn()`, chamada antes de cada coleta (pode ser usada como decorator)"""
+        with self._lock:
+            self._collectors.append(fn)
+        return fn
+
+    def get(self, name: str) -> Optional[Metric]:
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        for fn in list(self._collectors):
+            try:
+                fn()
+            except Exception as e:
+                # Uma fonte com problema não derruba a coleta das outras métricas
+                print(f"⚠️ Coletor de métricas {getattr(fn, '__name__', fn)} falhou: {e}")
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "".join(metric.render() for metric in metrics)
+
+
+REGISTRY = Registry()
+
+HTTP_REQUEST_SECONDS = REGISTRY.register(Histogram(
+    "http_request_duration_seconds", "Latência das requisições HTTP (até o início da resposta)",
+    ("method", "route", "status"), buckets=HTTP_BUCKETS,
+))
+JOB_SECONDS = REGISTRY.register(Histogram(
+    "crew_job_duration_seconds", "Tempo de ponta a ponta dos jobs, da fila ao resultado",
+    ("kind", "status"), buckets=RUN_BUCKETS,
+))
+JOB_QUEUE_SECONDS = REGISTRY.register(Histogram(
+    "crew_job_queue_seconds", "Tempo de espera dos jobs na fila antes de começar",
+    ("kind",), buckets=CALL_BUCKETS,
+))
+JOBS = REGISTRY.register(Gauge(
+    "crew_jobs", "Jobs deste worker por estado (profundidade da fila)", ("status",),
+))
+TASK_SECONDS = REGISTRY.register(Histogram(
+    "crew_task_duration_seconds", "Duração de cada task das crews",
+    ("task", "agent", "status"), buckets=RUN_BUCKETS,
+))
+STAGES = REGISTRY.register(Counter(
+    "crew_stage_results_total", "Tasks do copywriting servidas do cache de estágios ou executadas",
+    ("crew", "task", "result"),
+))
+LLM_CALL_SECONDS = REGISTRY.register(Histogram(
+    "crew_llm_call_duration_seconds", "Latência das chamadas ao LLM por agente",
+    ("agent", "model", "status"), buckets=CALL_BUCKETS,
+))
+LLM_TOKENS = REGISTRY.register(Counter(
+    "crew_llm_tokens_total", "Tokens informados pelo provedor do LLM por agente (prompt/completion/cached)",
+    ("agent", "model", "type"),
+))
+LLM_STREAM_CHUNKS = REGISTRY.register(Counter(
+    "crew_llm_stream_chunks_total", "Trechos recebidos por streaming (aprox. tokens de saída) por agente",
+    ("agent",),
+))
+TOOL_SECONDS = REGISTRY.register(Histogram(
+    "crew_tool_duration_seconds", "Duração das ferramentas dos agentes (ex: scraping de sites)",
+    ("tool", "agent", "status"), buckets=CALL_BUCKETS,
+))
+CACHE_REQUESTS = REGISTRY.register(Counter(
+    "cache_requests_total", "Consultas aos caches em disco por resultado (hit/miss)", ("cache", "result"),
+))
+CACHE_HIT_RATIO = REGISTRY.register(Gauge(
+    "cache_hit_ratio", "Proporção de acertos de cada cache desde o início do processo", ("cache",),
+))
+CACHE_ENTRIES = REGISTRY.register(Gauge(
+    "cache_entries", "Entradas armazenadas em cada cache em disco", ("cache",),
+))
+
+
+def track_cache(name: str, cache):
+    """Exporta hits/misses/entradas de um DiskCache a cada coleta"""
+    def collect():
+        stats = cache.stats()
+        hits, misses = stats["hits"], stats["misses"]
+        CACHE_REQUESTS.set_total(hits, cache=name, result="hit")
+        CACHE_REQUESTS.set_total(misses, cache=name, result="miss")
+        CACHE_HIT_RATIO.set(hits / (hits + misses) if hits + misses else 0.0, cache=name)
+        CACHE_ENTRIES.set(stats["entries"], cache=name)
+    collect.__name__ = f"cache_{name}"
+    return REGISTRY.collector(collect)
+
+
+def render() -> str:
+    return REGISTRY.render()
@@ -0,0 +1,235 @@
+"""
+Roteamento de stdout/stderr por contexto (job) em vez de trocar `sys.stdout`.
+
+Um único dispatcher é instalado em `sys.stdout`/`sys.stderr` no início do
+processo e nunca é removido. Cada escrita é enviada ao destino do contexto atual
+(contextvar `_current_output`): dentro de um job é o log filtrado daquele job;
+fora de um job é o stream original, filtrado por thread. Assim crews rodando em
+paralelo não disputam nem restauram o estado global dos streams, e os buffers
+de linha incompleta nunca se misturam entre jobs ou threads.
+
+Os logs antigos são apagados quando um novo log é aberto (no máximo uma vez por
+JOB_LOG_PRUNE_INTERVAL): os que não mudam há mais de JOB_LOG_TTL_SECONDS (por
+padrão o mesmo TTL dos jobs) e, acima de JOB_LOG_MAX_FILES, os mais antigos.
+"""
+import contextvars
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from log_filter import LogFilter
+from result_cache import DEFAULT_CACHE_DIR
+
+
+# Pasta dos logs por job (um arquivo <job_id>.log por execução)
+JOB_LOG_DIR = Path(os.getenv("JOB_LOG_DIR", DEFAULT_CACHE_DIR / "job_logs"))
+# Logs sem alteração há mais que isso são apagados (o job já expirou no JobManager)
+JOB_LOG_TTL_SECONDS = float(os.getenv("JOB_LOG_TTL_SECONDS", os.getenv("JOB_TTL_SECONDS", "3600")))
+# Quantidade máxima de arquivos de log mantidos (0 = sem limite)
+JOB_LOG_MAX_FILES = int(os.getenv("JOB_LOG_MAX_FILES", "500"))
+JOB_LOG_PRUNE_INTERVAL = 60.0
+# Também mostra no console a saída (já filtrada) dos jobs
+JOB_LOG_ECHO = os.getenv("JOB_LOG_ECHO", "true").lower() in ("1", "true", "yes")
+
+# Destino da saída no contexto atual (None = stream original, filtrado)
+_current_output: contextvars.ContextVar[Optional["JobOutputLog"]] = contextvars.ContextVar(
+    "current_output", default=None
+)
+
+_installed = False
+_install_lock = threading.Lock()
+
+# Logs abertos neste processo (nunca apagados na limpeza) e última limpeza
+_open_logs: Dict[Path, int] = {}
+_last_prune: Optional[float] = None
+_prune_lock = threading.Lock()
+
+
+class JobOutputLog:
+    """Log filtrado de um job: grava em arquivo e, opcionalmente, ecoa no console"""
+    def __init__(self, name: str, log_dir: Optional[Path] = None, echo: bool = JOB_LOG_ECHO):
+        self.name = name
+        self.echo = echo
+        self.path: Optional[Path] = None
+        self._file = None
+        self._lock = threading.Lock()
+        # Um filtro por (thread, stream): linhas incompletas nunca se misturam
+        self._filters: Dict[Tuple[int, str], LogFilter] = {}
+        try:
+            log_dir = Path(log_dir or JOB_LOG_DIR)
+            log_dir.mkdir(parents=True, exist_ok=True)
+            self.path = log_dir / f"{name}.log"
+            self._file = open(self.path, "a", encoding="utf-8")
+            with _prune_lock:
+                _open_logs[self.path] = _open_logs.get(self.path, 0) + 1
+        except OSError as e:
+            print(f"⚠️ Não foi possível criar o log do job {name}: {e}", file=_original("stderr"))
+
+    def _filter(self, stream_name: str) -> LogFilter:
+        key = (threading.get_ident(), stream_name)
+        log_filter = self._filters.get(key)
+        if log_filter is None:
+            with self._lock:
+                log_filter = self._filters.setdefault(key, LogFilter())
+        return log_filter
+
+    def write(self, stream_name: str, text: str):
+        output = self._filter(stream_name).feed(text)
+        if output:
+            self._emit(stream_name, output)
+
+    def flush(self, stream_name: str):
+        output = self._filter(stream_name).flush()
+        if output:
+            self._emit(stream_name, output)
+
+    def close(self):
+        """Escreve o que sobrou nos buffers e fecha o arquivo"""
+        with self._lock:
+            pending = [(stream_name, f.flush()) for (_, stream_name), f in self._filters.items()]
+            self._filters.clear()
+        for stream_name, output in pending:
+            if output:
+                self._emit(stream_name, output)
+        with self._lock:
+            if self._file is None:
+                return
+            self._file.close()
+            self._file = None
+        with _prune_lock:
+            if _open_logs.get(self.path, 0) > 1:
+                _open_logs[self.path] -= 1
+            else:
+                _open_logs.pop(self.path, None)
+
+    def _emit(self, stream_name: str, output: str):
+        with self._lock:
+            if self._file is not None:
+                self._file.write(output)
+                self._file.flush()
+        if self.echo:
+            original = _original(stream_name)
+            original.write(output)
+            original.flush()
+
+
+class ContextStreamDispatcher:
+    """Substituto permanente de sys.stdout/sys.stderr que escreve no destino do contexto"""
+    def __init__(self, original_io, stream_name: str):
+        self.original_io = original_io
+        self.stream_name = stream_name
+        # Saída fora de jobs: filtro por thread direto para o stream original
+        self._local = threading.local()
+
+    def _thread_filter(self) -> LogFilter:
+        log_filter = getattr(self._local, "filter", None)
+        if log_filter is None:
+            log_filter = self._local.filter = LogFilter()
+        return log_filter
+
+    def write(self, text):
+        if not text:
+            return 0
+        target = _current_output.get()
+        if target is not None:
+            target.write(self.stream_name, text)
+        else:
+            output = self._thread_filter().feed(text)
+            if output:
+                self.original_io.write(output)
+                self.original_io.flush()
+        return len(text)
+
+    def flush(self):
+        target = _current_output.get()
+        if target is not None:
+            target.flush(self.stream_name)
+            return
+        output = self._thread_filter().flush()
+        if output:
+            self.original_io.write(output)
+        self.original_io.flush()
+
+    def __getattr__(self, name):
+        # Delega outros atributos/métodos (isatty, encoding, fileno...) para o IO original
+        return getattr(self.original_io, name)
+
+
+def _original(stream_name: str):
+    stream = getattr(sys, stream_name)
+    if isinstance(stream, ContextStreamDispatcher):
+        return stream.original_io
+    return stream
+
+
+def install_output_dispatcher():
+    """Instala o dispatcher em sys.stdout/sys.stderr uma única vez por processo"""
+    global _installed
+    with _install_lock:
+        if _installed:
+            return
+        sys.stdout = ContextStreamDispatcher(sys.stdout, "stdout")
+        sys.stderr = ContextStreamDispatcher(sys.stderr, "stderr")
+        _installed = True
+
+
+def prune_job_logs(log_dir: Optional[Path] = None, ttl_seconds: float = JOB_LOG_TTL_SECONDS,
+                   max_files: int = JOB_LOG_MAX_FILES) -> int:
+    """Apaga logs expirados e os mais antigos acima de `max_files`; devolve quantos apagou"""
+    log_dir = Path(log_dir or JOB_LOG_DIR)
+    try:
+        entries = []
+        for path in log_dir.glob("*.log"):
+            try:
+                entries.append((path.stat().st_mtime, path))
+            except OSError:
+                continue
+    except OSError:
+        return 0
+    with _prune_lock:
+        active = set(_open_logs)
+    entries = sorted((item for item in entries if item[1] not in active), reverse=True)
+    cutoff = time.time() - ttl_seconds
+    keep = max(max_files - len(active), 0) if max_files else len(entries)
+    removed = 0
+    for index, (mtime, path) in enumerate(entries):
+        if mtime < cutoff or index >= keep:
+            try:
+                path.unlink()
+                removed += 1
+            except OSError:
+                pass
+    return removed
+
+
+def _maybe_prune_job_logs(log_dir: Path):
+    global _last_prune
+    now = time.monotonic()
+    with _prune_lock:
+        if _last_prune is not None and now - _last_prune < JOB_LOG_PRUNE_INTERVAL:
+            return
+        _last_prune = now
+    prune_job_logs(log_dir)
+
+
+@contextmanager
+def job_output(name: str):
+    """Direciona a saída do contexto atual (e das threads que o copiarem) para o log do job"""
+    install_output_dispatcher()
+    current = _current_output.get()
+    if current is not None:
+        # Já roteado (ex.: itens de um lote): reaproveita o log do job
+        yield current
+        return
+    _maybe_prune_job_logs(JOB_LOG_DIR)
+    log = JobOutputLog(name)
+    token = _current_output.set(log)
+    try:
+        yield log
+    finally:
+        _current_output.reset(token)
+        log.close()
@@ -0,0 +1,307 @@
+"""
+Pré-agregação e redução de pontos dos gráficos do dashboard.
+
+Um `px.scatter`/`px.line` com o `df` inteiro serializa todas as linhas para o
+navegador, que é a parte mais lenta de desenhar dashboards de planilhas com
+milhões de linhas. Aqui os dados são reduzidos no NumPy antes de chegar ao
+plotly, com um teto de pontos por figura:
+
+- séries (line/area): LTTB (Largest-Triangle-Three-Buckets) por série, que
+  mantém picos e vales com poucos pontos;
+- dispersão: amostra aleatória fixa (semente 0);
+- histograma: contagens por faixa (`np.histogram`) desenhadas como barras;
+- barras e pizza: soma/contagem agrupada (o desenho empilhado é o mesmo).
+
+O `plotly.express` entregue ao código gerado (no namespace e no `import`) é o
+`ReducedExpress`, que aplica essas reduções por padrão; abaixo do teto as
+chamadas vão direto ao plotly. As funções também ficam disponíveis para o
+código gerado (`PLOT_HELPERS`).
+"""
+import importlib
+import inspect
+import os
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+
+# Pontos (linhas do DataFrame) enviados ao navegador por figura
+MAX_PLOT_POINTS = int(os.getenv("DASHBOARD_MAX_PLOT_POINTS", "5000"))
+HISTOGRAM_BINS = 50
+
+# Argumentos do plotly express que separam séries/grupos em uma figura
+GROUP_ARGS = ("color", "line_group", "line_dash", "symbol", "pattern_shape", "facet_row", "facet_col", "animation_frame")
+# Argumentos que levam colunas por linha ao gráfico: com eles as barras/pizzas não são agregadas
+ROW_ARGS = ("hover_name", "hover_data", "custom_data", "text", "error_x", "error_y", "size")
+
+Columns = Union[str, Sequence[str], None]
+
+
+def _axis_values(series: pd.Series) -> Optional[np.ndarray]:
+    """Valores float64 de uma coluna numérica ou de data (NaN nos nulos); None para texto"""
+    if pd.api.types.is_datetime64_any_dtype(series):
+        values = series.to_numpy(dtype="datetime64[ns]")
+        result = values.view("int64").astype("float64")
+        result[np.isnat(values)] = np.nan
+        return result
+    if pd.api.types.is_bool_dtype(series) or not pd.api.types.is_numeric_dtype(series):
+        return None
+    return series.to_numpy(dtype="float64", na_value=np.nan)
+
+
+def lttb(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """Posições dos pontos escolhidos pelo LTTB (x crescente; sempre inclui o primeiro e o último)"""
+    n = len(y)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    # threshold - 2 baldes entre o primeiro e o último ponto; o último "balde" é só o último ponto
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    # Médias de todos os baldes de uma vez (terceiro vértice do triângulo), ignorando nulos
+    valid = ~(np.isnan(x) | np.isnan(y))
+    counts = np.maximum(np.add.reduceat(valid.astype(np.int64), edges), 1)
+    mean_x = np.add.reduceat(np.where(valid, x, 0.0), edges) / counts
+    mean_y = np.add.reduceat(np.where(valid, y, 0.0), edges) / counts
+
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    previous = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        ax, ay = x[previous], y[previous]
+        area = np.abs((ax - mean_x[i + 1]) * (y[start:end] - ay) - (ax - x[start:end]) * (mean_y[i + 1] - ay))
+        previous = start + int(np.argmax(np.where(valid[start:end], area, -1.0)))
+        selected[i + 1] = previous
+    return selected
+
+
+def sample_rows(df: pd.DataFrame, max_points: Optional[int] = None) -> pd.DataFrame:
+    """Amostra aleatória fixa (ordem original mantida) quando o DataFrame passa do teto"""
+    max_points = max_points or MAX_PLOT_POINTS
+    if len(df) <= max_points:
+        return df
+    positions = np.random.default_rng(0).choice(len(df), size=max_points, replace=False)
+    return df.iloc[np.sort(positions)]
+
+
+def _group_positions(df: pd.DataFrame, by: List[str]) -> List[np.ndarray]:
+    if not by:
+        return [np.arange(len(df))]
+    return list(df.groupby(by, sort=False, observed=True, dropna=False).indices.values())
+
+
+def downsample(df: pd.DataFrame, x: Optional[str], y: Columns, max_points: Optional[int] = None,
+               by: Columns = None) -> pd.DataFrame:
+    """Linhas escolhidas pelo LTTB para cada série (grupo de `by` x coluna de `y`), ordenadas por x
+
+    Com x numérico ou de data as linhas são ordenadas por x (uma linha com
+    milhões de pontos fora de ordem não é legível de qualquer forma); com x de
+    texto (ou sem x) vale a ordem das linhas.
+    """
+    max_points = max_points or MAX_PLOT_POINTS
+    if len(df) <= max_points or y is None:
+        return df
+    y_columns = [y] if isinstance(y, str) else list(y)
+    by = [by] if isinstance(by, str) else [c for c in dict.fromkeys(by or []) if c is not None]
+    groups = _group_positions(df, by)
+    # Cada linha mantida vira um ponto em cada coluna de y
+    budget = max(3, max_points // (len(groups) * len(y_columns) ** 2))
+
+    x_values = _axis_values(df[x]) if x is not None else None
+    y_values = [_axis_values(df[col]) for col in y_columns]
+    keep = []
+    for positions in groups:
+        if x_values is not None:
+            order = positions[np.argsort(x_values[positions], kind="stable")]
+            group_x = x_values[order]
+        else:
+            order = positions
+            group_x = order.astype("float64")
+        chosen = []
+        for values in y_values:
+            if values is None:
+                # Série de texto: pontos igualmente espaçados
+                chosen.append(np.linspace(0, len(order) - 1, min(budget, len(order))).astype(np.int64))
+            else:
+                chosen.append(lttb(group_x, values[order], budget))
+        keep.append(order[np.unique(np.concatenate(chosen))])
+    return df.iloc[np.concatenate(keep)]
+
+
+def bin_counts(values: np.ndarray, bins: Union[int, np.ndarray] = HISTOGRAM_BINS) -> Tuple[np.ndarray, np.ndarray]:
+    """Contagens e bordas das faixas (valores nulos ignorados)"""
+    values = np.asarray(values, dtype="float64")
+    return np.histogram(values[np.isfinite(values)], bins=bins)
+
+
+def group_aggregate(df: pd.DataFrame, by: Columns, value: Optional[str] = None, agg: str = "sum") -> pd.DataFrame:
+    """Tabela agregada por `by` (contagem de linhas em 'count' quando não há `value`)"""
+    by = [by] if isinstance(by, str) else list(dict.fromkeys(by or []))
+    grouped = df.groupby(by, sort=False, observed=True, dropna=True)
+    if value is None:
+        return grouped.size().rename("count").reset_index()
+    return grouped[value].agg(agg).reset_index()
+
+
+# --- plotly express com redução ------------------------------------------------
+
+@lru_cache(maxsize=None)
+def _signature(function) -> inspect.Signature:
+    return inspect.signature(function)
+
+
+def _is_column(df: pd.DataFrame, name: Any) -> bool:
+    return isinstance(name, str) and name in df.columns
+
+
+def _group_columns(df: pd.DataFrame, args: Dict[str, Any]) -> List[str]:
+    return [args[name] for name in GROUP_ARGS if _is_column(df, args.get(name))]
+
+
+def _columns_given(args: Dict[str, Any], names: Sequence[str]) -> bool:
+    return any(args.get(name) is not None for name in names)
+
+
+class ReducedExpress:
+    """`plotly.express` que reduz os dados acima de `max_points` linhas antes de montar a figura"""
+    def __init__(self, px, max_points: Optional[int] = None):
+        self._px = px
+        self.max_points = max_points or MAX_PLOT_POINTS
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._px, name)
+
+    def __dir__(self):
+        return dir(self._px)
+
+    def _arguments(self, name: str, args, kwargs) -> Tuple[Any, Dict[str, Any], Optional[pd.DataFrame]]:
+        function = getattr(self._px, name)
+        arguments = _signature(function).bind_partial(*args, **kwargs).arguments
+        df = arguments.get("data_frame")
+        large = isinstance(df, pd.DataFrame) and len(df) > self.max_points
+        return function, arguments, df if large else None
+
+    def _series(self, name: str, args, kwargs):
+        function, arguments, df = self._arguments(name, args, kwargs)
+        x, y = arguments.get("x"), arguments.get("y")
+        y_columns = [y] if isinstance(y, str) else y
+        if (df is not None and (x is None or _is_column(df, x)) and isinstance(y_columns, (list, tuple))
+                and y_columns and all(_is_column(df, col) for col in y_columns)):
+            arguments["data_frame"] = downsample(df, x, list(y_columns), self.max_points, by=_group_columns(df, arguments))
+        return function(**arguments)
+
+    def line(self, *args, **kwargs):
+        return self._series("line", args, kwargs)
+
+    def area(self, *args, **kwargs):
+        return self._series("area", args, kwargs)
+
+    def scatter(self, *args, **kwargs):
+        function, arguments, df = self._arguments("scatter", args, kwargs)
+        if df is not None:
+            arguments["data_frame"] = sample_rows(df, self.max_points)
+        return function(**arguments)
+
+    def bar(self, *args, **kwargs):
+        function, arguments, df = self._arguments("bar", args, kwargs)
+        horizontal = arguments.get("orientation") == "h"
+        value, category = (arguments.get("x"), arguments.get("y")) if horizontal else (arguments.get("y"), arguments.get("x"))
+        if (df is not None and _is_column(df, category) and _is_column(df, value)
+                and _axis_values(df[value]) is not None and not _columns_given(arguments, ROW_ARGS)):
+            # Barras empilhadas por linha = uma barra com a soma do grupo
+            arguments["data_frame"] = group_aggregate(df, [category] + _group_columns(df, arguments), value, "sum")
+        return function(**arguments)
+
+    def pie(self, *args, **kwargs):
+        function, arguments, df = self._arguments("pie", args, kwargs)
+        names, values = arguments.get("names"), arguments.get("values")
+        if (df is not None and _is_column(df, names) and (values is None or _is_column(df, values))
+                and not _columns_given(arguments, ROW_ARGS)):
+            keys = [names] + ([arguments["color"]] if _is_column(df, arguments.get("color")) else [])
+            if values is None:
+                arguments["data_frame"] = group_aggregate(df, keys)
+                arguments["values"] = "count"
+            else:
+                arguments["data_frame"] = group_aggregate(df, keys, values, "sum")
+        return function(**arguments)
+
+    def histogram(self, *args, **kwargs):
+        function, arguments, df = self._arguments("histogram", args, kwargs)
+        x = arguments.get("x")
+        simple = not _columns_given(arguments, ("y", "histfunc", "histnorm", "marginal", "cumulative", "facet_row",
+                                                "facet_col", "animation_frame", "pattern_shape") + ROW_ARGS)
+        if df is None or not _is_column(df, x) or not simple:
+            return function(**arguments)
+        values = _axis_values(df[x])
+        if values is None:
+            # Texto/categoria: uma barra por valor, com a contagem já agregada
+            table = group_aggregate(df, [x] + _group_columns(df, arguments))
+            return self._count_bars(table, x, arguments)
+        return self._binned_histogram(df, x, values, arguments)
+
+    def _count_bars(self, table: pd.DataFrame, x: str, arguments: Dict[str, Any]):
+        """Barras de contagem ('count') no lugar do histograma, com os argumentos que o bar aceita"""
+        accepted = _signature(self._px.bar).parameters
+        bar_arguments = {k: v for k, v in arguments.items() if k in accepted and k not in ("x", "y", "data_frame")}
+        bar_arguments.setdefault("barmode", "relative")
+        return self._px.bar(table, x=x, y="count", **bar_arguments)
+
+    def _binned_histogram(self, df: pd.DataFrame, x: str, values: np.ndarray, arguments: Dict[str, Any]):
+        """Histograma de contagem desenhado com as faixas já calculadas (barras sem espaço)"""
+        color = arguments.get("color") if _is_column(df, arguments.get("color")) else None
+        _, edges = bin_counts(values, arguments.get("nbins") or HISTOGRAM_BINS)
+        groups = df.groupby(color, sort=False, observed=True).indices if color else {None: np.arange(len(df))}
+        frames = []
+        for group, positions in groups.items():
+            counts, _ = bin_counts(values[positions], edges)
+            frame = pd.DataFrame({x: (edges[:-1] + edges[1:]) / 2, "count": counts})
+            if color:
+                frame[color] = group
+            frames.append(frame)
+        table = pd.concat(frames, ignore_index=True)
+        widths = np.diff(edges)
+        if pd.api.types.is_datetime64_any_dtype(df[x]):
+            table[x] = pd.to_datetime(table[x].astype("int64"))
+            widths = widths / 1e6  # eixo de datas do plotly em milissegundos
+
+        figure = self._count_bars(table, x, arguments)
+        figure.update_traces(width=widths.tolist() if len(set(widths.round(9))) > 1 else float(widths[0]))
+        figure.update_layout(bargap=0)
+        return figure
+
+
+class ReducedPlotly:
+    """Módulo `plotly` do código gerado: `plotly.express` com redução, o resto sem mudança"""
+    def __init__(self, plotly, express: ReducedExpress):
+        self._plotly = plotly
+        self.express = express
+
+    def __getattr__(self, name: str) -> Any:
+        try:
+            return getattr(self._plotly, name)
+        except AttributeError:
+            # Submódulo ainda não importado (ex.: plotly.graph_objects)
+            return importlib.import_module(f"{self._plotly.__name__}.{name}")
+
+
+def reduced_plotly_modules() -> Dict[str, Any]:
+    """Módulos `plotly` e `plotly.express` com redução para o código gerado (vazio sem plotly)"""
+    try:
+        import plotly
+        import plotly.express as px
+    except ImportError:
+        return {}
+    express = ReducedExpress(px)
+    return {"plotly": ReducedPlotly(plotly, express), "plotly.express": express}
+
+
+# Funções disponíveis no namespace do código gerado (sem import)
+PLOT_HELPERS: Dict[str, Any] = {
+    "lttb": lttb,
+    "downsample": downsample,
+    "sample_rows": sample_rows,
+    "bin_counts": bin_counts,
+    "group_aggregate": group_aggregate,
+    "MAX_PLOT_POINTS": MAX_PLOT_POINTS,
+}
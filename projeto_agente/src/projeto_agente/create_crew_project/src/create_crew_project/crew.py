@@ -1,10 +1,19 @@
+import os
+
 from crewai import Agent, Crew, Process, Task
 from crewai.project import CrewBase, agent, crew, task
 from crewai.agents.agent_builder.base_agent import BaseAgent
 from typing import List
-from crewai_tools import ScrapeWebsiteTool
 from dotenv import load_dotenv
+from create_crew_project.tools.cached_scrape_tool import CachedScrapeWebsiteTool
+
+# Grava o resultado das tasks em output/ (testes e benchmarks desligam com CREW_OUTPUT_FILES=false)
+WRITE_OUTPUT_FILES = os.getenv("CREW_OUTPUT_FILES", "true").lower() in ("1", "true", "yes")
+
 
+def output_file(name: str):
+    """Caminho do arquivo da task em output/, ou None com a gravação desligada"""
+    return f"output/{name}" if WRITE_OUTPUT_FILES else None
 
 
 @CrewBase
@@ -16,8 +25,8 @@ class CreateCrewProject():
 
     @agent
     def market_researcher(self) -> Agent:
-        # Inicializa a ferramenta de scraping diretamente
-        scrape_tool = ScrapeWebsiteTool()
+        # Ferramenta de scraping com cache em disco e pool de conexões compartilhado
+        scrape_tool = CachedScrapeWebsiteTool()
         return Agent(
             config=self.agents_config['market_researcher'], # type: ignore[index]
             tools=[scrape_tool],  # Ferramenta de scraping para pesquisar URLs
@@ -58,21 +67,21 @@ class CreateCrewProject():
     def market_research_task(self) -> Task:
         return Task(
             config=self.tasks_config['market_research_task'], # type: ignore[index]
-            output_file='output/briefing.md'
+            output_file=output_file('briefing.md')
         )
 
     @task
     def copywriting_task(self) -> Task:
         return Task(
             config=self.tasks_config['copywriting_task'], # type: ignore[index]
-            output_file='output/rascunho_copy.md'
+            output_file=output_file('rascunho_copy.md')
         )
 
     @task
     def editing_task(self) -> Task:
         return Task(
             config=self.tasks_config['editing_task'], # type: ignore[index]
-            output_file='output/copy_final.md'
+            output_file=output_file('copy_final.md')
         )
 
     @task
@@ -0,0 +1,170 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import requests
+from bs4 import BeautifulSoup
+from crewai_tools import ScrapeWebsiteTool
+from pydantic import Field
+from requests.adapters import HTTPAdapter
+
+try:
+    from result_cache import DEFAULT_CACHE_DIR
+except ImportError:
+    # Crew rodando sozinha (`crewai run`), sem a raiz do repositório no path: mesmo padrão do result_cache
+    DEFAULT_CACHE_DIR = Path(os.getenv("RESULT_CACHE_DIR", Path(__file__).resolve().parents[7] / ".cache"))
+
+
+# Sessão HTTP compartilhada por todas as instâncias (pool de conexões keep-alive)
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+
+# Requisições em andamento por URL: jobs simultâneos aguardam o mesmo download
+_inflight: Dict[str, Future] = {}
+_inflight_lock = threading.Lock()
+
+
+def _get_session() -> requests.Session:
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                pool_size = int(os.getenv("SCRAPE_POOL_SIZE", "10"))
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                _session = session
+    return _session
+
+
+def _clean_html(html: str) -> str:
+    parsed = BeautifulSoup(html, "html.parser")
+    text = parsed.get_text(" ")
+    text = re.sub("[ \t]+", " ", text)
+    return re.sub("\\s+\n\\s+", "\n", text).strip()
+
+
+class CachedScrapeWebsiteTool(ScrapeWebsiteTool):
+    """
+    ScrapeWebsiteTool com cache em disco do texto extraído.
+
+    - Sessão HTTP compartilhada (keep-alive) entre todas as crews do processo;
+    - Cache por URL com TTL; depois de expirado, revalida com ETag/Last-Modified
+      (um 304 reaproveita o texto salvo sem baixar a página de novo);
+    - Jobs simultâneos pedindo a mesma URL compartilham um único download;
+    - O texto extraído é limitado a `max_chars` caracteres.
+    """
+    cache_dir: Path = Field(default_factory=lambda: Path(os.getenv("SCRAPE_CACHE_DIR", DEFAULT_CACHE_DIR / "scrape")))
+    cache_ttl: float = Field(default_factory=lambda: float(os.getenv("SCRAPE_CACHE_TTL_SECONDS", 6 * 3600)))
+    max_chars: int = Field(default_factory=lambda: int(os.getenv("SCRAPE_MAX_CHARS", "20000")))
+    max_entries: int = Field(default_factory=lambda: int(os.getenv("SCRAPE_CACHE_MAX_ENTRIES", "500")))
+    timeout: float = 15
+
+    def _run(self, **kwargs: Any) -> Any:
+        website_url: Optional[str] = kwargs.get("website_url", self.website_url)
+        if website_url is None:
+            raise ValueError("Website URL must be provided.")
+
+        with _inflight_lock:
+            future = _inflight.get(website_url)
+            owner = future is None
+            if owner:
+                future = Future()
+                _inflight[website_url] = future
+
+        if not owner:
+            return future.result()
+
+        try:
+            text = self._fetch(website_url)
+            future.set_result(text)
+            return text
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with _inflight_lock:
+                _inflight.pop(website_url, None)
+
+    def _fetch(self, url: str) -> str:
+        entry = self._read_entry(url)
+        if entry and time.time() - entry["fetched_at"] < self.cache_ttl:
+            return self._format(entry["text"])
+
+        headers = dict(self.headers or {})
+        if entry:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+
+        try:
+            page = _get_session().get(
+                url,
+                timeout=self.timeout,
+                headers=headers,
+                cookies=self.cookies if self.cookies else {},
+            )
+        except requests.RequestException:
+            # Sem rede/site fora do ar: melhor devolver a versão salva (mesmo expirada)
+            if entry:
+                return self._format(entry["text"])
+            raise
+
+        if page.status_code == 304 and entry:
+            entry["fetched_at"] = time.time()
+            self._write_entry(url, entry)
+            return self._format(entry["text"])
+
+        page.encoding = page.apparent_encoding
+        text = _clean_html(page.text)[:self.max_chars]
+        if page.ok:
+            self._write_entry(url, {
+                "url": url,
+                "text": text,
+                "etag": page.headers.get("ETag"),
+                "last_modified": page.headers.get("Last-Modified"),
+                "fetched_at": time.time(),
+            })
+        return self._format(text)
+
+    @staticmethod
+    def _format(text: str) -> str:
+        return "The following text is scraped website content:\n\n" + text
+
+    def _entry_path(self, url: str) -> Path:
+        return Path(self.cache_dir) / f"{hashlib.sha256(url.encode('utf-8')).hexdigest()}.json"
+
+    def _read_entry(self, url: str) -> Optional[Dict[str, Any]]:
+        try:
+            return json.loads(self._entry_path(url).read_text(encoding="utf-8"))
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def _write_entry(self, url: str, entry: Dict[str, Any]):
+        path = self._entry_path(url)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Escrita atômica para não deixar JSON pela metade com jobs concorrentes
+        tmp_path = path.with_suffix(f".{threading.get_ident()}.tmp")
+        tmp_path.write_text(json.dumps(entry, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp_path, path)
+        self._prune()
+
+    def _prune(self):
+        """Mantém no máximo `max_entries` páginas, removendo as menos recentes"""
+        entries = list(Path(self.cache_dir).glob("*.json"))
+        if len(entries) <= self.max_entries:
+            return
+        try:
+            entries.sort(key=lambda p: p.stat().st_mtime)
+        except FileNotFoundError:
+            return  # Outro job já está limpando o diretório
+        for path in entries[:len(entries) - self.max_entries]:
+            path.unlink(missing_ok=True)
@@ -0,0 +1,165 @@
+"""
+Cache persistente (SQLite em disco) para resultados das crews.
+
+Cada entrada guarda um valor JSON com timestamps de criação e último acesso:
+- TTL: entradas mais antigas que `ttl_seconds` são descartadas na leitura;
+- LRU: ao passar de `max_entries` ou `max_bytes`, as entradas acessadas há
+  mais tempo são removidas primeiro.
+
+O SQLite permite que várias threads (e processos) compartilhem o mesmo arquivo.
+"""
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional
+
+
+DEFAULT_CACHE_DIR = Path(os.getenv("RESULT_CACHE_DIR", Path(__file__).resolve().parent / ".cache"))
+
+# Espaços/tabs entre palavras e no fim das linhas (quebras de linha e indentação são preservadas)
+_INNER_SPACES = re.compile(r"(?<=\S)[ \t]+(?=\S)")
+_TRAILING_SPACES = re.compile(r"[ \t]+(?=\n)")
+
+
+def _normalize(value: Any) -> Any:
+    """Normaliza strings (espaços extras) para que payloads equivalentes gerem a mesma chave
+
+    Só espaços e tabs repetidos viram um espaço e as pontas são aparadas; quebras
+    de linha e a indentação no início das linhas (listas, trechos de texto livre
+    como `definicao_do_sistema`) continuam distinguindo os payloads.
+    """
+    if isinstance(value, str):
+        return _INNER_SPACES.sub(" ", _TRAILING_SPACES.sub("", value.strip()))
+    if isinstance(value, dict):
+        return {k: _normalize(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_normalize(v) for v in value]
+    return value
+
+
+def hash_files(paths: Iterable[Path]) -> str:
+    """Hash do conteúdo de arquivos (ex: YAML de agents/tasks)"""
+    digest = hashlib.sha256()
+    for path in paths:
+        digest.update(str(Path(path).name).encode("utf-8"))
+        try:
+            digest.update(Path(path).read_bytes())
+        except FileNotFoundError:
+            digest.update(b"<missing>")
+    return digest.hexdigest()
+
+
+def make_cache_key(namespace: str, payload: Dict[str, Any], config_hash: str = "") -> str:
+    """Chave content-addressed: hash do payload normalizado + hash da configuração"""
+    normalized = _normalize({k: v for k, v in payload.items() if v is not None})
+    raw = json.dumps(
+        {"ns": namespace, "config": config_hash, "payload": normalized},
+        sort_keys=True, ensure_ascii=False,
+    )
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class DiskCache:
+    """Cache chave → JSON em SQLite com expiração por TTL e despejo LRU por tamanho"""
+    def __init__(self, name: str, cache_dir: Optional[Path] = None, ttl_seconds: float = 7 * 24 * 3600,
+                 max_entries: int = 1000, max_bytes: int = 100 * 1024 * 1024):
+        self.cache_dir = Path(cache_dir or DEFAULT_CACHE_DIR)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.path = self.cache_dir / f"{name}.sqlite3"
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._stats_lock = threading.Lock()  # get() é chamado de várias threads
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                " key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL,"
+                " created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_entries_accessed ON entries(accessed_at)")
+
+    def _connect(self) -> sqlite3.Connection:
+        # Uma conexão por thread (sqlite3 não compartilha conexões entre threads)
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> Optional[Any]:
+        conn = self._connect()
+        now = time.time()
+        row = conn.execute("SELECT value, created_at FROM entries WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self._count(hit=False)
+            return None
+        value, created_at = row
+        if self.ttl_seconds and now - created_at > self.ttl_seconds:
+            with conn:
+                conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            self._count(hit=False)
+            return None
+        with conn:
+            conn.execute("UPDATE entries SET accessed_at = ? WHERE key = ?", (now, key))
+        self._count(hit=True)
+        return json.loads(value)
+
+    def _count(self, hit: bool):
+        with self._stats_lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def set(self, key: str, value: Any):
+        data = json.dumps(value, ensure_ascii=False)
+        size = len(data.encode("utf-8"))
+        if self.max_bytes and size > self.max_bytes:
+            return  # Valor maior que o cache inteiro: não armazena
+        now = time.time()
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO entries (key, value, size, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (key, data, size, now, now),
+            )
+            self._evict(conn, now)
+
+    def delete(self, key: str):
+        conn = self._connect()
+        with conn:
+            conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+
+    def clear(self):
+        conn = self._connect()
+        with conn:
+            conn.execute("DELETE FROM entries")
+
+    def stats(self) -> Dict[str, Any]:
+        count, total = self._connect().execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        with self._stats_lock:
+            hits, misses = self.hits, self.misses
+        return {"entries": count, "bytes": total, "hits": hits, "misses": misses}
+
+    def _evict(self, conn: sqlite3.Connection, now: float):
+        if self.ttl_seconds:
+            conn.execute("DELETE FROM entries WHERE created_at < ?", (now - self.ttl_seconds,))
+        count, total = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        if (not self.max_entries or count <= self.max_entries) and (not self.max_bytes or total <= self.max_bytes):
+            return
+        # Remove as entradas menos usadas recentemente até caber nos limites
+        for key, size in conn.execute("SELECT key, size FROM entries ORDER BY accessed_at ASC").fetchall():
+            if (not self.max_entries or count <= self.max_entries) and (not self.max_bytes or total <= self.max_bytes):
+                break
+            conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            count -= 1
+            total -= size
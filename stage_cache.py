@@ -0,0 +1,122 @@
+"""
+Memoização por estágio (task) das crews sequenciais.
+
+A saída de cada task é cacheada sob uma chave derivada apenas dos inputs que ela
+realmente interpola (placeholders `{...}` na descrição/expected_output da task e
+no role/goal/backstory do agente), encadeada com a chave da task anterior.
+Assim, trocar só o `tone` reaproveita `research_task` e `copywriting_task` e
+executa apenas `editing_task`.
+"""
+import re
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from jobs import emit_job_event
+from metrics import STAGES
+from result_cache import DiskCache, make_cache_key
+
+
+PLACEHOLDER_RE = re.compile(r"\{([A-Za-z_][A-Za-z0-9_]*)\}")
+
+# Campos da TaskOutput persistidos no cache
+_OUTPUT_FIELDS = {"description", "name", "expected_output", "summary", "raw", "agent"}
+
+
+def _placeholders(*texts: Optional[str]) -> Set[str]:
+    found: Set[str] = set()
+    for text in texts:
+        if text:
+            found.update(PLACEHOLDER_RE.findall(text))
+    return found
+
+
+def task_input_names(task) -> Set[str]:
+    """Inputs interpolados por uma task (incluindo os do agente responsável)"""
+    names = _placeholders(task.description, task.expected_output)
+    agent = task.agent
+    if agent is not None:
+        names |= _placeholders(agent.role, agent.goal, agent.backstory)
+    return names
+
+
+class StagedCrewRunner:
+    """Executa uma crew sequencial pulando as tasks cuja saída já está em cache"""
+    def __init__(self, templates, cache: DiskCache, crew_name: str = "copywriting"):
+        self.templates = templates
+        self.cache = cache
+        self.crew_name = crew_name
+        self._input_names: Optional[List[Set[str]]] = None
+
+    def stage_names(self) -> List[str]:
+        return [task.name or f"task_{i}" for i, task in enumerate(self.templates.template(self.crew_name).tasks)]
+
+    def stage_keys(self, inputs: Dict[str, Any]) -> List[Tuple[str, str]]:
+        """(nome da task, chave) para cada estágio, em ordem; cada chave depende da anterior"""
+        if self._input_names is None:
+            # O template nunca é executado, então os placeholders continuam intactos
+            self._input_names = [task_input_names(t) for t in self.templates.template(self.crew_name).tasks]
+        keys = []
+        upstream = self.templates.config_hash
+        for name, input_names in zip(self.stage_names(), self._input_names):
+            payload = {k: inputs.get(k) for k in sorted(input_names)}
+            key = make_cache_key(f"stage:{self.crew_name}:{name}", payload, upstream)
+            keys.append((name, key))
+            upstream = key
+        return keys
+
+    def group_key(self, inputs: Dict[str, Any]) -> str:
+        """Chave do primeiro estágio: inputs com a mesma chave compartilham a pesquisa"""
+        return self.stage_keys(inputs)[0][1]
+
+    def cached_prefix(self, inputs: Dict[str, Any], rerun_from: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Saídas cacheadas das primeiras tasks (para no primeiro miss ou em `rerun_from`)"""
+        outputs = []
+        for name, key in self.stage_keys(inputs):
+            if name == rerun_from:
+                break
+            cached = self.cache.get(key)
+            if cached is None:
+                break
+            outputs.append(cached)
+        return outputs
+
+    def run(self, inputs: Dict[str, Any], rerun_from: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Executa a crew a partir do primeiro estágio sem cache.
+
+        Retorna {"result": texto final, "stages": {task: "cached" | "executed"}}.
+        """
+        from crewai.tasks.task_output import TaskOutput
+
+        keys = self.stage_keys(inputs)
+        cached = self.cached_prefix(inputs, rerun_from)
+        stages = {name: ("cached" if i < len(cached) else "executed") for i, (name, _) in enumerate(keys)}
+        for name, stage in stages.items():
+            STAGES.inc(crew=self.crew_name, task=name, result=stage)
+        for (name, _), data in zip(keys, cached):
+            emit_job_event("task_cached", task=name, agent=data.get("agent", ""), output=data.get("raw", ""))
+        if len(cached) == len(keys):
+            return {"result": cached[-1]["raw"], "stages": stages}
+
+        crew = self.templates.get(self.crew_name)
+        tasks = list(crew.tasks)
+        for task, data in zip(tasks, cached):
+            task.output = TaskOutput(**data)
+
+        remaining = tasks[len(cached):]
+        if cached:
+            # No processo sequencial cada task recebe as saídas de todas as anteriores;
+            # como as tasks cacheadas não rodam, o contexto precisa ser explícito
+            for i, task in enumerate(remaining):
+                if not isinstance(task.context, list):
+                    task.context = tasks[:len(cached) + i]
+            # O clone é só deste job: basta trocar a lista de tasks, mantendo os
+            # demais parâmetros da crew (callbacks, memória, max_rpm, ...)
+            crew.tasks = remaining
+
+        result = crew.kickoff(inputs=inputs)
+
+        for (_, key), output in zip(keys[len(cached):], result.tasks_output):
+            self.cache.set(key, output.model_dump(include=_OUTPUT_FIELDS))
+
+        text = result.final_output if hasattr(result, "final_output") else str(result)
+        return {"result": text, "stages": stages}
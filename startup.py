@@ -0,0 +1,243 @@
+"""
+Inicialização do backend em etapas: o app responde logo e o CrewAI carrega depois.
+
+Importar o CrewAI e o crewai_tools (litellm, chroma, pysbd...) leva segundos, e
+antes isso acontecia no import do backend_api: durante o cold start nem o
+GET / respondia. Agora o app sobe só com FastAPI/pandas e a classe das crews é
+carregada pelo `CrewLoader`:
+
+- em segundo plano, na thread de aquecimento disparada no startup
+  (`start_background`), que também monta os templates das crews;
+- ou sob demanda, no primeiro uso (`load()` espera o carregamento em curso).
+
+`warm` só vira True depois do aquecimento (YAML parseado, templates montados,
+clientes dos LLMs criados): é o que o GET /health/ready informa ao balanceador.
+
+As importações feitas durante o carregamento são cronometradas por módulo
+(tempo próprio e acumulado, como no `python -X importtime`) e aparecem em
+`report()` (GET /api/startup). Para o relatório completo, incluindo o import
+do próprio app:
+
+    python startup.py [--top 30]
+"""
+import argparse
+import builtins
+import importlib.util
+import os
+import sys
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+
+# Carrega as crews em segundo plano no startup (false = só no primeiro uso)
+CREW_WARM_UP = os.getenv("CREW_WARM_UP", "true").lower() in ("1", "true", "yes")
+REPORT_TOP_MODULES = 25
+
+LOADER_PENDING = "pending"
+LOADER_LOADING = "loading"
+LOADER_READY = "ready"
+LOADER_ERROR = "error"
+
+
+class CrewLoadError(RuntimeError):
+    """A classe das crews não pôde ser importada/preparada"""
+
+
+class ImportTimer:
+    """Cronometra cada módulo importado (via `builtins.__import__`) enquanto ativo
+
+    O tempo acumulado inclui os imports aninhados; o tempo próprio os desconta.
+    O gancho é global, mas só registra a thread que entrou no `with`: imports
+    feitos ao mesmo tempo por threads de requests não entram no relatório.
+    Imports feitos por `importlib.import_module` não passam por aqui.
+    """
+    def __init__(self):
+        self.records: List[Dict[str, Any]] = []
+        self._original = None
+        self._thread_id: Optional[int] = None
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def _resolve(self, name: str, globals: Optional[dict], level: int) -> str:
+        if not level:
+            return name
+        package = (globals or {}).get("__package__") or ""
+        try:
+            return importlib.util.resolve_name("." * level + name, package)
+        except (ImportError, ValueError):
+            return name
+
+    def _timed_import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        if threading.get_ident() != self._thread_id:
+            return self._original(name, globals, locals, fromlist, level)
+        full_name = self._resolve(name, globals, level)
+        if full_name in sys.modules:
+            return self._original(name, globals, locals, fromlist, level)
+        stack = self._local.__dict__.setdefault("stack", [])
+        stack.append(0.0)
+        start = time.perf_counter()
+        try:
+            return self._original(name, globals, locals, fromlist, level)
+        finally:
+            elapsed = time.perf_counter() - start
+            children = stack.pop()
+            if stack:
+                stack[-1] += elapsed
+            with self._lock:
+                self.records.append({"module": full_name, "self": elapsed - children,
+                                     "cumulative": elapsed, "depth": len(stack)})
+
+    def __enter__(self) -> "ImportTimer":
+        self._original = builtins.__import__
+        self._thread_id = threading.get_ident()
+        builtins.__import__ = self._timed_import
+        return self
+
+    def __exit__(self, *exc):
+        # Só restaura se ninguém trocou o __import__ depois de nós
+        if builtins.__import__ == self._timed_import:
+            builtins.__import__ = self._original
+
+    def summary(self, top: int = REPORT_TOP_MODULES) -> Dict[str, Any]:
+        """Módulos mais lentos (acumulado) e tempo próprio somado por pacote de topo"""
+        with self._lock:
+            records = list(self.records)
+        by_package: Dict[str, float] = defaultdict(float)
+        for record in records:
+            by_package[record["module"].partition(".")[0]] += record["self"]
+        slowest = sorted(records, key=lambda r: r["cumulative"], reverse=True)[:top]
+        return {
+            "modules": len(records),
+            "total_seconds": round(sum(r["cumulative"] for r in records if r["depth"] == 0), 3),
+            "slowest": [
+                {"module": r["module"], "self_ms": round(r["self"] * 1000, 1),
+                 "cumulative_ms": round(r["cumulative"] * 1000, 1)}
+                for r in slowest
+            ],
+            "packages": [
+                {"package": name, "self_ms": round(seconds * 1000, 1)}
+                for name, seconds in sorted(by_package.items(), key=lambda item: item[1], reverse=True)[:top]
+            ],
+        }
+
+
+class CrewLoader:
+    """Importa a classe das crews uma única vez (em segundo plano ou no primeiro uso)"""
+    def __init__(self, importer: Callable[[], Any], setup: Iterable[Callable[[], Any]] = ()):
+        self._importer = importer
+        # Passos rodados logo após o import (patches do event bus, handlers de eventos)
+        self._setup = list(setup)
+        self.state = LOADER_PENDING
+        self.error: Optional[str] = None
+        # Import + setup + aquecimento concluídos (pronto para receber tráfego)
+        self.warm = False
+        self.phases: Dict[str, float] = {}
+        self.imports = ImportTimer()
+        self._crew_class = None
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def ready(self) -> bool:
+        return self.state == LOADER_READY
+
+    def mark(self, phase: str, started: float):
+        """Registra a duração de uma etapa da inicialização (a partir de `started`, perf_counter)"""
+        self.phases[phase] = round(time.perf_counter() - started, 3)
+
+    def load(self):
+        """Classe das crews; na primeira chamada importa (as seguintes esperam ou reaproveitam)"""
+        if self._crew_class is not None:
+            return self._crew_class
+        with self._lock:
+            if self._crew_class is None:
+                if self.state == LOADER_ERROR:
+                    raise CrewLoadError(self.error)
+                self.state = LOADER_LOADING
+                started = time.perf_counter()
+                try:
+                    with self.imports:
+                        crew_class = self._importer()
+                    self.mark("crew_import", started)
+                    setup_started = time.perf_counter()
+                    for step in self._setup:
+                        step()
+                    self.mark("crew_setup", setup_started)
+                except Exception as e:
+                    self.state = LOADER_ERROR
+                    self.error = f"{type(e).__name__}: {e}"
+                    print(f"❌ ERRO IMPORTANDO CREW: {self.error}")
+                    raise CrewLoadError(self.error) from e
+                self._crew_class = crew_class
+                self.state = LOADER_READY
+        return self._crew_class
+
+    def start_background(self, warm_up: Optional[Callable[[], Any]] = None) -> bool:
+        """Carrega (e aquece os templates com `warm_up`) numa thread; True se disparou"""
+        with self._lock:
+            if self._thread is not None:
+                return False
+            self._thread = threading.Thread(target=self._background, args=(warm_up,), name="crew-warm-up", daemon=True)
+            self._thread.start()
+            return True
+
+    def _background(self, warm_up: Optional[Callable[[], Any]]):
+        try:
+            self.load()
+            if warm_up is not None:
+                started = time.perf_counter()
+                warm_up()
+                self.mark("crew_warm_up", started)
+        except Exception as e:
+            if self.error is None:
+                self.error = f"{type(e).__name__}: {e}"
+            print(f"⚠️ Aquecimento das crews falhou: {self.error}")
+            return
+        self.warm = True
+
+    def report(self, top: int = REPORT_TOP_MODULES) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "warm": self.warm,
+            "error": self.error,
+            "phases_seconds": dict(self.phases),
+            "imports": self.imports.summary(top),
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tempo de inicialização do backend (import do app + carga das crews)")
+    parser.add_argument("--top", type=int, default=REPORT_TOP_MODULES, help="quantidade de módulos/pacotes listados")
+    args = parser.parse_args()
+
+    os.environ["CREW_WARM_UP"] = "false"  # a carga é feita aqui, de forma síncrona
+    app_timer = ImportTimer()
+    started = time.perf_counter()
+    with app_timer:
+        import backend_api
+    app_seconds = time.perf_counter() - started
+    loader = backend_api.crew_loader
+    started = time.perf_counter()
+    try:
+        loader.load()
+        backend_api.crew_templates.warm_up()
+    except Exception as e:
+        print(f"Falha ao carregar as crews: {e}")
+    crews_seconds = time.perf_counter() - started
+
+    print(f"Import do app: {app_seconds:.2f} s | carga das crews: {crews_seconds:.2f} s | etapas: {loader.phases}")
+    for title, timer in (("import do app", app_timer), ("carga das crews", loader.imports)):
+        summary = timer.summary(args.top)
+        print(f"\n== {title}: {summary['modules']} módulos, {summary['total_seconds']:.2f} s ==")
+        print(f"{'acumulado':>11} {'próprio':>9}  módulo")
+        for row in summary["slowest"]:
+            print(f"{row['cumulative_ms']:>8.0f} ms {row['self_ms']:>6.0f} ms  {row['module']}")
+        print(f"\n{'próprio':>11}  pacote")
+        for row in summary["packages"]:
+            print(f"{row['self_ms']:>8.0f} ms  {row['package']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -10,13 +10,15 @@ def test_health():
     """Testa o endpoint de health check"""
     print("🔍 Testando health check...")
     try:
-        response = requests.get(f"{BACKEND_URL}/health", timeout=10)
+        response = requests.get(f"{BACKEND_URL}/health/ready", timeout=10)
         if response.status_code == 200:
             print("✅ Health check OK!")
             print(f"   Resposta: {response.json()}")
             return True
         else:
+            # 503 enquanto as crews aquecem (status "starting") ou no desligamento ("draining")
             print(f"❌ Health check falhou: {response.status_code}")
+            print(f"   Resposta: {response.text[:300]}")
             return False
     except Exception as e:
         print(f"❌ Erro ao conectar: {e}")
@@ -37,6 +39,7 @@ def test_copywriting():
         response = requests.post(
             f"{BACKEND_URL}/api/copywriting",
             json=payload,
+            params={"wait": "true"},  # Sem wait a API só devolve o job_id (202)
             timeout=60  # 1 minuto para teste rápido
         )
         
@@ -0,0 +1,34 @@
+"""
+Configuração comum dos testes: raiz do repositório no path e caches em um
+diretório temporário (definido antes de importar os módulos do backend).
+"""
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+os.environ.setdefault("RESULT_CACHE_DIR", tempfile.mkdtemp(prefix="crew-tests-"))
+# Nenhum teste chama o LLM, mas o Agent exige uma chave configurada
+os.environ.setdefault("OPENAI_API_KEY", "sk-test")
+os.environ.setdefault("CREWAI_TRACING_ENABLED", "false")
+os.environ.setdefault("CREWAI_DISABLE_TELEMETRY", "true")
+os.environ.setdefault("OTEL_SDK_DISABLED", "true")
+# Crews rodadas nos testes não sobrescrevem os arquivos versionados em output/
+os.environ.setdefault("CREW_OUTPUT_FILES", "false")
+# O aquecimento em segundo plano é disparado explicitamente pelos testes
+os.environ.setdefault("CREW_WARM_UP", "false")
+
+
+
+@pytest.fixture(autouse=True)
+def job_log_dir(tmp_path, monkeypatch):
+    """Logs por job vão para o tmp_path de cada teste"""
+    import output_routing
+    path = tmp_path / "job_logs"
+    monkeypatch.setattr(output_routing, "JOB_LOG_DIR", path)
+    return path
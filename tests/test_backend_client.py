@@ -0,0 +1,89 @@
+import socket
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from backend_client import BackendClient
+
+
+class BackendHandler(BaseHTTPRequestHandler):
+    """/drop lê o pedido e fecha a conexão sem responder; /busy responde 503 na primeira vez"""
+    def _handle(self):
+        server = self.server
+        length = int(self.headers.get("Content-Length") or 0)
+        self.rfile.read(length)
+        with server.lock:
+            server.hits.append((self.command, self.path))
+            count = len(server.hits)
+        if self.path == "/drop":
+            self.close_connection = True
+            return
+        status = 503 if self.path == "/busy" and count == 1 else 200
+        self.send_response(status)
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"{}")
+
+    do_GET = do_POST = _handle
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def backend():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), BackendHandler)
+    server.hits = []
+    server.lock = threading.Lock()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield BackendClient(f"http://127.0.0.1:{server.server_address[1]}", retries=2, backoff=0), server
+    server.shutdown()
+    server.server_close()
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def test_post_is_not_repeated_after_the_body_was_sent(backend):
+    client, server = backend
+    retries = []
+
+    with pytest.raises(requests.exceptions.ConnectionError):
+        client.post("/drop", json={"topic": "Sapatos"}, on_retry=lambda *args: retries.append(args))
+
+    assert server.hits == [("POST", "/drop")]
+    assert retries == []
+
+
+def test_get_is_repeated_after_a_dropped_connection(backend):
+    client, server = backend
+
+    with pytest.raises(requests.exceptions.ConnectionError):
+        client.get("/drop")
+
+    assert server.hits == [("GET", "/drop")] * 3
+
+
+def test_post_is_repeated_when_the_connection_is_refused():
+    client = BackendClient(f"http://127.0.0.1:{free_port()}", retries=2, backoff=0)
+    retries = []
+
+    with pytest.raises(requests.exceptions.ConnectionError):
+        client.post("/api/copywriting", json={}, on_retry=lambda attempt, reason: retries.append(attempt))
+
+    assert retries == [1, 2]
+
+
+def test_post_is_repeated_on_503(backend):
+    client, server = backend
+
+    response = client.post("/busy", json={"topic": "Sapatos"})
+
+    assert response.status_code == 200
+    assert server.hits == [("POST", "/busy")] * 2
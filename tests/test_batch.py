@@ -0,0 +1,56 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from batch import run_batch
+
+
+class ConcurrencyProbe:
+    """run_item que anota quantos itens rodam ao mesmo tempo"""
+    def __init__(self, seconds: float = 0.05):
+        self.seconds = seconds
+        self.running = 0
+        self.peak = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, item):
+        with self.lock:
+            self.running += 1
+            self.peak = max(self.peak, self.running)
+        time.sleep(self.seconds)
+        with self.lock:
+            self.running -= 1
+        return {"result": item["topic"]}
+
+
+def test_slots_are_shared_across_batches():
+    probe = ConcurrencyProbe()
+    slots = threading.BoundedSemaphore(2)
+    items = [{"topic": f"t{i}"} for i in range(6)]
+
+    def one_batch(_):
+        return run_batch(items, probe, group_key=lambda item: item["topic"], concurrency=3, slots=slots)
+
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        batches = list(pool.map(one_batch, range(3)))
+
+    assert probe.peak == 2
+    assert all(batch["succeeded"] == 6 for batch in batches)
+
+
+def test_leaders_run_before_followers_and_errors_stay_per_item():
+    order = []
+
+    def run_item(item):
+        order.append(item["topic"] + item["variant"])
+        if item["variant"] == "x":
+            raise ValueError("falhou")
+        return {"result": "ok"}
+
+    items = [{"topic": "a", "variant": "1"}, {"topic": "a", "variant": "x"}, {"topic": "b", "variant": "1"}]
+    batch = run_batch(items, run_item, group_key=lambda item: item["topic"], concurrency=1)
+
+    assert order == ["a1", "b1", "ax"]
+    assert batch["groups"] == 2
+    assert (batch["succeeded"], batch["failed"]) == (2, 1)
+    assert batch["results"][1] == {"index": 1, "success": False, "error": "falhou"}
@@ -0,0 +1,43 @@
+import pandas as pd
+import pytest
+
+from dashboard_sandbox import SandboxPool
+
+
+@pytest.fixture(scope="module")
+def pool(tmp_path_factory):
+    pool = SandboxPool(workers=1, timeout=30, shm_dir=tmp_path_factory.mktemp("shm"))
+    yield pool
+    pool.close()
+
+
+@pytest.fixture
+def df():
+    return pd.DataFrame({"categoria": ["a", "b", "a"], "valor": [1, 2, 3]})
+
+
+@pytest.mark.parametrize("code, error", [
+    ('st.write(open("/etc/hostname").read())', "PermissionError"),
+    ('import os\nst.write(os.listdir("/"))', "O módulo 'os' não está disponível"),
+    ("from pathlib import Path", "O módulo 'pathlib' não está disponível"),
+    ("import subprocess", "O módulo 'subprocess' não está disponível"),
+    ("import io", "O módulo 'io' não está disponível"),
+])
+def test_generated_code_cannot_reach_files(pool, df, code, error):
+    result = pool.run(code, data_key="arquivos", df=df)
+
+    assert error in result["error"]
+    assert result["ops"] == []
+
+
+def test_dashboard_still_runs_with_allowed_libraries(pool, df):
+    code = (
+        "import streamlit as st\n"
+        "import plotly.express as px\n"
+        'st.metric("Total", int(df["valor"].sum()))\n'
+        'st.plotly_chart(px.bar(df, x="categoria", y="valor"))\n'
+    )
+    result = pool.run(code, data_key="permitido", df=df)
+
+    assert result["error"] is None
+    assert len(result["ops"]) == 2
@@ -0,0 +1,30 @@
+import json
+import os
+import time
+
+from dashboard_runtime import DashboardStore
+
+
+def test_expired_dashboard_is_removed(tmp_path):
+    store = DashboardStore(tmp_path, ttl_seconds=3600, max_entries=0)
+    store.put("antigo", "resposta", "st.write(1)")
+    path = tmp_path / "antigo.json"
+    entry = json.loads(path.read_text(encoding="utf-8"))
+    entry["created_at"] -= 7200
+    path.write_text(json.dumps(entry), encoding="utf-8")
+
+    assert store.get("antigo") is None
+    assert not path.exists()
+
+
+def test_max_entries_evicts_least_recently_used(tmp_path):
+    store = DashboardStore(tmp_path, ttl_seconds=0, max_entries=2)
+    for age, key in ((300, "a"), (200, "b")):
+        store.put(key, "resposta", None)
+        mtime = time.time() - age
+        os.utime(tmp_path / f"{key}.json", (mtime, mtime))
+    assert store.get("a") is not None  # "a" passa a ser o usado mais recentemente
+
+    store.put("c", "resposta", None)
+
+    assert sorted(p.stem for p in tmp_path.glob("*.json")) == ["a", "c"]
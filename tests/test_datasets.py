@@ -0,0 +1,54 @@
+import os
+import time
+
+from datasets import DatasetStore
+
+
+def _csv(rows: int, seed: int) -> bytes:
+    lines = ["canal,valor"] + [f"canal{(i + seed) % 7},{i * seed}" for i in range(rows)]
+    return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+def _age(store: DatasetStore, dataset_id: str, seconds: float):
+    _, meta_path = store._paths(dataset_id)
+    mtime = time.time() - seconds
+    os.utime(meta_path, (mtime, mtime))
+
+
+def test_ingest_reuses_stored_dataset(tmp_path):
+    store = DatasetStore(tmp_path)
+    first = store.ingest(_csv(50, 1), "vendas.csv")
+    second = store.ingest(_csv(50, 1), "vendas.csv")
+
+    assert first["cached"] is False
+    assert second["cached"] is True
+    assert second["dataset_id"] == first["dataset_id"]
+    assert len(store.load(first["dataset_id"])) == 50
+
+
+def test_unused_datasets_expire(tmp_path):
+    store = DatasetStore(tmp_path, ttl_seconds=3600, max_bytes=0)
+    old = store.ingest(_csv(20, 1), "antigo.csv")["dataset_id"]
+    _age(store, old, 7200)
+
+    assert store.get(old) is None
+    recent = store.ingest(_csv(20, 2), "novo.csv")["dataset_id"]
+
+    assert not any(path.exists() for path in store._paths(old))
+    assert store.get(recent) is not None
+
+
+def test_byte_cap_evicts_least_recently_used(tmp_path):
+    store = DatasetStore(tmp_path, ttl_seconds=0)
+    ids = [store.ingest(_csv(200, seed), f"arquivo{seed}.csv")["dataset_id"] for seed in (1, 2, 3)]
+    for age, dataset_id in zip((300, 200, 100), ids):
+        _age(store, dataset_id, age)
+    store.get(ids[0])  # o mais antigo volta a ser o usado mais recentemente
+
+    size = store._paths(ids[0])[0].stat().st_size
+    store.max_bytes = size * 2 + size // 2
+    assert store.evict() == 1
+
+    assert store.get(ids[0]) is not None
+    assert store.get(ids[1]) is None
+    assert store.get(ids[2]) is not None
@@ -0,0 +1,81 @@
+import threading
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+import backend_api
+from crew_templates import CrewTemplateCache
+from startup import CrewLoader
+
+
+class StubCrew:
+    agents = []
+
+
+class StubProject:
+    def copywriting_crew(self):
+        return StubCrew()
+
+    def dashboard_crew(self):
+        return StubCrew()
+
+
+def wait_for_status(client, expected, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while True:
+        response = client.get("/health/ready")
+        if response.json()["status"] == expected or time.monotonic() > deadline:
+            return response
+        time.sleep(0.02)
+
+
+@pytest.fixture
+def use_loader(monkeypatch):
+    """Troca o loader/templates do app por um com o importer informado"""
+    def install(importer):
+        loader = CrewLoader(importer)
+        monkeypatch.setattr(backend_api, "crew_loader", loader)
+        monkeypatch.setattr(backend_api, "crew_templates", CrewTemplateCache(loader=loader.load))
+        return loader
+    return install
+
+
+def test_live_does_not_depend_on_crews(use_loader):
+    use_loader(lambda: StubProject)
+    response = TestClient(backend_api.app).get("/health/live")
+    assert response.status_code == 200
+    assert response.json()["status"] == "alive"
+
+
+def test_ready_flips_after_warm_up(use_loader):
+    release = threading.Event()
+
+    def slow_import():
+        release.wait(5)
+        return StubProject
+
+    loader = use_loader(slow_import)
+    client = TestClient(backend_api.app)
+
+    response = client.get("/health/ready")
+    assert response.status_code == 503
+    assert response.json()["status"] == "starting"
+
+    release.set()
+    response = wait_for_status(client, "ready")
+    assert response.status_code == 200
+    assert response.json()["templates"] == ["copywriting", "dashboard"]
+    assert loader.warm
+
+
+def test_ready_reports_import_error(use_loader):
+    def broken_import():
+        raise ImportError("sem o projeto")
+
+    use_loader(broken_import)
+    client = TestClient(backend_api.app)
+
+    response = wait_for_status(client, "error")
+    assert response.status_code == 503
+    assert "sem o projeto" in response.json()["error"]
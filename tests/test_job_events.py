@@ -0,0 +1,68 @@
+import pytest
+
+import jobs
+from job_store import JobStore, SqliteJobStore
+from jobs import Job
+
+
+def test_consecutive_tokens_are_merged(monkeypatch):
+    monkeypatch.setattr(jobs, "TOKEN_MERGE_SECONDS", 60)
+    job = Job("copywriting", {})
+    job.emit("task_started", task="research_task", agent="Pesquisador")
+    for delta in ("Olá", ", ", "mundo"):
+        job.emit("token", task="research_task", delta=delta)
+    job.emit("token", task="copywriting_task", delta="Copy")
+    job.emit("task_completed", task="copywriting_task", output="Copy")
+
+    types = [(event["type"], event.get("delta")) for event in job.events]
+    assert types == [
+        ("task_started", None),
+        ("token", "Olá, mundo"),
+        ("token", "Copy"),
+        ("task_completed", None),
+    ]
+    assert [event["seq"] for event in job.events] == [1, 2, 3, 4]
+
+
+def test_token_window_flushes_while_streaming(monkeypatch):
+    monkeypatch.setattr(jobs, "TOKEN_MERGE_SECONDS", 0)
+    job = Job("copywriting", {})
+    for delta in ("a", "b", "c"):
+        job.emit("token", task="t", delta=delta)
+
+    # Com janela zero cada trecho fecha o evento aberto (o último fica pendente)
+    assert [event["delta"] for event in job.events] == ["ab"]
+    job.emit("job_finished")
+    assert [event.get("delta") for event in job.events] == ["ab", "c", None]
+
+
+class CountingStore(SqliteJobStore):
+    def __init__(self, path):
+        super().__init__(path)
+        self.writes = 0
+
+    def append_events(self, job_id, events):
+        self.writes += 1
+        super().append_events(job_id, events)
+
+
+def test_store_receives_tokens_in_batches(monkeypatch, tmp_path):
+    monkeypatch.setattr(jobs, "TOKEN_MERGE_SECONDS", 0)
+    monkeypatch.setattr(jobs, "STORE_FLUSH_SECONDS", 60)
+    store = CountingStore(tmp_path / "jobs.sqlite3")
+    job = Job("copywriting", {}, store=store)
+    job.emit("task_started", task="t")
+    for i in range(200):
+        job.emit("token", task="t", delta=str(i))
+    assert store.writes == 1
+    job.emit("task_completed", task="t", output="...")
+
+    assert store.writes == 2
+    stored = store.events_after(job.id, 0)
+    assert [event["seq"] for event in stored] == [event["seq"] for event in job.events]
+    assert "".join(event.get("delta", "") for event in stored) == "".join(str(i) for i in range(200))
+
+
+def test_job_store_is_abstract():
+    with pytest.raises(TypeError):
+        JobStore()
@@ -0,0 +1,116 @@
+import threading
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+import backend_api
+from jobs import JOB_DONE, JOB_ERROR, JOB_QUEUED, JOB_RUNNING, JobManager
+from startup import CrewLoader
+
+DASHBOARD_PAYLOAD = {"data_context": "vendas por mês", "topic": "Vendas"}
+
+
+class StubRunner:
+    """Runner no lugar da crew: bloqueia até `release` e devolve um resultado fixo"""
+    def __init__(self):
+        self.release = threading.Event()
+        self.calls = []
+
+    def __call__(self, inputs):
+        self.calls.append(inputs)
+        self.release.wait(5)
+        return {"result": f"dashboard de {inputs['topic']}", "raw": "ok"}
+
+
+@pytest.fixture
+def runner(monkeypatch):
+    runner = StubRunner()
+    monkeypatch.setattr(backend_api, "run_dashboard", runner)
+    loader = CrewLoader(lambda: object)
+    loader.load()
+    monkeypatch.setattr(backend_api, "crew_loader", loader)
+    yield runner
+    runner.release.set()
+
+
+@pytest.fixture
+def manager(monkeypatch):
+    manager = JobManager(max_workers=1, max_queue=2, drain_seconds=0)
+    monkeypatch.setattr(backend_api, "job_manager", manager)
+    yield manager
+    manager.shutdown(wait=False)
+
+
+@pytest.fixture
+def client():
+    # Sem o `with`: o shutdown do app drenaria o JobManager global
+    return TestClient(backend_api.app)
+
+
+def wait_for_status(client, job_id, expected, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while True:
+        job = client.get(f"/api/jobs/{job_id}").json()
+        if job["status"] == expected or time.monotonic() > deadline:
+            return job
+        time.sleep(0.01)
+
+
+def test_post_returns_job_id(runner, manager, client):
+    response = client.post("/api/dashboard", json=DASHBOARD_PAYLOAD)
+
+    assert response.status_code == 202
+    assert response.json()["job_id"]
+    assert response.json()["status"] in (JOB_QUEUED, JOB_RUNNING)
+
+
+def test_job_moves_through_statuses(runner, manager, client):
+    first = client.post("/api/dashboard", json=DASHBOARD_PAYLOAD).json()["job_id"]
+    second = client.post("/api/dashboard", json={**DASHBOARD_PAYLOAD, "topic": "Custos"}).json()["job_id"]
+
+    assert wait_for_status(client, first, JOB_RUNNING)["status"] == JOB_RUNNING
+    assert client.get(f"/api/jobs/{second}").json()["status"] == JOB_QUEUED
+
+    runner.release.set()
+    done = wait_for_status(client, second, JOB_DONE)
+    assert done["status"] == JOB_DONE
+    assert done["result"] == "dashboard de Custos"
+    assert client.get(f"/api/jobs/{first}").json()["status"] == JOB_DONE
+
+
+def test_unknown_job_returns_404(manager, client):
+    assert client.get("/api/jobs/nao-existe").status_code == 404
+
+
+def test_full_queue_returns_503(runner, manager, client):
+    for _ in range(manager.max_queue):
+        assert client.post("/api/dashboard", json=DASHBOARD_PAYLOAD).status_code == 202
+
+    response = client.post("/api/dashboard", json=DASHBOARD_PAYLOAD)
+    assert response.status_code == 503
+    assert "Fila de jobs cheia" in response.json()["detail"]
+
+
+def test_wait_returns_result_inline(runner, manager, client):
+    runner.release.set()
+    response = client.post("/api/dashboard", params={"wait": "true"}, json=DASHBOARD_PAYLOAD)
+
+    assert response.status_code == 200
+    assert response.json()["success"] is True
+    assert response.json()["result"] == "dashboard de Vendas"
+
+
+def test_drain_interrupts_queued_and_running_jobs(runner, manager, client):
+    running = client.post("/api/dashboard", json=DASHBOARD_PAYLOAD).json()["job_id"]
+    queued = client.post("/api/dashboard", json=DASHBOARD_PAYLOAD).json()["job_id"]
+    wait_for_status(client, running, JOB_RUNNING)
+
+    assert manager.drain(timeout=0.1) == 1
+
+    queued_job = manager.get(queued)
+    assert queued_job.status == JOB_ERROR
+    assert "cancelado" in queued_job.error
+    assert manager.get(running).status == JOB_ERROR
+    assert "interrompido" in manager.get(running).error
+    assert client.post("/api/dashboard", json=DASHBOARD_PAYLOAD).status_code == 503
@@ -0,0 +1,63 @@
+from pathlib import Path
+
+from log_filter import LogFilter
+
+LOG_PATH = Path(__file__).resolve().parent.parent / "benchmarks" / "data" / "crew_verbose.log"
+
+# Trecho do log verboso da crew (benchmarks/data/crew_verbose.log, linhas 84-92)
+ERROR_BLOCK = (
+    "│  Tool Usage Failed                                           │\n"
+    "[CrewAIEventsBus] Sync handler error in on_agent_logs_execution: Expecting value: line 1 column 1 (char 0)\n"
+    "Traceback (most recent call last):\n"
+    '  File "/usr/lib/python3.11/json/decoder.py", line 355, in raw_decode\n'
+    "json.decoder.JSONDecodeError: Expecting value: line 1 column 1 (char 0)\n"
+)
+CREW_OUTPUT = (
+    "│  Name: Read website content                                  │\n"
+    "│  Error: HTTPConnectionPool(host='127.0.0.1', port=9): Max retries exceeded │\n"
+    "│  Tool Args:                                                  │\n"
+    "🚀 Crew: crew\n"
+)
+
+
+def run_filter(text: str, chunk_size: int = 0) -> str:
+    log_filter = LogFilter()
+    if chunk_size:
+        chunks = [text[i:i + chunk_size] for i in range(0, len(text), chunk_size)]
+    else:
+        chunks = text.splitlines(keepends=True)
+    return "".join(log_filter.feed(chunk) for chunk in chunks) + log_filter.flush()
+
+
+def test_error_block_is_dropped_and_following_output_kept():
+    output = run_filter(ERROR_BLOCK + CREW_OUTPUT)
+
+    assert output == "│  Tool Usage Failed                                           │\n" + CREW_OUTPUT
+
+
+def test_result_does_not_depend_on_write_boundaries():
+    text = ERROR_BLOCK + CREW_OUTPUT
+    assert run_filter(text, chunk_size=7) == run_filter(text)
+
+
+def test_full_traceback_with_source_lines_is_dropped():
+    text = (
+        "[CrewAIEventsBus] Sync handler error in on_agent_logs_execution\n"
+        "Traceback (most recent call last):\n"
+        '  File "/app/handler.py", line 10, in handle\n'
+        "    data = json.loads(raw)\n"
+        "           ^^^^^^^^^^^^^^^\n"
+        "ValueError: dados inválidos\n"
+        "    - Ponto 2: a oferta precisa de prova social\n"
+    )
+    assert run_filter(text) == "    - Ponto 2: a oferta precisa de prova social\n"
+
+
+def test_recorded_log_only_loses_error_lines():
+    lines = LOG_PATH.read_text(encoding="utf-8").splitlines(keepends=True)
+    log_filter = LogFilter()
+    dropped = [line for line in lines if not log_filter.feed(line)]
+
+    assert dropped
+    for line in dropped:
+        assert line.startswith(("[CrewAIEventsBus]", "Traceback", '  File "', "json.decoder.JSONDecodeError"))
@@ -0,0 +1,106 @@
+import time
+
+import pytest
+from crewai import Agent, Crew, Task
+from crewai.llms.base_llm import BaseLLM
+from fastapi.testclient import TestClient
+
+import backend_api
+from crew_events import install_job_event_handlers, prepare_crew_for_jobs
+from jobs import JobManager
+from metrics import LLM_TOKENS
+from startup import CrewLoader
+
+AGENTS_CONFIG = {"redator": {"role": "Redator de anúncios para {topic}\n"}}
+
+
+class StubLLM(BaseLLM):
+    """LLM sem rede: registra 100 tokens de prompt e 10 de resposta por chamada"""
+    def call(self, messages, tools=None, callbacks=None, available_functions=None,
+             from_task=None, from_agent=None, **kwargs):
+        self._track_token_usage_internal({"prompt_tokens": 100, "completion_tokens": 10})
+        return "Thought: pronto\nFinal Answer: texto gerado"
+
+    def supports_function_calling(self) -> bool:
+        return False
+
+
+def stub_template(model: str, task_name: str) -> Crew:
+    agent = Agent(role=AGENTS_CONFIG["redator"]["role"], goal="Vender {topic}", backstory="Redator",
+                  llm=StubLLM(model=model), verbose=False)
+    task = Task(name=task_name, description="Escreva sobre {topic}", expected_output="texto", agent=agent)
+    crew = Crew(agents=[agent], tasks=[task], verbose=False)
+    prepare_crew_for_jobs(crew, agents_config=AGENTS_CONFIG)
+    install_job_event_handlers()
+    return crew
+
+
+def metric_value(metric, **labels):
+    return metric._values.get(metric._key(labels))
+
+
+def wait_for_value(metric, expected, timeout=5.0, **labels):
+    """Os handlers do event bus rodam em um pool de threads: espera o valor chegar"""
+    deadline = time.monotonic() + timeout
+    while metric_value(metric, **labels) != expected and time.monotonic() < deadline:
+        time.sleep(0.01)
+    time.sleep(0.1)  # um valor maior (contagem em dobro) chegaria depois
+    return metric_value(metric, **labels)
+
+
+def test_tokens_are_counted_once_per_kickoff():
+    template = stub_template("stub-tokens", "tokens_task")
+    for topic in ("Sapatos XYZ", "Bolsas ABC"):
+        template.copy().kickoff(inputs={"topic": topic})
+
+    labels = {"agent": "redator", "model": "stub-tokens"}
+    assert wait_for_value(LLM_TOKENS, 200.0, type="prompt", **labels) == 200.0
+    assert metric_value(LLM_TOKENS, type="completion", **labels) == 20.0
+
+
+@pytest.fixture
+def stub_dashboard(monkeypatch):
+    template = stub_template("stub-metrics", "metrics_task")
+
+    def run_dashboard(inputs):
+        output = template.copy().kickoff(inputs={"topic": inputs["topic"]})
+        return {"result": output.raw, "raw": output.raw}
+
+    monkeypatch.setattr(backend_api, "run_dashboard", run_dashboard)
+    loader = CrewLoader(lambda: object)
+    loader.load()
+    monkeypatch.setattr(backend_api, "crew_loader", loader)
+    manager = JobManager(max_workers=1, max_queue=2, drain_seconds=0)
+    monkeypatch.setattr(backend_api, "job_manager", manager)
+    yield
+    manager.shutdown(wait=False)
+
+
+def scrape(client, expected_line, timeout=5.0):
+    """Texto do /metrics assim que `expected_line` aparecer (handlers do event bus são assíncronos)"""
+    deadline = time.monotonic() + timeout
+    while True:
+        response = client.get("/metrics")
+        if expected_line in response.text or time.monotonic() > deadline:
+            return response
+        time.sleep(0.01)
+
+
+def test_metrics_endpoint_after_job(stub_dashboard):
+    client = TestClient(backend_api.app)
+    response = client.post("/api/dashboard", params={"wait": "true"},
+                           json={"data_context": "vendas por mês", "topic": "Sapatos XYZ"})
+    assert response.json() == {"success": True, "result": "texto gerado", "raw": "texto gerado"}
+
+    task_line = 'crew_task_duration_seconds_count{task="metrics_task",agent="redator",status="ok"} 1'
+    response = scrape(client, task_line)
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    text = response.text
+    assert task_line in text
+    assert 'crew_job_duration_seconds_count{kind="dashboard",status="done"}' in text
+    assert 'crew_llm_tokens_total{agent="redator",model="stub-metrics",type="prompt"} 100.0' in text
+    assert 'http_request_duration_seconds_count{method="POST",route="/api/dashboard",status="200"}' in text
+    # Os inputs do usuário não viram label
+    assert "Sapatos" not in text
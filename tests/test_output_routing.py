@@ -0,0 +1,40 @@
+import os
+import time
+
+from output_routing import JobOutputLog, prune_job_logs
+
+
+def _make_log(log_dir, name, age_seconds=0.0):
+    path = log_dir / f"{name}.log"
+    path.write_text("linha\n", encoding="utf-8")
+    mtime = time.time() - age_seconds
+    os.utime(path, (mtime, mtime))
+    return path
+
+
+def test_prune_removes_expired_logs(tmp_path):
+    old = _make_log(tmp_path, "antigo", age_seconds=7200)
+    recent = _make_log(tmp_path, "recente", age_seconds=10)
+
+    assert prune_job_logs(tmp_path, ttl_seconds=3600, max_files=0) == 1
+    assert not old.exists()
+    assert recent.exists()
+
+
+def test_prune_keeps_only_newest_files_over_the_cap(tmp_path):
+    paths = [_make_log(tmp_path, f"job{i}", age_seconds=100 - i) for i in range(5)]
+
+    assert prune_job_logs(tmp_path, ttl_seconds=3600, max_files=2) == 3
+    assert [p.exists() for p in paths] == [False, False, False, True, True]
+
+
+def test_prune_never_removes_open_logs(tmp_path):
+    log = JobOutputLog("rodando", log_dir=tmp_path, echo=False)
+    os.utime(log.path, (time.time() - 7200, time.time() - 7200))
+    try:
+        assert prune_job_logs(tmp_path, ttl_seconds=3600, max_files=1) == 0
+        assert log.path.exists()
+    finally:
+        log.close()
+
+    assert prune_job_logs(tmp_path, ttl_seconds=3600, max_files=1) == 1
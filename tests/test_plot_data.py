@@ -0,0 +1,42 @@
+import numpy as np
+import pandas as pd
+import plotly.express as px
+
+from plot_data import ReducedExpress
+
+
+def _channels(rows: int) -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({
+        "canal": rng.choice(["email", "busca", "social", "direto"], rows),
+        "regiao": rng.choice(["norte", "sul"], rows),
+        "valor": rng.normal(100, 15, rows),
+    })
+
+
+def test_categorical_histogram_is_aggregated_before_plotting():
+    df = _channels(50_000)
+    figure = ReducedExpress(px, max_points=1_000).histogram(df, x="canal", color="regiao")
+
+    assert all(trace.type == "bar" for trace in figure.data)
+    assert sum(len(trace.x) for trace in figure.data) == 8
+    counts = {(trace.name, x): y for trace in figure.data for x, y in zip(trace.x, trace.y)}
+    expected = df.groupby(["regiao", "canal"]).size()
+    assert counts == {key: expected[key] for key in expected.index}
+
+
+def test_numeric_histogram_is_binned():
+    df = _channels(50_000)
+    figure = ReducedExpress(px, max_points=1_000).histogram(df, x="valor", nbins=20)
+
+    assert len(figure.data) == 1
+    assert len(figure.data[0].x) == 20
+    assert figure.data[0].y.sum() == len(df)
+
+
+def test_small_frames_are_passed_through():
+    df = _channels(500)
+    figure = ReducedExpress(px, max_points=1_000).histogram(df, x="canal")
+
+    assert figure.data[0].type == "histogram"
+    assert len(figure.data[0].x) == 500
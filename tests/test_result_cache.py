@@ -0,0 +1,84 @@
+import threading
+
+import pytest
+
+import result_cache
+from result_cache import DiskCache, make_cache_key
+
+
+class FakeClock:
+    def __init__(self, now: float = 1_000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(result_cache.time, "time", fake)
+    return fake
+
+
+def test_key_ignores_key_order_extra_spaces_and_none():
+    a = make_cache_key("copy", {"topic": "Sapatos  XYZ ", "publico": "jovens\tadultos", "extra": None})
+    b = make_cache_key("copy", {"publico": "jovens adultos", "topic": " Sapatos XYZ"})
+
+    assert a == b
+    assert a != make_cache_key("copy", {"publico": "jovens adultos", "topic": "Sapatos XYZ"}, config_hash="v2")
+    assert a != make_cache_key("dashboard", {"publico": "jovens adultos", "topic": "Sapatos XYZ"})
+
+
+def test_key_keeps_line_breaks_and_indentation():
+    definicao = "Sistema de vendas:\n  - cadastro\n  - relatório"
+
+    keys = {
+        make_cache_key("copy", {"definicao_do_sistema": text})
+        for text in (definicao, definicao.replace("\n", " "), definicao.replace("  - ", "- "))
+    }
+    assert len(keys) == 3
+    assert make_cache_key("copy", {"definicao_do_sistema": definicao + "  \n"}) == \
+        make_cache_key("copy", {"definicao_do_sistema": definicao.replace("cadastro", "cadastro   ")})
+
+
+def test_entries_expire_after_ttl(tmp_path, clock):
+    cache = DiskCache("ttl", cache_dir=tmp_path, ttl_seconds=60)
+    cache.set("a", {"result": 1})
+
+    clock.now += 59
+    assert cache.get("a") == {"result": 1}
+    clock.now += 2
+    assert cache.get("a") is None
+    assert cache.stats() == {"entries": 0, "bytes": 0, "hits": 1, "misses": 1}
+
+
+def test_least_recently_used_entry_is_evicted(tmp_path, clock):
+    cache = DiskCache("lru", cache_dir=tmp_path, ttl_seconds=0, max_entries=2)
+    cache.set("a", 1)
+    clock.now += 1
+    cache.set("b", 2)
+    clock.now += 1
+    assert cache.get("a") == 1  # "a" passa a ser a mais recente
+    clock.now += 1
+    cache.set("c", 3)
+
+    assert [cache.get(key) for key in ("a", "b", "c")] == [1, None, 3]
+
+
+def test_hit_and_miss_counters_under_threads(tmp_path):
+    cache = DiskCache("stats", cache_dir=tmp_path)
+    cache.set("a", 1)
+
+    def lookups():
+        for _ in range(200):
+            cache.get("a")
+            cache.get("b")
+
+    threads = [threading.Thread(target=lookups) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert (cache.hits, cache.misses) == (800, 800)
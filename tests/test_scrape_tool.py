@@ -0,0 +1,117 @@
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from crew_templates import CREW_PROJECT_SRC
+
+sys.path.append(str(CREW_PROJECT_SRC))
+from create_crew_project.tools.cached_scrape_tool import CachedScrapeWebsiteTool  # noqa: E402
+
+ETAG = '"v1"'
+LAST_MODIFIED = "Wed, 01 Jan 2025 00:00:00 GMT"
+
+
+class SiteHandler(BaseHTTPRequestHandler):
+    """Páginas de teste: /page (ETag/Last-Modified), /slow (demora) e /long (texto grande)"""
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.hits.append((self.path, self.headers.get("If-None-Match"), self.headers.get("If-Modified-Since")))
+        if self.path == "/page" and self.headers.get("If-None-Match") == ETAG:
+            self.send_response(304)
+            self.end_headers()
+            return
+        if self.path == "/slow":
+            time.sleep(0.3)
+        text = "x" * 5000 if self.path == "/long" else f"conteúdo de {self.path}"
+        body = f"<html><body><p>{text}</p></body></html>".encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", ETAG)
+        self.send_header("Last-Modified", LAST_MODIFIED)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def site():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), SiteHandler)
+    server.hits = []
+    server.lock = threading.Lock()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    server.url = f"http://127.0.0.1:{server.server_address[1]}"
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def tool(tmp_path):
+    return CachedScrapeWebsiteTool(cache_dir=tmp_path / "scrape", cache_ttl=60)
+
+
+def test_fresh_entry_is_served_from_cache(site, tool):
+    first = tool._run(website_url=f"{site.url}/page")
+    second = tool._run(website_url=f"{site.url}/page")
+
+    assert "conteúdo de /page" in first
+    assert second == first
+    assert len(site.hits) == 1
+
+
+def test_expired_entry_is_revalidated_with_304(site, tool):
+    url = f"{site.url}/page"
+    first = tool._run(website_url=url)
+    tool.cache_ttl = 0
+
+    second = tool._run(website_url=url)
+
+    assert second == first
+    assert site.hits[1] == ("/page", ETAG, LAST_MODIFIED)
+    # O 304 renova a entrada: com TTL de volta, não há nova requisição
+    tool.cache_ttl = 60
+    tool._run(website_url=url)
+    assert len(site.hits) == 2
+
+
+def test_expired_entry_without_validator_match_is_downloaded_again(site, tool):
+    url = f"{site.url}/other"
+    tool._run(website_url=url)
+    tool.cache_ttl = 0
+
+    tool._run(website_url=url)
+
+    assert len(site.hits) == 2
+    assert site.hits[1][1] == ETAG
+
+
+def test_concurrent_requests_share_one_download(site, tool):
+    url = f"{site.url}/slow"
+    with ThreadPoolExecutor(max_workers=5) as pool:
+        results = list(pool.map(lambda _: tool._run(website_url=url), range(5)))
+
+    assert len(set(results)) == 1
+    assert len(site.hits) == 1
+
+
+def test_text_is_truncated_to_max_chars(site, tmp_path):
+    tool = CachedScrapeWebsiteTool(cache_dir=tmp_path / "scrape", max_chars=100)
+    text = tool._run(website_url=f"{site.url}/long")
+
+    assert text == CachedScrapeWebsiteTool._format("x" * 100)
+
+
+def test_default_cache_dir_follows_result_cache(monkeypatch):
+    from result_cache import DEFAULT_CACHE_DIR
+
+    monkeypatch.delenv("SCRAPE_CACHE_DIR", raising=False)
+    assert CachedScrapeWebsiteTool().cache_dir == DEFAULT_CACHE_DIR / "scrape"
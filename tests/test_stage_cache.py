@@ -0,0 +1,102 @@
+from crewai import Agent, Crew, Task
+from crewai.llms.base_llm import BaseLLM
+
+from crew_templates import CrewTemplateCache
+from result_cache import DiskCache
+from stage_cache import StagedCrewRunner
+
+
+class RecordingLLM(BaseLLM):
+    """LLM sem rede: anota a task e o prompt de cada chamada e responde com o nome da task"""
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._calls = []
+
+    def call(self, messages, tools=None, callbacks=None, available_functions=None,
+             from_task=None, from_agent=None, **kwargs):
+        prompt = "\n".join(str(message.get("content", "")) for message in messages)
+        self._calls.append((from_task.name, prompt))
+        return f"Thought: pronto\nFinal Answer: saída de {from_task.name}"
+
+    def supports_function_calling(self) -> bool:
+        return False
+
+
+class StubProject:
+    """Projeto com uma crew `copywriting` de três tasks sequenciais"""
+    base_directory = "."
+
+    def __init__(self):
+        self.llm = RecordingLLM(model="stub-stages")
+        self.kickoffs = []
+
+    def copywriting_crew(self) -> Crew:
+        agent = Agent(role="Redator", goal="Vender {produto}", backstory="Redator", llm=self.llm, verbose=False)
+        tasks = [
+            Task(name="research_task", description="Pesquise {produto}", expected_output="notas", agent=agent),
+            Task(name="copywriting_task", description="Escreva sobre {produto}", expected_output="texto",
+                 agent=agent),
+            Task(name="editing_task", description="Revise no tom {tone}", expected_output="texto final",
+                 agent=agent),
+        ]
+        return Crew(agents=[agent], tasks=tasks, verbose=False,
+                    before_kickoff_callbacks=[self.record_kickoff])
+
+    def record_kickoff(self, inputs):
+        self.kickoffs.append(dict(inputs))
+        return inputs
+
+
+def make_runner(tmp_path):
+    project = StubProject()
+    templates = CrewTemplateCache(crew_class=lambda: project)
+    runner = StagedCrewRunner(templates, DiskCache("stages", cache_dir=tmp_path), "copywriting")
+    return runner, project
+
+
+def test_second_run_reuses_cached_stages(tmp_path):
+    runner, project = make_runner(tmp_path)
+
+    first = runner.run({"produto": "Sapatos XYZ", "tone": "formal"})
+    assert first == {
+        "result": "saída de editing_task",
+        "stages": {"research_task": "executed", "copywriting_task": "executed", "editing_task": "executed"},
+    }
+    project.llm._calls.clear()
+
+    second = runner.run({"produto": "Sapatos XYZ", "tone": "divertido"})
+
+    assert second["stages"] == {"research_task": "cached", "copywriting_task": "cached",
+                                "editing_task": "executed"}
+    assert second["result"] == "saída de editing_task"
+    # Só a última task chamou o LLM, com as saídas cacheadas como contexto
+    assert [name for name, _ in project.llm._calls] == ["editing_task"]
+    prompt = project.llm._calls[0][1]
+    assert "Revise no tom divertido" in prompt
+    assert "saída de research_task" in prompt and "saída de copywriting_task" in prompt
+    # A crew executada manteve os parâmetros do template
+    assert project.kickoffs == [{"produto": "Sapatos XYZ", "tone": "formal"},
+                                {"produto": "Sapatos XYZ", "tone": "divertido"}]
+
+
+def test_changed_early_input_reruns_everything(tmp_path):
+    runner, project = make_runner(tmp_path)
+    runner.run({"produto": "Sapatos XYZ", "tone": "formal"})
+    project.llm._calls.clear()
+
+    result = runner.run({"produto": "Bolsas ABC", "tone": "formal"})
+
+    assert set(result["stages"].values()) == {"executed"}
+    assert [name for name, _ in project.llm._calls] == ["research_task", "copywriting_task", "editing_task"]
+
+
+def test_identical_inputs_return_without_kickoff(tmp_path):
+    runner, project = make_runner(tmp_path)
+    runner.run({"produto": "Sapatos XYZ", "tone": "formal"})
+    project.llm._calls.clear()
+
+    result = runner.run({"produto": "Sapatos XYZ", "tone": "formal"})
+
+    assert result == {"result": "saída de editing_task",
+                      "stages": dict.fromkeys(("research_task", "copywriting_task", "editing_task"), "cached")}
+    assert project.llm._calls == [] and len(project.kickoffs) == 1
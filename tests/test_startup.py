@@ -0,0 +1,39 @@
+import sys
+import threading
+
+import backend_api
+from crew_templates import CREW_PROJECT_SRC
+from startup import LOADER_READY, ImportTimer
+
+
+def test_crew_loader_imports_real_project():
+    crew_class = backend_api.crew_loader.load()
+
+    assert backend_api.crew_loader.state == LOADER_READY
+    assert crew_class.__module__ == "create_crew_project.crew"
+    assert str(CREW_PROJECT_SRC) in sys.path
+    assert all(path.is_file() for path in backend_api.crew_templates.config_files())
+
+
+def test_crew_templates_warm_up_with_real_project():
+    backend_api.crew_templates.warm_up()
+
+    assert backend_api.crew_templates.templates == ["copywriting", "dashboard"]
+    assert backend_api.crew_templates.warm_llms
+
+
+def test_import_timer_ignores_other_threads():
+    def import_in_other_thread():
+        import wave  # noqa: F401
+
+    sys.modules.pop("wave", None)
+    sys.modules.pop("colorsys", None)
+    with ImportTimer() as timer:
+        worker = threading.Thread(target=import_in_other_thread)
+        worker.start()
+        worker.join()
+        import colorsys  # noqa: F401
+
+    modules = {record["module"] for record in timer.records}
+    assert "colorsys" in modules
+    assert "wave" not in modules